@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark for RPKIErrorChecker message classification
+Compares MessageClassifier against the original categorize_error /
+determine_severity implementations, and against each rule table compiled
+into one alternation regex, and checks all three agree
+"""
+
+import os
+import sys
+import re
+import csv
+import time
+import argparse
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(REPO_ROOT, 'monitoring'))
+
+from rpki_error_checker import RPKIErrorChecker
+
+SAMPLE_FILES = [
+    os.path.join(REPO_ROOT, 'psql', 'errors.csv'),
+    os.path.join(REPO_ROOT, 'psql', 'rpki_errors_20250928.csv'),
+]
+CONFIG_FILE = os.path.join(REPO_ROOT, 'monitoring', 'rpki_config_template.json')
+
+
+def legacy_categorize_error(message):
+    """categorize_error prior to MessageClassifier"""
+    message_lower = message.lower()
+    
+    if "certificate has expired" in message_lower:
+        return "EXPIRED_CERTIFICATE"
+    elif "crl has expired" in message_lower:
+        return "EXPIRED_CRL"
+    elif "no valid manifest available" in message_lower:
+        return "INVALID_MANIFEST"
+    elif "seqnum gap detected" in message_lower:
+        return "SEQUENCE_GAP"
+    elif "certificate is not yet valid" in message_lower:
+        return "PREMATURE_CERTIFICATE"
+    elif "rfc 3779 resource not subset" in message_lower:
+        return "RESOURCE_VIOLATION"
+    elif "connect timeout" in message_lower or "connect refused" in message_lower:
+        return "CONNECTION_ERROR"
+    elif "no address associated" in message_lower:
+        return "DNS_ERROR"
+    elif "tls handshake" in message_lower:
+        return "TLS_ERROR"
+    elif "unexpected end of file" in message_lower:
+        return "FILE_ERROR"
+    else:
+        return "OTHER"
+
+
+def legacy_determine_severity(config, message):
+    """determine_severity prior to MessageClassifier"""
+    message_lower = message.lower()
+    
+    for pattern, severity in config["severity_mapping"].items():
+        if pattern.lower() in message_lower:
+            return severity
+    
+    return "LOW"
+
+
+def alternation_classifier(classifier):
+    """classify() with each rule table compiled into one alternation regex.
+
+    The regex finds the leftmost hit, which need not be the first-listed
+    rule, so only the rules listed before the hit are checked after it.
+    """
+    def compile_table(table):
+        regex = re.compile('|'.join(re.escape(pattern) for pattern, _ in table))
+        positions = {pattern: i for i, (pattern, _) in reversed(list(enumerate(table)))}
+        return table, regex, positions
+
+    def lookup(compiled, message_lower, default):
+        table, regex, positions = compiled
+        hit = regex.search(message_lower)
+        if hit is None:
+            return default
+        position = positions[hit.group()]
+        for pattern, value in table[:position]:
+            if pattern in message_lower:
+                return value
+        return table[position][1]
+
+    categories = compile_table(classifier.category_table)
+    severities = compile_table(classifier.severity_table)
+
+    def classify(message):
+        message_lower = message.lower()
+        return (lookup(categories, message_lower, classifier.default_category),
+                lookup(severities, message_lower, classifier.default_severity))
+    return classify
+
+
+def load_sample_messages():
+    """Error messages (the part after the object location) from the CSV samples"""
+    messages = []
+    for filepath in SAMPLE_FILES:
+        with open(filepath, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                messages.append(row['Message'].rsplit(': ', 1)[-1])
+    return messages
+
+
+def time_classifier(classify, messages, repeat):
+    """Return the best messages/sec over repeat runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            classify(message)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(messages) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark error message classification')
+    parser.add_argument('-n', '--messages', type=int, default=200000,
+                       help='Number of messages to classify per run (default: 200000)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                       help='Number of timed runs, best is reported (default: 3)')
+    args = parser.parse_args()
+    
+    checker = RPKIErrorChecker(CONFIG_FILE)
+    sample = load_sample_messages()
+    messages = (sample * (args.messages // len(sample) + 1))[:args.messages]
+    
+    def legacy(message):
+        return legacy_categorize_error(message), legacy_determine_severity(checker.config, message)
+    
+    alternation = alternation_classifier(checker.classifier)
+    for name, classify in (('legacy', legacy), ('alternation', alternation)):
+        mismatches = sum(1 for message in sample if checker.classifier.classify(message) != classify(message))
+        if mismatches:
+            print(f"Error: {mismatches} messages classified differently from the {name} implementation")
+            sys.exit(1)
+    
+    legacy_rate = time_classifier(legacy, messages, args.repeat)
+    compiled_rate = time_classifier(checker.classifier.classify, messages, args.repeat)
+    alternation_rate = time_classifier(alternation, messages, args.repeat)
+    
+    print(f"Messages per run:  {len(messages)}")
+    print(f"Legacy:            {legacy_rate:,.0f} messages/sec")
+    print(f"MessageClassifier: {compiled_rate:,.0f} messages/sec")
+    print(f"Alternation regex: {alternation_rate:,.0f} messages/sec")
+    print(f"Speedup:           {compiled_rate / legacy_rate:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark for RPKIErrorAnalyzer.parse_log_line
+Compares the precompiled LogLineMatcher against the original
+per-pattern re.search implementation and checks both agree
+"""
+
+import os
+import re
+import sys
+import csv
+import time
+import argparse
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+
+from rpki_error_analyzer import RPKIErrorAnalyzer
+
+SAMPLE_FILES = [
+    os.path.join(REPO_ROOT, 'psql', 'errors.csv'),
+    os.path.join(REPO_ROOT, 'psql', 'rpki_errors_20250928.csv'),
+]
+
+# Non-error lines as they appear on the console between the error lines
+FILLER_LINES = [
+    "Sep 27 23:39:26 rpki-client: https://rrdp.ripe.net/notification.xml: pulling from network",
+    "Sep 27 23:39:27 rpki-client: rsync://rpki.afrinic.net/repository: pulling from network",
+    "Sep 27 23:45:02 rpki-client: all files parsed: generating output",
+]
+
+
+def legacy_parse_log_line(analyzer: RPKIErrorAnalyzer, line: str):
+    """The parse_log_line implementation prior to LogLineMatcher"""
+    timestamp_match = re.search(r'^(\w{3}\s+\d{2}\s+\d{2}:\d{2}:\d{2})', line)
+    timestamp = timestamp_match.group(1) if timestamp_match else None
+
+    host = None
+    url_match = re.search(r'https?://([^/\s:]+)', line)
+    if url_match:
+        host = url_match.group(1)
+    else:
+        rsync_match = re.search(r'rsync://([^/\s:]+)', line)
+        if rsync_match:
+            host = rsync_match.group(1)
+        else:
+            path_match = re.search(r'([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', line)
+            if path_match:
+                host = path_match.group(1)
+
+    error_types = []
+    for error_type, pattern in analyzer.error_patterns.items():
+        if re.search(pattern, line, re.IGNORECASE):
+            error_types.append(error_type)
+
+    if not error_types:
+        return None
+
+    return {
+        'timestamp': timestamp,
+        'host': host,
+        'error_types': error_types,
+        'raw_line': line.strip(),
+        'severity': analyzer.classify_severity(error_types)
+    }
+
+
+def load_sample_lines():
+    """Load raw log lines from the exported CSV samples"""
+    lines = []
+    for filepath in SAMPLE_FILES:
+        with open(filepath, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            lines.extend(row['Message'] for row in reader)
+    return lines + FILLER_LINES * (len(lines) // len(FILLER_LINES))
+
+
+def time_parser(parse, lines, repeat):
+    """Return the best lines/sec over repeat runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            parse(line)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(lines) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parse_log_line throughput')
+    parser.add_argument('-n', '--lines', type=int, default=100000,
+                       help='Number of lines to parse per run (default: 100000)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                       help='Number of timed runs, best is reported (default: 3)')
+    args = parser.parse_args()
+
+    sample = load_sample_lines()
+    lines = (sample * (args.lines // len(sample) + 1))[:args.lines]
+    analyzer = RPKIErrorAnalyzer()
+
+    mismatches = sum(1 for line in sample
+                     if analyzer.parse_log_line(line) != legacy_parse_log_line(analyzer, line))
+    if mismatches:
+        print(f"Error: {mismatches} lines parsed differently from the legacy implementation")
+        sys.exit(1)
+
+    legacy = time_parser(lambda line: legacy_parse_log_line(analyzer, line), lines, args.repeat)
+    compiled = time_parser(analyzer.parse_log_line, lines, args.repeat)
+
+    print(f"Lines per run:  {len(lines)}")
+    print(f"Legacy:         {legacy:,.0f} lines/sec")
+    print(f"LogLineMatcher: {compiled:,.0f} lines/sec")
+    print(f"Speedup:        {compiled / legacy:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
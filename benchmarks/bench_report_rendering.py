@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark for per-CA report rendering
+Compares rpki_reports against the original generate_report/format_report
+string concatenation and checks both produce the same text
+"""
+
+import os
+import sys
+import csv
+import time
+import argparse
+import logging
+from collections import defaultdict
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(REPO_ROOT, 'monitoring'))
+
+from rpki_error_checker import RPKIErrorChecker
+from rpki_reports import get_recommendations, render_reports
+
+SAMPLE_FILES = [
+    os.path.join(REPO_ROOT, 'psql', 'errors.csv'),
+    os.path.join(REPO_ROOT, 'psql', 'rpki_errors_20250928.csv'),
+]
+CONFIG_FILE = os.path.join(REPO_ROOT, 'monitoring', 'rpki_config_template.json')
+GENERATED = "2025-09-28 00:00:00 UTC"
+
+
+def legacy_format_report(ca, error_summary, all_errors):
+    """format_report prior to rpki_reports, with a fixed timestamp"""
+    report = f"""
+RPKI Validation Errors Report
+=============================
+CA/Repository: {ca}
+Generated: {GENERATED}
+Total Errors: {len(all_errors)}
+
+EXECUTIVE SUMMARY
+================
+"""
+    for severity in ["HIGH", "MEDIUM", "LOW"]:
+        if severity in error_summary:
+            count = sum(len(errors) for errors in error_summary[severity].values())
+            report += f"{severity} Priority: {count} errors\n"
+
+    report += "\nDETAILED BREAKDOWN\n"
+    report += "==================\n"
+
+    for severity in ["HIGH", "MEDIUM", "LOW"]:
+        if severity in error_summary:
+            report += f"\n{severity} PRIORITY ISSUES:\n"
+            report += "-" * (len(severity) + 18) + "\n"
+
+            for error_type, errors in error_summary[severity].items():
+                report += f"\n{error_type} ({len(errors)} occurrences):\n"
+
+                grouped = defaultdict(list)
+                for error in errors:
+                    grouped[error.error_message].append(error)
+
+                for message, error_list in grouped.items():
+                    report += f"  • {message}\n"
+                    if len(error_list) > 1:
+                        report += f"    Affected files: {len(error_list)}\n"
+                    else:
+                        report += f"    File: {error_list[0].file_path}\n"
+
+    report += "\nRECOMMENDED ACTIONS\n"
+    report += "===================\n"
+    report += get_recommendations(error_summary)
+
+    report += "\n\nCONTACT INFORMATION\n"
+    report += "===================\n"
+    report += "This report was generated by an automated RPKI monitoring system.\n"
+    report += "For questions or assistance, please contact: rpki-monitor@example.com\n"
+    return report
+
+
+def legacy_generate_report(ca_errors):
+    """generate_report prior to rpki_reports"""
+    reports = {}
+    for ca, errors in ca_errors.items():
+        error_summary = defaultdict(lambda: defaultdict(list))
+        for error in errors:
+            error_summary[error.severity][error.error_type].append(error)
+        reports[ca] = legacy_format_report(ca, error_summary, errors)
+    return reports
+
+
+def load_sample_lines():
+    """Raw rpki-client lines from the CSV samples"""
+    lines = []
+    for filepath in SAMPLE_FILES:
+        with open(filepath, newline='', encoding='utf-8') as f:
+            lines.extend(row['Message'] for row in csv.DictReader(f))
+    return lines
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-CA report rendering')
+    parser.add_argument('-n', '--copies', type=int, default=20,
+                       help='Copies of the sample errors, each with distinct file names (default: 20)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                       help='Number of timed runs, best is reported (default: 3)')
+    parser.add_argument('-w', '--workers', type=int, default=4,
+                       help='Worker processes for the parallel run (default: 4)')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    checker = RPKIErrorChecker(CONFIG_FILE)
+    sample = checker.parse_rpki_errors(load_sample_lines())
+    errors = []
+    for copy in range(args.copies):
+        for error in sample:
+            errors.append(type(error)(error.timestamp, error.error_type, error.repository,
+                                      f"{error.file_path}.{copy}",
+                                      f"{error.error_message} #{copy}", error.severity))
+    ca_errors = checker.group_errors_by_ca(errors)
+
+    legacy = legacy_generate_report(ca_errors)
+    if render_reports(ca_errors, GENERATED) != legacy or \
+            render_reports(ca_errors, GENERATED, workers=args.workers) != legacy:
+        print("Error: reports differ from the legacy implementation")
+        sys.exit(1)
+
+    legacy_time = best_time(lambda: legacy_generate_report(ca_errors), args.repeat)
+    serial_time = best_time(lambda: render_reports(ca_errors, GENERATED), args.repeat)
+    parallel_time = best_time(lambda: render_reports(ca_errors, GENERATED, workers=args.workers),
+                              args.repeat)
+    capped_time = best_time(lambda: render_reports(ca_errors, GENERATED, max_errors=100), args.repeat)
+
+    print(f"Errors:            {len(errors)} in {len(ca_errors)} CA reports")
+    print(f"Legacy:            {legacy_time:.3f}s")
+    print(f"rpki_reports:      {serial_time:.3f}s")
+    print(f"{args.workers} workers:         {parallel_time:.3f}s")
+    print(f"Capped at 100:     {capped_time:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark for report mail delivery
+Sends per-CA report mails to a local stand-in SMTP server with a slow
+greeting, once with the original connect-per-message loop and once with
+the pooled Mailer, and exercises the retry queue with rejected messages
+"""
+
+import os
+import sys
+import time
+import smtplib
+import argparse
+import tempfile
+import threading
+import socketserver
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(REPO_ROOT, 'monitoring'))
+
+from rpki_mailer import Mailer, OutgoingMail, format_latency
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, MAIL, RCPT, DATA, NOOP, RSET, QUIT"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        time.sleep(server.greeting_delay)
+        self.reply('220 stand-in ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 stand-in')
+            elif command.startswith('MAIL'):
+                self.reply('250 OK')
+            elif command.startswith('RCPT'):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                with server.lock:
+                    reject = server.reject > 0
+                    server.reject -= reject
+                    server.received += not reject
+                self.reply(server.reject_reply if reject else '250 Queued')
+            elif command in ('NOOP', 'RSET'):
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Not implemented')
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, greeting_delay=0.0, reject=0, reject_reply='451 Try again later'):
+        super().__init__(('127.0.0.1', 0), StandInSMTPHandler)
+        self.greeting_delay = greeting_delay
+        self.reject = reject
+        self.reject_reply = reject_reply
+        self.connections = 0
+        self.received = 0
+        self.lock = threading.Lock()
+
+
+def legacy_send(server_address, mails):
+    """send_email_report prior to Mailer: a new connection per message, serially"""
+    latencies = []
+    for mail in mails:
+        start = time.perf_counter()
+        smtp = smtplib.SMTP(*server_address)
+        smtp.sendmail(mail.sender, mail.recipients, mail.text)
+        smtp.quit()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark report mail delivery')
+    parser.add_argument('--messages', type=int, default=40, help='Report mails to send (default: 40)')
+    parser.add_argument('--delay', type=float, default=0.2,
+                        help='Seconds the stand-in server waits before its greeting (default: 0.2)')
+    parser.add_argument('--pool-size', type=int, default=4, help='Pooled SMTP sessions (default: 4)')
+    parser.add_argument('--reject', type=int, default=3,
+                        help='Messages the server rejects with 451 in the pooled run (default: 3)')
+    args = parser.parse_args()
+
+    server = StandInSMTPServer(args.delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    text = 'Subject: RPKI Validation Errors\r\n\r\n' + 'error line\r\n' * 200
+    mails = [OutgoingMail(f"ca{i}.example.net", 'rpki-monitor@example.com',
+                          [f"noc@ca{i}.example.net"], text) for i in range(args.messages)]
+
+    start = time.perf_counter()
+    latencies = sorted(legacy_send((host, port), mails))
+    legacy_elapsed = time.perf_counter() - start
+    print(f"legacy: {len(mails)} messages in {legacy_elapsed:.2f}s, "
+          f"latency median {latencies[len(latencies) // 2]:.3f}s, max {latencies[-1]:.3f}s")
+
+    server.reject = args.reject
+    with tempfile.TemporaryDirectory() as queue_dir:
+        config = {'smtp_server': host, 'smtp_port': port, 'pool_size': args.pool_size,
+                  'retry_queue_dir': queue_dir, 'retry_base_delay': 60}
+        start = time.perf_counter()
+        with Mailer(config) as mailer:
+            results = mailer.send_all(mails)
+            pooled_elapsed = time.perf_counter() - start
+            opened = mailer.pool.opened
+            queued = len(mailer.retry_queue)
+            retried = mailer.flush_retries(now=time.time() + 3600)
+            remaining = len(mailer.retry_queue)
+    print(f"pooled: {len(mails)} messages in {pooled_elapsed:.2f}s over {opened} sessions, "
+          f"{format_latency(results)}")
+    print(f"retry queue: {queued} queued, retried {format_latency(retried)}, {remaining} left")
+    print(f"speedup: {legacy_elapsed / pooled_elapsed:.1f}x")
+
+    server.shutdown()
+    expected = 2 * len(mails)
+    if server.received != expected or remaining:
+        print(f"MISMATCH: server accepted {server.received} of {expected} messages")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Scale benchmark suite
+Times the analyzer and checker stages on synthetic logs of several sizes
+and writes lines/sec and peak RSS per stage to a JSON file that can be
+compared between versions (--compare). Each stage runs in a fresh process
+so its peak RSS is not inherited from the stages before it
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import resource
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'monitoring'))
+
+from synthetic_log import write_synthetic_log
+
+CONFIG_FILE = os.path.join(REPO_ROOT, 'monitoring', 'rpki_config_template.json')
+STAGES = {
+    'analyzer': ('parse_log_line', 'analyze_log_content', 'export_json', 'export_csv'),
+    'checker': ('parse_rpki_errors', 'group_errors_by_ca', 'generate_report')
+}
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_results.json')
+SUFFIXES = {'k': 1000, 'm': 1000000, 'g': 1000000000}
+
+
+def parse_size(value: str) -> int:
+    """10k / 1M / 10M / 2500 to a line count"""
+    value = value.strip().lower()
+    if value and value[-1] in SUFFIXES:
+        return int(float(value[:-1]) * SUFFIXES[value[-1]])
+    return int(value)
+
+
+def peak_rss_mb() -> float:
+    """High-water mark of this process's resident set (ru_maxrss is KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def time_stage(stage: str, lines: int, function, items=None):
+    """One result row; peak RSS covers the stage and the setup it needed in this process"""
+    start = time.perf_counter()
+    value = function()
+    elapsed = time.perf_counter() - start
+    return {
+        'stage': stage,
+        'lines': lines,
+        'items': lines if items is None else items(value),
+        'seconds': round(elapsed, 4),
+        'lines_per_sec': round(lines / elapsed) if elapsed else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }
+
+
+def run_analyzer_stage(stage: str, log_path: str, lines: int, workdir: str):
+    from rpki_error_analyzer import RPKIErrorAnalyzer
+    analyzer = RPKIErrorAnalyzer()
+
+    if stage == 'parse_log_line':
+        def parse_lines():
+            matched = 0
+            with open(log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if analyzer.parse_log_line(line):
+                        matched += 1
+            return matched
+        return time_stage(stage, lines, parse_lines, items=lambda matched: matched)
+
+    if stage == 'analyze_log_content':
+        def analyze_content():
+            with open(log_path, 'r', encoding='utf-8') as f:
+                analyzer.analyze_log_content(f.read())
+        return time_stage(stage, lines, analyze_content,
+                          items=lambda _: len(analyzer.results['timeline']))
+
+    # The exports need analyzed results; streaming them in keeps the
+    # whole log out of this process's peak
+    with open(log_path, 'r', encoding='utf-8') as f:
+        analyzer.analyze_lines(f)
+    analyzer.generate_summary()
+    export = analyzer.export_json if stage == 'export_json' else analyzer.export_csv
+    path = os.path.join(workdir, 'bench.json' if stage == 'export_json' else 'bench.csv')
+    with redirect_stdout(open(os.devnull, 'w')):
+        return time_stage(stage, lines, lambda: export(path))
+
+
+def run_checker_stage(stage: str, log_path: str, lines: int, workdir: str):
+    from rpki_error_checker import RPKIErrorChecker
+    checker = RPKIErrorChecker(CONFIG_FILE)
+
+    def parse_errors():
+        with open(log_path, 'r', encoding='utf-8') as f:
+            return checker.parse_rpki_errors(f)
+
+    if stage == 'parse_rpki_errors':
+        return time_stage(stage, lines, parse_errors, items=len)
+    errors = parse_errors()
+    if stage == 'group_errors_by_ca':
+        return time_stage(stage, lines, lambda: checker.group_errors_by_ca(errors), items=len)
+    ca_errors = checker.group_errors_by_ca(errors)
+    return time_stage(stage, lines, lambda: checker.generate_report(ca_errors), items=len)
+
+
+def run_stage(chain: str, stage: str, log_path: str, lines: int, workdir: str):
+    """Run one stage in this process"""
+    logging.disable(logging.CRITICAL)
+    os.chdir(workdir)
+    if chain == 'analyzer':
+        return run_analyzer_stage(stage, log_path, lines, workdir)
+    return run_checker_stage(stage, log_path, lines, workdir)
+
+
+def synthetic_log(workdir: str, lines: int, seed: int) -> str:
+    """Path of a cached synthetic log with lines lines, generated on first use"""
+    path = os.path.join(workdir, f'synthetic_{lines}_{seed}.log')
+    if not os.path.exists(path):
+        print(f"Generating {lines} lines into {path}", file=sys.stderr)
+        write_synthetic_log(path + '.tmp', lines, seed)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(previous_file: str, results):
+    """Print the lines/sec and peak RSS change of each stage against a previous run"""
+    with open(previous_file, 'r') as f:
+        previous = {(row['lines'], row['chain'], row['stage']): row for row in json.load(f)['results']}
+    print(f"\n{'lines':>10}  {'stage':<22}{'lines/sec':>14}{'change':>9}{'peak RSS MB':>14}{'change':>9}")
+    for row in results:
+        before = previous.get((row['lines'], row['chain'], row['stage']))
+        if not before or not before['lines_per_sec'] or not row['lines_per_sec']:
+            continue
+        speed = row['lines_per_sec'] / before['lines_per_sec'] - 1
+        rss = row['peak_rss_mb'] / before['peak_rss_mb'] - 1 if before['peak_rss_mb'] else 0
+        print(f"{row['lines']:>10}  {row['stage']:<22}{row['lines_per_sec']:>14,}{speed:>+9.1%}"
+              f"{row['peak_rss_mb']:>14.1f}{rss:>+9.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark analyzer and checker stages at scale')
+    parser.add_argument('--sizes', default='10k,1M,10M',
+                        help='Comma separated log sizes in lines (default: 10k,1M,10M)')
+    parser.add_argument('--seed', type=int, default=0, help='Synthetic log seed (default: 0)')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'rpki_bench'),
+                        help='Directory for generated logs and exports')
+    parser.add_argument('-o', '--output', default=RESULTS_FILE,
+                        help='Results file (default: benchmarks/bench_results.json)')
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    parser.add_argument('--run-chain', choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument('--run-stage', help=argparse.SUPPRESS)
+    parser.add_argument('--log', help=argparse.SUPPRESS)
+    parser.add_argument('--lines', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_chain:
+        # Child process: one stage, so peak RSS is not inherited from other stages
+        json.dump(run_stage(args.run_chain, args.run_stage, args.log, args.lines, args.workdir), sys.stdout)
+        return
+
+    os.makedirs(args.workdir, exist_ok=True)
+    results = []
+    for lines in (parse_size(size) for size in args.sizes.split(',')):
+        log_path = synthetic_log(args.workdir, lines, args.seed)
+        for chain, stage in ((chain, stage) for chain in STAGES for stage in STAGES[chain]):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run-chain', chain, '--run-stage', stage,
+                 '--log', log_path, '--lines', str(lines), '--workdir', args.workdir],
+                capture_output=True, text=True)
+            if output.returncode != 0:
+                print(f"{chain} {stage} failed at {lines} lines:\n{output.stderr}", file=sys.stderr)
+                sys.exit(1)
+            row = json.loads(output.stdout)
+            row['chain'] = chain
+            results.append(row)
+            print(f"{lines:>10} lines  {row['stage']:<22}{row['seconds']:>9.3f}s"
+                  f"{row['lines_per_sec'] or 0:>14,} lines/s{row['peak_rss_mb']:>10.1f} MB peak")
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'generated': datetime.now(timezone.utc).isoformat(timespec='seconds')
+        },
+        'results': results
+    }
+    # Compare first: the previous results may be the file about to be overwritten
+    if args.compare:
+        compare(args.compare, results)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Synthetic rpki-client log generator
+Produces console logs of any size with the message mix of the psql CSV
+samples: each error line is a sample line with a fresh timestamp, object
+file name and peer address, interleaved with routine non-error lines
+"""
+
+import os
+import re
+import sys
+import csv
+import gzip
+import time
+import random
+import argparse
+from typing import Iterator, List, Optional
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+SAMPLE_FILES = [
+    os.path.join(REPO_ROOT, 'psql', 'errors.csv'),
+    os.path.join(REPO_ROOT, 'psql', 'rpki_errors_20250928.csv'),
+]
+
+# Routine console lines that appear between the errors
+FILLER_LINES = [
+    "rpki-client: https://rrdp.ripe.net/notification.xml: pulling from network",
+    "rpki-client: https://rrdp.arin.net/notification.xml: pulling from network",
+    "rpki-client: rsync://rpki.afrinic.net/repository: pulling from network",
+    "rpki-client: https://rrdp.apnic.net/notification.xml: loaded from network",
+    "rpki-client: https://rrdp.lacnic.net/rrdp/notification.xml: loaded from network",
+    "rpki-client: all files parsed: generating output",
+]
+
+# Object file names (hex stem, RPKI suffix) and peer addresses in the samples
+OBJECT_RE = re.compile(r'/([0-9A-Fa-f]{8,})\.(roa|mft|crl|cer|gbr|asa|spl|tak)\b')
+ADDRESS_RE = re.compile(r' \((\d{1,3}(?:\.\d{1,3}){3})\)')
+TIMESTAMP_LEN = len('Sep 27 23:39:26')
+
+
+def load_templates(sample_files: List[str] = SAMPLE_FILES) -> List[str]:
+    """Sample lines without their timestamp, one per CSV row (so the mix is kept)"""
+    templates = []
+    for filepath in sample_files:
+        with open(filepath, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                templates.append(row['Message'][TIMESTAMP_LEN:])
+    return templates
+
+
+def iter_synthetic_lines(count: int, seed: int = 0, filler_ratio: float = 0.2,
+                         start: Optional[float] = None,
+                         templates: Optional[List[str]] = None) -> Iterator[str]:
+    """Yield count log lines (without newlines), deterministic for a seed.
+
+    filler_ratio of the lines are routine non-error lines. Timestamps
+    start at start (epoch seconds, default 2025-09-27 00:00 UTC) and
+    advance by 0-2 seconds per line.
+    """
+    rng = random.Random(seed)
+    templates = templates or load_templates()
+    now = 1758931200 if start is None else int(start)
+
+    def new_object(match):
+        digits = len(match.group(1))
+        return f"/{rng.getrandbits(4 * digits):0{digits}X}.{match.group(2)}"
+
+    def new_address(match):
+        return f" ({rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)})"
+
+    timestamp_second = None
+    timestamp = ''
+    for _ in range(count):
+        now += rng.randint(0, 2)
+        if now != timestamp_second:
+            timestamp_second = now
+            timestamp = time.strftime('%b %d %H:%M:%S', time.gmtime(now))
+        if rng.random() < filler_ratio:
+            yield f"{timestamp} {rng.choice(FILLER_LINES)}"
+            continue
+        template = rng.choice(templates)
+        if '/' in template:
+            template = OBJECT_RE.sub(new_object, template, count=1)
+        if ' (' in template:
+            template = ADDRESS_RE.sub(new_address, template, count=1)
+        yield timestamp + template
+
+
+def write_synthetic_log(filepath: str, count: int, seed: int = 0, filler_ratio: float = 0.2):
+    """Write a synthetic log to filepath ('-' for stdout, gzip if it ends in .gz)"""
+    if filepath == '-':
+        out = sys.stdout
+    elif filepath.endswith('.gz'):
+        out = gzip.open(filepath, 'wt', encoding='utf-8')
+    else:
+        out = open(filepath, 'w', encoding='utf-8')
+    try:
+        lines = iter_synthetic_lines(count, seed, filler_ratio)
+        while True:
+            chunk = [line for _, line in zip(range(10000), lines)]
+            if not chunk:
+                break
+            out.write('\n'.join(chunk) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic rpki-client log')
+    parser.add_argument('-n', '--lines', type=int, default=10000, help='Lines to generate (default: 10000)')
+    parser.add_argument('-o', '--output', default='-',
+                        help='Output file, - for stdout, .gz for gzip (default: -)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--filler-ratio', type=float, default=0.2,
+                        help='Fraction of routine non-error lines (default: 0.2)')
+    args = parser.parse_args()
+
+    write_synthetic_log(args.output, args.lines, args.seed, args.filler_ratio)
+
+
+if __name__ == '__main__':
+    main()
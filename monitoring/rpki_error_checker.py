@@ -6,18 +6,32 @@ This script fetches RPKI validation errors from console.rpki-client.org,
 categorizes them by CA operator, and sends notifications about the issues.
 """
 
+import os
 import re
+import sys
 import json
-import smtplib
 import requests
-from collections import defaultdict
+from collections import Counter, defaultdict
 from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dataclasses import dataclass
-from typing import List, Dict, Set
+from typing import List, Dict, Optional, Set
 import logging
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rpki_http import ConditionalFetcher, NotModified
+from rpki_history import ErrorHistory, ErrorTypeMatcher
+from rpki_parse_cache import MISSING, ParseCache
+from rpki_paths import PathIndex, strip_address
+from rpki_mailer import Mailer, OutgoingMail, format_latency
+from rpki_metrics import RunMetrics
+from rpki_report_state import ReportState
+from rpki_scheduler import CheckScheduler
+from rpki_query import ErrorIndex, QueryService
+from rpki_sources import DEFAULT_TIMEOUT, collect_sources, format_sources, load_sources
+from rpki_reports import count_sources, get_recommendations, render_report, render_reports, summarize_errors
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -31,15 +45,255 @@ class RPKIError:
     file_path: str
     error_message: str
     severity: str
+    # Comma separated names of the vantage points that reported the error
+    source: str = ""
+
+# Message substring (case-insensitive) -> error category, first match wins.
+# Used when the config has no "category_rules".
+DEFAULT_CATEGORY_RULES = {
+    "certificate has expired": "EXPIRED_CERTIFICATE",
+    "crl has expired": "EXPIRED_CRL",
+    "no valid manifest available": "INVALID_MANIFEST",
+    "seqnum gap detected": "SEQUENCE_GAP",
+    "certificate is not yet valid": "PREMATURE_CERTIFICATE",
+    "rfc 3779 resource not subset": "RESOURCE_VIOLATION",
+    "connect timeout": "CONNECTION_ERROR",
+    "connect refused": "CONNECTION_ERROR",
+    "no address associated": "DNS_ERROR",
+    "tls handshake": "TLS_ERROR",
+    "unexpected end of file": "FILE_ERROR"
+}
+
+class MessageClassifier:
+    """Category and severity rules compiled once into lowercase lookup tables.
+
+    classify() lowercases the message once and walks each table only up to
+    its first hit, which is the rule that the config lists first. A table
+    compiled into one alternation regex is slower here: re tries every
+    alternative at every position, while each `in` is a fast C substring
+    search (see benchmarks/bench_classify_message.py).
+    """
+    
+    def __init__(self, category_rules, severity_mapping,
+                 default_category="OTHER", default_severity="LOW"):
+        self.category_table = [(pattern.lower(), category)
+                               for pattern, category in category_rules.items()]
+        self.severity_table = [(pattern.lower(), severity)
+                               for pattern, severity in severity_mapping.items()]
+        self.default_category = default_category
+        self.default_severity = default_severity
+    
+    def classify(self, message):
+        """Return (category, severity) for an error message"""
+        message_lower = message.lower()
+        
+        category = self.default_category
+        for pattern, value in self.category_table:
+            if pattern in message_lower:
+                category = value
+                break
+        
+        severity = self.default_severity
+        for pattern, value in self.severity_table:
+            if pattern in message_lower:
+                severity = value
+                break
+        
+        return category, severity
+
+class CAContactIndex:
+    """Index of ca_contacts patterns as a trie of reversed DNS labels.
+
+    A repository is matched against the longest pattern that is a whole
+    label suffix of it (so rsync.paas.rpki.ripe.net wins over rpki.ripe.net
+    for its subdomains). Repositories with no label-suffix match fall back
+    to the longest pattern contained in them as a substring. Both matches
+    ignore case; lookups are memoized per repository.
+    """
+    
+    END = ''
+    
+    def __init__(self, patterns):
+        self.root = {}
+        for pattern in patterns:
+            node = self.root
+            for label in reversed(pattern.lower().split('.')):
+                node = node.setdefault(label, {})
+            node[self.END] = pattern
+        self.by_length = sorted(((pattern.lower(), pattern) for pattern in patterns),
+                                key=lambda item: len(item[0]), reverse=True)
+        self.cache = {}
+    
+    def lookup(self, repository):
+        """Return the most specific pattern matching repository, or None"""
+        if repository in self.cache:
+            return self.cache[repository]
+        
+        match = None
+        node = self.root
+        repository_lower = repository.lower()
+        for label in reversed(repository_lower.split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            match = node.get(self.END, match)
+        
+        if match is None:
+            match = next((pattern for lowered, pattern in self.by_length if lowered in repository_lower), None)
+        
+        self.cache[repository] = match
+        return match
+
+# rpki-client error lines: timestamp, object location, message
+ERROR_LINE_RE = re.compile(r'^(\w+\s+\d+\s+\d+:\d+:\d+)\s+rpki-client:\s+(.+?):\s+(.+)$')
+REPOSITORY_RE = re.compile(r'([\w.-]+\.[\w.-]+)')
+
+def merge_source_errors(source_errors):
+    """Merge (source name, errors) lists into one list tagged by source.
+
+    An error (repository, type, file, message) reported by several
+    sources is kept once, from the first source that reported it, with
+    every reporting source listed in its source field; repeats within
+    one source are all kept.
+    """
+    merged = []
+    kept = {}
+    for name, errors in source_errors:
+        added = {}
+        tagged = set()
+        for error in errors:
+            key = (error.repository, error.error_type, error.file_path, error.error_message)
+            earlier = kept.get(key)
+            if earlier is not None:
+                if key not in tagged:
+                    tagged.add(key)
+                    for seen in earlier:
+                        seen.source = f"{seen.source},{name}"
+                continue
+            error.source = name
+            added.setdefault(key, []).append(error)
+            merged.append(error)
+        kept.update(added)
+    return merged
 
 class RPKIErrorChecker:
     """Main class for checking RPKI errors and notifying CA operators"""
     
-    def __init__(self, config_file='config.json'):
-        """Initialize with configuration"""
-        self.config = self.load_config(config_file)
+    def __init__(self, config_file='config.json', dry_run=False):
+        """Initialize with configuration.
+
+        A dry run sends no email and persists neither the HTTP cache, the
+        report state nor the error history, so the next real run still
+        reports everything.
+        """
+        self.config_file = config_file
+        self.dry_run = dry_run
         self.errors = []
-        self.ca_contacts = self.config.get('ca_contacts', {})
+        # Sources that failed in the current check (see collect_source_errors)
+        self.failed_sources = []
+        self.fetcher = None
+        # Kept open between checks in daemon mode, see run_daemon
+        self.mailer = None
+        # Serves the latest check over HTTP in daemon mode, see start_query_service
+        self.query_service = None
+        # Stage timings and counters of the current run; profile_path
+        # enables cProfile for the fetch and parse stages
+        self.profile_path = None
+        self.metrics = RunMetrics('checker')
+        # Retried and new deliveries of the current run, for the latency metrics
+        self.deliveries = []
+        # Parses for this checker and an analyzer at once during
+        # run_check(analyzer=...); see rpki_pipeline.SharedIngest
+        self.ingest = None
+        self.configure(self.load_config(config_file))
+    
+    def configure(self, config):
+        """Build the matchers, caches and state that depend on the configuration.
+
+        Everything is built before any of it replaces the current objects,
+        so a configuration that fails (e.g. a missing key) changes nothing.
+        """
+        email = config["email"]
+        if self.dry_run:
+            email = dict(email, from_address="")
+        sources = load_sources(config.get('rpki_sources') or [config["rpki_console_url"]],
+                               config.get('http_timeout', DEFAULT_TIMEOUT))
+        ca_contacts = config.get('ca_contacts', {})
+        contact_index = CAContactIndex(ca_contacts)
+        classifier = MessageClassifier(config.get('category_rules', DEFAULT_CATEGORY_RULES),
+                                       config['severity_mapping'])
+        # Keep the HTTP session (and its keep-alive connection) across reloads
+        http_cache_file = None if self.dry_run else config.get('http_cache_file')
+        fetcher = self.fetcher
+        if fetcher is None or fetcher.cache_file != http_cache_file:
+            fetcher = ConditionalFetcher(http_cache_file)
+        # (category, severity) per message; the line pattern already strips
+        # the timestamp and object location, so the message is the template
+        parse_cache = ParseCache(config.get('parse_cache_size', 4096))
+        report_state = ReportState(config.get('report_state_file'), read_only=self.dry_run)
+        mailer = Mailer(email) if self.mailer is not None else None
+        
+        self.config = dict(config, email=email)
+        self.sources = sources
+        self.ca_contacts = ca_contacts
+        self.contact_index = contact_index
+        self.classifier = classifier
+        if self.fetcher is not None and self.fetcher is not fetcher:
+            self.fetcher.session.close()
+        self.fetcher = fetcher
+        self.parse_cache = parse_cache
+        self.report_state = report_state
+        if mailer is not None:
+            self.mailer.close()
+            self.mailer = mailer
+    
+    def reload_config(self):
+        """Re-read the configuration file, keeping the current one if it is unreadable"""
+        try:
+            with open(self.config_file, 'r') as f:
+                config = json.load(f)
+            self.configure(config)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Keeping the current configuration, reloading {self.config_file} failed: {e}")
+            return False
+        logger.info(f"Reloaded configuration from {self.config_file}")
+        return True
+    
+    def start_query_service(self):
+        """Start, move or stop the query service to match the configuration.
+
+        A port of 0 disables it. When the address changes (on reload) the
+        current results are served from the new address right away.
+        """
+        settings = self.config.get("query_service", {})
+        listen, port = settings.get("listen", "127.0.0.1"), settings.get("port", 0)
+        current = self.query_service
+        if current is not None and (current.listen, current.port) == (listen, port):
+            return
+        if current is not None:
+            current.stop()
+            self.query_service = None
+        if not port:
+            return
+        service = QueryService(listen, port)
+        try:
+            service.start()
+        except OSError as e:
+            logger.error(f"Query service could not listen on {listen}:{port}: {e}")
+            return
+        if current is not None and current.index is not None:
+            service.publish(current.index)
+        self.query_service = service
+    
+    def close(self):
+        """Close pooled SMTP sessions, the HTTP session and the query service"""
+        if self.query_service is not None:
+            self.query_service.stop()
+            self.query_service = None
+        if self.mailer is not None:
+            self.mailer.close()
+            self.mailer = None
+        self.fetcher.session.close()
         
     def load_config(self, config_file):
         """Load configuration from JSON file"""
@@ -54,12 +308,36 @@ class RPKIErrorChecker:
         """Return default configuration"""
         return {
             "rpki_console_url": "https://console.rpki-client.org/",
+            "rpki_sources": [],
+            "http_timeout": 30,
+            "http_cache_file": "rpki_http_cache.json",
+            "history_db": "",
+            "parse_cache_size": 4096,
+            "report_state_file": "rpki_report_state.json",
+            "metrics_textfile": "",
+            "metrics_json": "",
+            "daemon": {
+                "interval": 21600,
+                "jitter": 600,
+                "run_at_start": True
+            },
+            "query_service": {
+                "listen": "127.0.0.1",
+                "port": 0,
+                "max_errors_per_host": 100
+            },
             "email": {
                 "smtp_server": "localhost",
                 "smtp_port": 587,
                 "username": "",
                 "password": "",
-                "from_address": "rpki-monitor@example.com"
+                "from_address": "rpki-monitor@example.com",
+                "pool_size": 4,
+                "timeout": 30,
+                "retry_queue_dir": "rpki_mail_queue",
+                "retry_base_delay": 300,
+                "retry_max_delay": 21600,
+                "retry_max_attempts": 8
             },
             "ca_contacts": {
                 "rpki.ripe.net": ["noc@ripe.net"],
@@ -73,6 +351,7 @@ class RPKIErrorChecker:
                 "rpki.cnnic.cn": ["service@cnnic.cn"],
                 "rpki-repo.registro.br": ["hostmaster@registro.br"]
             },
+            "category_rules": dict(DEFAULT_CATEGORY_RULES),
             "severity_mapping": {
                 "certificate has expired": "HIGH",
                 "CRL has expired": "HIGH",
@@ -89,39 +368,80 @@ class RPKIErrorChecker:
         }
     
     def fetch_rpki_console_data(self):
-        """Fetch the raw RPKI console output"""
+        """Fetch the RPKI console output as a stream of lines.
+
+        Raises NotModified when the page is unchanged since the last check.
+        """
+        source = self.sources[0]
         try:
-            response = requests.get(self.config["rpki_console_url"], timeout=30)
-            response.raise_for_status()
-            return response.text
+            return self.fetcher.iter_lines(source.url, source.timeout)
         except requests.RequestException as e:
             logger.error(f"Failed to fetch RPKI console data: {e}")
             return None
     
-    def parse_rpki_errors(self, console_data):
-        """Parse RPKI errors from console output"""
+    def collect_source_errors(self) -> Optional[List[RPKIError]]:
+        """Fetch and parse every configured source concurrently and merge their errors.
+
+        Returns None if no source could be fetched and raises NotModified
+        if none changed; unchanged sources are fetched again when another
+        one changed, so that every CA's error set stays complete. Sources
+        that failed are listed in self.failed_sources.
+        """
+        def consume(source, lines):
+            return self.parse_rpki_errors(lines, source.name)
+        
+        results = collect_sources(self.sources, self.fetcher, consume)
+        if any(result.ok for result in results) and any(result.not_modified for result in results):
+            unchanged = [result.source for result in results if result.not_modified]
+            refetched = {result.source.name: result
+                         for result in collect_sources(unchanged, self.fetcher, consume, conditional=False)}
+            results = [refetched.get(result.source.name, result) for result in results]
+        logger.info(f"Sources: {format_sources(results)}")
+        
+        for result in results:
+            self.metrics.add('lines_scanned', result.lines)
+            self.metrics.set('source_success', 0 if result.error is not None else 1,
+                             source=result.source.name)
+            self.metrics.set('source_duration_seconds', result.seconds, source=result.source.name)
+        
+        if not any(result.ok for result in results):
+            if all(result.error is not None for result in results):
+                logger.error("No source could be fetched")
+                return None
+            raise NotModified(', '.join(source.url for source in self.sources))
+        self.failed_sources = [result.source.name for result in results if result.error is not None]
+        if self.failed_sources:
+            logger.warning(f"Partial check without {', '.join(self.failed_sources)}: "
+                           f"errors they reported before are kept, none count as resolved")
+        return merge_source_errors([(result.source.name, result.value)
+                                    for result in results if result.ok])
+    
+    def parse_rpki_errors(self, console_data, source=None):
+        """Parse RPKI errors from console output (a string or an iterable of lines).
+
+        During a shared check the lines also feed the analyzer, tagged
+        with source (see run_check).
+        """
         if not console_data:
             return []
         
         # Split into lines and find error lines
-        lines = console_data.split('\n')
+        lines = console_data.split('\n') if isinstance(console_data, str) else console_data
+        if self.ingest is not None:
+            return self.ingest.parse_errors(lines, source)
         errors = []
         
-        # Pattern to match rpki-client error lines
-        error_pattern = r'^(\w+\s+\d+\s+\d+:\d+:\d+)\s+rpki-client:\s+(.+?):\s+(.+)$'
-        
         for line in lines:
-            match = re.match(error_pattern, line.strip())
+            match = ERROR_LINE_RE.match(line.strip())
             if match:
                 timestamp, location, message = match.groups()
                 
                 # Extract repository from location
-                repo_match = re.search(r'([\w.-]+\.[\w.-]+)', location)
+                repo_match = REPOSITORY_RE.search(location)
                 repository = repo_match.group(1) if repo_match else "unknown"
                 
                 # Determine error type and severity
-                error_type = self.categorize_error(message)
-                severity = self.determine_severity(message)
+                error_type, severity = self.classify_message(message)
                 
                 error = RPKIError(
                     timestamp=timestamp,
@@ -135,42 +455,21 @@ class RPKIErrorChecker:
         
         return errors
     
+    def classify_message(self, message):
+        """Return (category, severity) for a message through the parse cache"""
+        classified = self.parse_cache.get(message)
+        if classified is MISSING:
+            classified = self.classifier.classify(message)
+            self.parse_cache.put(message, classified)
+        return classified
+    
     def categorize_error(self, message):
         """Categorize the error based on the message"""
-        message_lower = message.lower()
-        
-        if "certificate has expired" in message_lower:
-            return "EXPIRED_CERTIFICATE"
-        elif "crl has expired" in message_lower:
-            return "EXPIRED_CRL"
-        elif "no valid manifest available" in message_lower:
-            return "INVALID_MANIFEST"
-        elif "seqnum gap detected" in message_lower:
-            return "SEQUENCE_GAP"
-        elif "certificate is not yet valid" in message_lower:
-            return "PREMATURE_CERTIFICATE"
-        elif "rfc 3779 resource not subset" in message_lower:
-            return "RESOURCE_VIOLATION"
-        elif "connect timeout" in message_lower or "connect refused" in message_lower:
-            return "CONNECTION_ERROR"
-        elif "no address associated" in message_lower:
-            return "DNS_ERROR"
-        elif "tls handshake" in message_lower:
-            return "TLS_ERROR"
-        elif "unexpected end of file" in message_lower:
-            return "FILE_ERROR"
-        else:
-            return "OTHER"
+        return self.classifier.classify(message)[0]
     
     def determine_severity(self, message):
         """Determine severity based on error message"""
-        message_lower = message.lower()
-        
-        for pattern, severity in self.config["severity_mapping"].items():
-            if pattern.lower() in message_lower:
-                return severity
-        
-        return "LOW"
+        return self.classifier.classify(message)[1]
     
     def group_errors_by_ca(self, errors):
         """Group errors by CA operator"""
@@ -188,122 +487,100 @@ class RPKIErrorChecker:
         return ca_errors
     
     def get_ca_contact(self, repository):
-        """Get CA contact email(s) for a repository"""
-        # Direct match
-        if repository in self.ca_contacts:
-            return repository
-        
-        # Pattern matching for subdomains
-        for pattern, contacts in self.ca_contacts.items():
-            if pattern in repository or repository.endswith(pattern):
-                return pattern
-        
-        return None
+        """Get the most specific ca_contacts entry for a repository"""
+        return self.contact_index.lookup(repository)
     
-    def generate_report(self, ca_errors):
-        """Generate detailed error reports for each CA"""
-        reports = {}
-        
-        for ca, errors in ca_errors.items():
-            # Group by error type and severity
-            error_summary = defaultdict(lambda: defaultdict(list))
-            
-            for error in errors:
-                error_summary[error.severity][error.error_type].append(error)
-            
-            # Generate report text
-            report = self.format_report(ca, error_summary, errors)
-            reports[ca] = report
-        
-        return reports
+    def generate_report(self, ca_errors, generated=None):
+        """Generate detailed error reports for each CA as strings.
+
+        Reports list at most notification_settings.max_errors_per_report
+        messages and are rendered in notification_settings.report_workers
+        processes (default 1). generated is the time shown in the reports.
+        """
+        settings = self.config.get("notification_settings", {})
+        generated = generated or datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
+        return render_reports(ca_errors, generated, settings.get("max_errors_per_report"),
+                              settings.get("report_workers", 1))
     
-    def format_report(self, ca, error_summary, all_errors):
-        """Format a detailed error report for a CA"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
-        
-        report = f"""
-RPKI Validation Errors Report
-=============================
-CA/Repository: {ca}
-Generated: {timestamp}
-Total Errors: {len(all_errors)}
+    def format_report(self, ca, error_summary, all_errors, generated=None):
+        """Format a detailed error report for a CA.
 
-EXECUTIVE SUMMARY
-================
-"""
-        
-        # Summary by severity
-        for severity in ["HIGH", "MEDIUM", "LOW"]:
-            if severity in error_summary:
-                count = sum(len(errors) for errors in error_summary[severity].values())
-                report += f"{severity} Priority: {count} errors\n"
-        
-        report += "\nDETAILED BREAKDOWN\n"
-        report += "==================\n"
-        
-        # Detailed breakdown by severity and type
-        for severity in ["HIGH", "MEDIUM", "LOW"]:
-            if severity in error_summary:
-                report += f"\n{severity} PRIORITY ISSUES:\n"
-                report += "-" * (len(severity) + 18) + "\n"
-                
-                for error_type, errors in error_summary[severity].items():
-                    report += f"\n{error_type} ({len(errors)} occurrences):\n"
-                    
-                    # Group similar errors
-                    grouped = defaultdict(list)
-                    for error in errors:
-                        key = error.error_message
-                        grouped[key].append(error)
-                    
-                    for message, error_list in grouped.items():
-                        report += f"  • {message}\n"
-                        if len(error_list) > 1:
-                            report += f"    Affected files: {len(error_list)}\n"
-                        else:
-                            report += f"    File: {error_list[0].file_path}\n"
-        
-        report += "\nRECOMMENDED ACTIONS\n"
-        report += "===================\n"
-        report += self.get_recommendations(error_summary)
-        
-        report += "\n\nCONTACT INFORMATION\n"
-        report += "===================\n"
-        report += "This report was generated by an automated RPKI monitoring system.\n"
-        report += "For questions or assistance, please contact: rpki-monitor@example.com\n"
-        
-        return report
+        error_summary maps severity -> error type -> errors, as built by
+        generate_report before rpki_reports.
+        """
+        errors = [error for types in error_summary.values() for type_errors in types.values()
+                  for error in type_errors]
+        return self.render_ca_report(ca, errors, generated, total=len(all_errors))
+    
+    def render_ca_report(self, ca, errors, generated=None, total=None):
+        """Render one CA's report from its errors in this process"""
+        settings = self.config.get("notification_settings", {})
+        generated = generated or datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
+        return render_report(ca, summarize_errors(errors), len(errors) if total is None else total,
+                             generated, settings.get("max_errors_per_report"), count_sources(errors))
     
     def get_recommendations(self, error_summary):
         """Generate recommendations based on error types"""
-        recommendations = []
-        
-        if "HIGH" in error_summary:
-            if "EXPIRED_CERTIFICATE" in error_summary["HIGH"]:
-                recommendations.append("• URGENT: Renew expired certificates immediately to restore RPKI validation")
-            if "EXPIRED_CRL" in error_summary["HIGH"]:
-                recommendations.append("• URGENT: Update Certificate Revocation Lists (CRLs)")
-            if "RESOURCE_VIOLATION" in error_summary["HIGH"]:
-                recommendations.append("• URGENT: Fix resource certification - certificates contain resources not authorized by parent")
-        
-        if "MEDIUM" in error_summary:
-            if "INVALID_MANIFEST" in error_summary["MEDIUM"]:
-                recommendations.append("• Update or republish manifest files")
-            if "SEQUENCE_GAP" in error_summary["MEDIUM"]:
-                recommendations.append("• Check manifest sequence numbers for gaps")
-            if "TLS_ERROR" in error_summary["MEDIUM"]:
-                recommendations.append("• Review TLS configuration and certificates")
-        
-        if "LOW" in error_summary:
-            if "CONNECTION_ERROR" in error_summary["LOW"]:
-                recommendations.append("• Check network connectivity and firewall configurations")
-            if "DNS_ERROR" in error_summary["LOW"]:
-                recommendations.append("• Verify DNS configuration for repository hostnames")
-        
-        if not recommendations:
-            recommendations.append("• Review specific error messages for appropriate corrective actions")
-        
-        return "\n".join(recommendations)
+        return get_recommendations(error_summary)
+    
+    def build_email(self, ca, report, contacts):
+        """Render the report mail for a CA"""
+        msg = MIMEMultipart()
+        msg['From'] = self.config["email"]["from_address"]
+        msg['To'] = ", ".join(contacts)
+        msg['Subject'] = f"RPKI Validation Errors - {ca} - {datetime.now().strftime('%Y-%m-%d')}"
+        
+        msg.attach(MIMEText(report, 'plain'))
+        return OutgoingMail(ca, msg['From'], list(contacts), msg.as_string())
+    
+    def send_email_reports(self, mails):
+        """Send report mails concurrently over pooled SMTP sessions.
+
+        Failures are queued for retry with backoff (see rpki_mailer and
+        retry_queued_emails).
+        """
+        if not self.config["email"]["from_address"]:
+            if mails:
+                logger.warning("Email not configured. Skipping email notification.")
+            return []
+        if not mails:
+            return []
+        
+        mailer = self.mailer or Mailer(self.config["email"])
+        try:
+            results = mailer.send_all(mails)
+        finally:
+            if mailer is not self.mailer:
+                mailer.close()
+        logger.info(f"Email delivery: {format_latency(results)}")
+        self.record_deliveries(results)
+        return results
+    
+    def retry_queued_emails(self):
+        """Resend queued report mails whose backoff has expired.
+
+        Called on every check (see run_check), whether or not the console
+        changed, so queued mails don't wait for the next changed page.
+        """
+        if not self.config["email"]["from_address"]:
+            return []
+        
+        mailer = self.mailer or Mailer(self.config["email"])
+        try:
+            retried = mailer.flush_retries()
+        finally:
+            if mailer is not self.mailer:
+                mailer.close()
+        if retried:
+            logger.info(f"Retried queued emails: {format_latency(retried)}")
+        self.record_deliveries(retried)
+        return retried
+    
+    def record_deliveries(self, results):
+        self.deliveries.extend(results)
+        self.metrics.add('emails_sent', sum(1 for result in results if result.ok))
+        self.metrics.add('emails_failed', sum(1 for result in results if not result.ok))
+        self.metrics.observe_latencies('email_latency_seconds', [result.latency for result in self.deliveries])
     
     def send_email_report(self, ca, report, contacts):
         """Send email report to CA contacts"""
@@ -311,36 +588,37 @@ EXECUTIVE SUMMARY
             logger.warning("Email not configured. Skipping email notification.")
             return False
         
+        results = self.send_email_reports([self.build_email(ca, report, contacts)])
+        return bool(results) and results[0].ok
+    
+    def write_metrics(self, success):
+        """Finish the run's metrics and write the configured textfile/JSON"""
+        self.metrics.finish(success)
         try:
-            msg = MIMEMultipart()
-            msg['From'] = self.config["email"]["from_address"]
-            msg['To'] = ", ".join(contacts)
-            msg['Subject'] = f"RPKI Validation Errors - {ca} - {datetime.now().strftime('%Y-%m-%d')}"
-            
-            msg.attach(MIMEText(report, 'plain'))
-            
-            # Send email
-            smtp_server = smtplib.SMTP(
-                self.config["email"]["smtp_server"], 
-                self.config["email"]["smtp_port"]
-            )
-            
-            if self.config["email"]["username"]:
-                smtp_server.starttls()
-                smtp_server.login(
-                    self.config["email"]["username"], 
-                    self.config["email"]["password"]
-                )
-            
-            smtp_server.send_message(msg)
-            smtp_server.quit()
-            
-            logger.info(f"Email report sent to {contacts} for {ca}")
-            return True
-            
+            self.metrics.write(self.config.get("metrics_textfile"), self.config.get("metrics_json"))
+        except OSError as e:
+            logger.error(f"Failed to write metrics: {e}")
+    
+    def save_history(self, errors):
+        """Append errors to the SQLite error history, if configured.
+
+        Errors are stored under the analyzer's error types (see
+        rpki_history), not the configured categories, so both tools'
+        rows of the same error coincide.
+        """
+        db_path = self.config.get("history_db")
+        if not db_path or self.dry_run:
+            return
+        matcher = ErrorTypeMatcher()
+        rows = ((error.timestamp, error.repository, error_type, error.severity,
+                 strip_address(error.file_path), error.error_message)
+                for error in errors for error_type in matcher.error_types(error.error_message))
+        try:
+            with ErrorHistory(db_path) as history:
+                inserted = history.add_errors(rows)
+            logger.info(f"{inserted} new errors stored in history {db_path}")
         except Exception as e:
-            logger.error(f"Failed to send email to {contacts} for {ca}: {e}")
-            return False
+            logger.error(f"Failed to store errors in history {db_path}: {e}")
     
     def save_report_to_file(self, ca, report):
         """Save report to file"""
@@ -354,49 +632,188 @@ EXECUTIVE SUMMARY
             logger.error(f"Failed to save report to {filename}: {e}")
             return None
     
-    def run_check(self):
-        """Main method to run the complete check and notification process"""
+    def run_check(self, only_changed=True, analyzer=None):
+        """Main method to run the complete check and notification process.
+
+        With an RPKIErrorAnalyzer, the fetched lines are parsed once for
+        both (rpki_pipeline.SharedIngest): the analyzer's counters and the
+        per-CA reports come from the same records. Its lines_scanned stays
+        0 when nothing changed. Queued mails are retried first either way.
+        """
+        self.metrics = RunMetrics('checker', self.profile_path)
+        self.deliveries = []
+        if analyzer is not None:
+            from rpki_pipeline import SharedIngest
+            self.ingest = SharedIngest(analyzer, self)
+        try:
+            with self.metrics.stage('email'):
+                self.retry_queued_emails()
+            success = self.check_and_report(only_changed)
+        finally:
+            self.ingest = None
+        self.write_metrics(success)
+        return success
+    
+    def run_daemon(self, only_changed=True):
+        """Run checks on the configured interval until SIGTERM/SIGINT.
+
+        Config, matchers, the HTTP session and the SMTP pool stay warm
+        between checks. SIGHUP reloads the configuration file. A stop
+        request lets the running check finish its deliveries; messages
+        that failed are already in the retry queue for the next start.
+        With query_service.port set, the results of the latest check are
+        served over HTTP (see rpki_query).
+        """
+        self.mailer = Mailer(self.config["email"])
+        self.start_query_service()
+        
+        def schedule():
+            settings = self.config.get("daemon", {})
+            return settings.get("interval", 21600), settings.get("jitter", 0)
+        
+        def reload():
+            if self.reload_config():
+                self.start_query_service()
+        
+        scheduler = CheckScheduler(lambda: self.run_check(only_changed), reload,
+                                   schedule, self.config.get("daemon", {}).get("run_at_start", True))
+        scheduler.install_signal_handlers()
+        logger.info(f"Daemon started (pid {os.getpid()})")
+        try:
+            checks = scheduler.run()
+        finally:
+            self.close()
+        logger.info(f"Daemon stopped after {checks} checks")
+    
+    def check_and_report(self, only_changed=True):
+        """Fetch, parse and report one version of the console page"""
         logger.info("Starting RPKI error check...")
+        self.failed_sources = []
+        if len(self.sources) > 1:
+            return self.check_sources(only_changed)
         
         # Fetch console data
-        console_data = self.fetch_rpki_console_data()
+        try:
+            with self.metrics.stage('fetch', profile=True):
+                console_data = self.fetch_rpki_console_data()
+        except NotModified:
+            logger.info("RPKI console unchanged since the last check, nothing to do")
+            return True
         if not console_data:
             logger.error("No console data available")
             return False
         
-        # Parse errors
-        self.errors = self.parse_rpki_errors(console_data)
-        logger.info(f"Found {len(self.errors)} RPKI errors")
+        # Parse errors while the page is still downloading
+        try:
+            with self.metrics.stage('parse', profile=True):
+                self.errors = self.parse_rpki_errors(self.metrics.count_lines(console_data))
+        except requests.RequestException as e:
+            logger.error(f"Failed to fetch RPKI console data: {e}")
+            return False
+        logger.info(f"Parse cache: {self.parse_cache.format_stats()}")
+        self.report_errors(only_changed)
         
-        if not self.errors:
-            logger.info("No errors found")
+        # Only now treat this version of the page as handled
+        self.fetcher.save_cache()
+        
+        logger.info("RPKI error check completed")
+        return True
+    
+    def check_sources(self, only_changed=True):
+        """Fetch, parse and report several vantage points as one check"""
+        try:
+            with self.metrics.stage('fetch', profile=True):
+                errors = self.collect_source_errors()
+        except NotModified:
+            logger.info("No source changed since the last check, nothing to do")
             return True
+        if errors is None:
+            return False
+        self.errors = errors
+        logger.info(f"Parse cache: {self.parse_cache.format_stats()}")
+        self.report_errors(only_changed)
         
-        # Group by CA
-        ca_errors = self.group_errors_by_ca(self.errors)
-        logger.info(f"Errors grouped into {len(ca_errors)} CA operators")
+        # Only now treat these versions of the pages as handled
+        self.fetcher.save_cache()
         
-        # Generate and send reports
-        reports = self.generate_report(ca_errors)
+        logger.info("RPKI error check completed")
+        return True
+    
+    def report_errors(self, only_changed=True):
+        """Record self.errors, then save and send the per-CA reports.
+
+        With only_changed, reports are only generated for CAs whose set of
+        (repository, error type, file) differs from the one last reported.
+        When sources failed, errors missing from this check are not taken
+        as resolved (see ReportState.diff).
+        """
+        logger.info(f"Found {len(self.errors)} RPKI errors")
+        self.metrics.set('lines_matched', len(self.errors))
+        for (category, severity), count in Counter(
+                (error.error_type, error.severity) for error in self.errors).items():
+            self.metrics.set('checker_errors', count, category=category, severity=severity)
+        with self.metrics.stage('history'):
+            self.save_history(self.errors)
         
-        for ca, report in reports.items():
-            logger.info(f"Processing report for {ca}")
-            
-            # Save to file
-            self.save_report_to_file(ca, report)
-            
-            # Get contacts and send email
-            if ca in self.ca_contacts:
-                contacts = self.ca_contacts[ca]
-                self.send_email_report(ca, report, contacts)
-            else:
-                logger.warning(f"No contact information found for {ca}")
+        # Group by CA
+        with self.metrics.stage('group'):
+            ca_errors = self.group_errors_by_ca(self.errors)
+        if ca_errors:
+            logger.info(f"Errors grouped into {len(ca_errors)} CA operators")
+        if self.query_service is not None:
+            with self.metrics.stage('index'):
+                max_errors = self.config.get("query_service", {}).get("max_errors_per_host", 100)
+                self.query_service.publish(ErrorIndex(ca_errors, self.ca_contacts, max_errors=max_errors))
+        
+        # Compare with the last reported error sets
+        with self.metrics.stage('diff'):
+            deltas = self.report_state.diff(ca_errors, partial=bool(self.failed_sources))
+        for delta in deltas.values():
+            if delta.changed:
+                logger.info(f"{delta.ca}: {delta.new} new, {delta.resolved} resolved, "
+                            f"{delta.persisting} persisting")
+        reported = [delta for delta in deltas.values() if delta.changed or not only_changed]
+        
+        # Render each report once, for its file and its mail; with one
+        # worker only the report being saved is held in memory
+        selected = {delta.ca: ca_errors[delta.ca] for delta in reported if delta.ca in ca_errors}
+        generated = datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
+        rendered = {}
+        if self.config.get("notification_settings", {}).get("report_workers", 1) > 1:
+            with self.metrics.stage('render'):
+                rendered = self.generate_report(selected, generated)
+        mailing = bool(self.config["email"]["from_address"])
+        
+        mails = []
+        with self.metrics.stage('save'):
+            for ca, errors in selected.items():
+                logger.info(f"Processing report for {ca}")
+                report = rendered.pop(ca, None) or self.render_ca_report(ca, errors, generated)
+                
+                # Save to file
+                self.save_report_to_file(ca, report)
+                
+                # Get contacts and queue the email
+                if ca in self.ca_contacts:
+                    if mailing:
+                        mails.append(self.build_email(ca, report, self.ca_contacts[ca]))
+                else:
+                    logger.warning(f"No contact information found for {ca}")
+        
+        with self.metrics.stage('email'):
+            self.send_email_reports(mails)
         
         # Generate summary
-        self.generate_summary_report(ca_errors)
+        if not self.errors:
+            logger.info("No errors found")
+        elif selected:
+            with self.metrics.stage('summary'):
+                self.generate_summary_report(ca_errors)
+        else:
+            logger.info("No CA error sets changed since the last report")
         
-        logger.info("RPKI error check completed")
-        return True
+        self.report_state.update(reported)
+        self.report_state.save()
     
     def generate_summary_report(self, ca_errors):
         """Generate a summary report of all errors"""
@@ -426,6 +843,18 @@ BREAKDOWN BY CA:
                 if severity_counts[severity] > 0:
                     summary += f"  {severity}: {severity_counts[severity]}\n"
         
+        # Which CA inside a repository is broken, not just which repository
+        paths = PathIndex()
+        for errors in ca_errors.values():
+            for error in errors:
+                paths.add(error.file_path, (error.error_type,), error.severity)
+        summary += "\nMOST BROKEN CA DIRECTORIES:\n"
+        for directory in paths.top_directories(limit=10):
+            severities = ", ".join(f"{severity} {count}" for severity, count
+                                   in directory['by_severity'].items())
+            summary += (f"  {directory['path']}: {directory['errors']} errors in "
+                        f"{directory['objects']} objects ({severities})\n")
+        
         # Save summary
         filename = f"rpki_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
         try:
@@ -446,19 +875,49 @@ def main():
                        help='Configuration file path (default: config.json)')
     parser.add_argument('--dry-run', action='store_true',
                        help='Run without sending emails')
+    parser.add_argument('--all-cas', action='store_true',
+                       help='Report every CA, not only those whose errors changed since the last report')
+    parser.add_argument('--profile',
+                       help='Write cProfile stats of the fetch and parse stages to this file')
+    parser.add_argument('--daemon', action='store_true',
+                       help='Keep running and check on the configured interval (SIGHUP reloads the config)')
+    parser.add_argument('--analyze', action='store_true',
+                       help="Also print rpki_error_analyzer's summary, from the same fetch and parse")
+    parser.add_argument('--analyzer-json', help="Also export the analyzer's results to this JSON file")
+    parser.add_argument('--analyzer-csv', help="Also export the analyzer's error details to this CSV file")
     
     args = parser.parse_args()
+    analyze = args.analyze or args.analyzer_json or args.analyzer_csv
+    if analyze and args.daemon:
+        parser.error('--analyze, --analyzer-json and --analyzer-csv apply to a single check')
     
-    # Create checker instance
-    checker = RPKIErrorChecker(args.config)
+    # Create checker instance; a dry run sends no email and doesn't mark
+    # the current page or error sets as already reported
+    checker = RPKIErrorChecker(args.config, dry_run=args.dry_run)
+    checker.profile_path = args.profile
     
     if args.dry_run:
-        # Disable email sending for dry run
-        checker.config["email"]["from_address"] = ""
         logger.info("Running in dry-run mode - no emails will be sent")
     
-    # Run the check
-    success = checker.run_check()
+    if args.daemon:
+        checker.run_daemon(only_changed=not args.all_cas)
+        return
+    
+    # Run the check, feeding the analyzer from the same parse if asked
+    analyzer = None
+    if analyze:
+        from rpki_error_analyzer import RPKIErrorAnalyzer
+        analyzer = RPKIErrorAnalyzer(checker.config.get('parse_cache_size', 4096))
+    success = checker.run_check(only_changed=not args.all_cas, analyzer=analyzer)
+    checker.close()
+    
+    if success and analyzer is not None and analyzer.lines_scanned:
+        if args.analyze:
+            analyzer.print_summary()
+        if args.analyzer_json:
+            analyzer.export_json(args.analyzer_json)
+        if args.analyzer_csv:
+            analyzer.export_csv(args.analyzer_csv)
     
     if success:
         print("RPKI error check completed successfully")
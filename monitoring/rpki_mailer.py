@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+RPKI Report Mail Delivery
+Pooled SMTP sessions shared by concurrent senders, with failed messages
+kept in an on-disk retry queue and resent with exponential backoff
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import smtplib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutgoingMail:
+    """A rendered message and its envelope"""
+    ca: str
+    sender: str
+    recipients: List[str]
+    text: str
+
+
+@dataclass
+class DeliveryResult:
+    """Outcome of one delivery attempt; latency covers waiting for a session"""
+    ca: str
+    recipients: List[str]
+    ok: bool
+    latency: float
+    error: Optional[str] = None
+    attempts: int = field(default=1)
+    permanent: bool = False
+
+
+def is_permanent(error: smtplib.SMTPException) -> bool:
+    """True for a 5xx rejection of the message, which a retry won't change"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return getattr(error, 'smtp_code', 0) >= 500
+
+
+class SMTPPool:
+    """At most size logged-in SMTP sessions, reused across messages.
+
+    A session is checked with NOOP before reuse and dropped if the server
+    has closed it; a session that fails while sending is discarded rather
+    than returned to the pool.
+    """
+
+    def __init__(self, host: str, port: int, username: str = '', password: str = '',
+                 size: int = 4, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(size)
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+
+    def _open(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.username:
+                smtp.starttls()
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._discard(smtp)
+            raise
+        self.opened += 1
+        return smtp
+
+    def _discard(self, smtp: smtplib.SMTP):
+        try:
+            smtp.close()
+        except Exception:
+            pass
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                smtp = self.idle.get_nowait()
+            except queue.Empty:
+                return self._open()
+            try:
+                if smtp.noop()[0] == 250:
+                    return smtp
+            except smtplib.SMTPException:
+                pass
+            self._discard(smtp)
+
+    @contextmanager
+    def session(self) -> Iterator[smtplib.SMTP]:
+        """Borrow a session, blocking while all size sessions are in use"""
+        with self.slots:
+            smtp = self._checkout()
+            try:
+                yield smtp
+            except Exception:
+                self._discard(smtp)
+                raise
+            self.idle.put(smtp)
+
+    def close(self):
+        """QUIT every idle session"""
+        while True:
+            try:
+                smtp = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                smtp.quit()
+            except Exception:
+                self._discard(smtp)
+
+
+class RetryQueue:
+    """Directory of undelivered messages, one JSON file each.
+
+    A message that fails is retried after base_delay seconds, doubling on
+    each further failure up to max_delay; after max_attempts, or at once
+    when the server rejects it permanently, it is moved to the failed/
+    subdirectory for manual inspection.
+    """
+
+    def __init__(self, directory: str, base_delay: float = 300, max_delay: float = 21600,
+                 max_attempts: int = 8):
+        self.directory = directory
+        self.failed_directory = os.path.join(directory, 'failed')
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        os.makedirs(self.failed_directory, exist_ok=True)
+
+    def _write(self, path: str, entry: Dict):
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_file, path)
+
+    def backoff(self, attempts: int) -> float:
+        return min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+
+    def _entry(self, mail: OutgoingMail, error: str, attempts: int) -> Dict:
+        return {
+            'ca': mail.ca,
+            'sender': mail.sender,
+            'recipients': mail.recipients,
+            'text': mail.text,
+            'attempts': attempts,
+            'last_error': error
+        }
+
+    def add(self, mail: OutgoingMail, error: str, attempts: int = 1, now: Optional[float] = None):
+        """Queue a message that has failed attempts times"""
+        now = time.time() if now is None else now
+        entry = self._entry(mail, error, attempts)
+        entry['next_attempt'] = now + self.backoff(attempts)
+        name = f"{int(now)}-{uuid.uuid4().hex}.json"
+        self._write(os.path.join(self.directory, name), entry)
+
+    def fail(self, mail: OutgoingMail, error: str, attempts: int = 1, now: Optional[float] = None):
+        """Put a permanently rejected message straight into failed/"""
+        now = time.time() if now is None else now
+        name = f"{int(now)}-{uuid.uuid4().hex}.json"
+        self._write(os.path.join(self.failed_directory, name), self._entry(mail, error, attempts))
+        logger.error(f"Giving up on report for {mail.ca}, rejected permanently: {error}")
+
+    def due(self, now: Optional[float] = None) -> List[Tuple[str, Dict]]:
+        """(path, entry) of queued messages whose backoff has expired"""
+        now = time.time() if now is None else now
+        entries = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, 'r') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable queued message {path}: {e}")
+                continue
+            if entry['next_attempt'] <= now:
+                entries.append((path, entry))
+        return entries
+
+    def remove(self, path: str):
+        os.remove(path)
+
+    def reschedule(self, path: str, entry: Dict, error: str, now: Optional[float] = None,
+                   permanent: bool = False):
+        """Record another failed attempt, giving up after max_attempts or
+        on a permanent rejection"""
+        now = time.time() if now is None else now
+        entry['attempts'] += 1
+        entry['last_error'] = error
+        if permanent or entry['attempts'] >= self.max_attempts:
+            self._write(os.path.join(self.failed_directory, os.path.basename(path)), entry)
+            os.remove(path)
+            logger.error(f"Giving up on report for {entry['ca']} after {entry['attempts']} attempts: {error}")
+            return
+        entry['next_attempt'] = now + self.backoff(entry['attempts'])
+        self._write(path, entry)
+
+    def __len__(self) -> int:
+        return sum(1 for name in os.listdir(self.directory) if name.endswith('.json'))
+
+
+class Mailer:
+    """Sends report mails concurrently over an SMTPPool.
+
+    email_config is the checker's "email" section; pool_size, timeout,
+    retry_queue_dir, retry_base_delay, retry_max_delay and
+    retry_max_attempts are optional. Without retry_queue_dir failed
+    messages are only logged.
+    """
+
+    def __init__(self, email_config: Dict):
+        self.pool_size = email_config.get('pool_size', 4)
+        self.pool = SMTPPool(email_config['smtp_server'], email_config['smtp_port'],
+                             email_config.get('username', ''), email_config.get('password', ''),
+                             self.pool_size, email_config.get('timeout', 30))
+        queue_dir = email_config.get('retry_queue_dir')
+        self.retry_queue = RetryQueue(queue_dir,
+                                      email_config.get('retry_base_delay', 300),
+                                      email_config.get('retry_max_delay', 21600),
+                                      email_config.get('retry_max_attempts', 8)) if queue_dir else None
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def deliver(self, mail: OutgoingMail) -> DeliveryResult:
+        """Send one message over a pooled session"""
+        start = time.perf_counter()
+        error = None
+        permanent = False
+        try:
+            with self.pool.session() as smtp:
+                try:
+                    smtp.sendmail(mail.sender, mail.recipients, mail.text)
+                except (smtplib.SMTPSenderRefused, smtplib.SMTPRecipientsRefused,
+                        smtplib.SMTPDataError) as e:
+                    # The server rejected this message; the session stays usable
+                    error = str(e)
+                    permanent = is_permanent(e)
+        except (smtplib.SMTPException, OSError) as e:
+            error = str(e)
+        return DeliveryResult(mail.ca, mail.recipients, error is None, time.perf_counter() - start, error,
+                              permanent=permanent)
+
+    def send_all(self, mails: Iterable[OutgoingMail]) -> List[DeliveryResult]:
+        """Deliver messages pool_size at a time; failures go to the retry queue"""
+        mails = list(mails)
+        if not mails:
+            return []
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            results = list(executor.map(self.deliver, mails))
+        for mail, result in zip(mails, results):
+            if result.ok:
+                logger.info(f"Email report sent to {mail.recipients} for {mail.ca} in {result.latency:.3f}s")
+                continue
+            logger.error(f"Failed to send email to {mail.recipients} for {mail.ca}: {result.error}")
+            if self.retry_queue is None:
+                continue
+            if result.permanent:
+                self.retry_queue.fail(mail, result.error)
+            else:
+                self.retry_queue.add(mail, result.error)
+        return results
+
+    def flush_retries(self, now: Optional[float] = None) -> List[DeliveryResult]:
+        """Resend queued messages whose backoff has expired"""
+        if self.retry_queue is None:
+            return []
+        due = self.retry_queue.due(now)
+        if not due:
+            return []
+        mails = [OutgoingMail(entry['ca'], entry['sender'], entry['recipients'], entry['text'])
+                 for _, entry in due]
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            results = list(executor.map(self.deliver, mails))
+        for (path, entry), result in zip(due, results):
+            result.attempts = entry['attempts'] + 1
+            if result.ok:
+                self.retry_queue.remove(path)
+                logger.info(f"Queued report for {entry['ca']} sent on attempt {result.attempts} "
+                            f"in {result.latency:.3f}s")
+            else:
+                self.retry_queue.reschedule(path, entry, result.error, now, result.permanent)
+        return results
+
+
+def format_latency(results: List[DeliveryResult]) -> str:
+    """One-line delivery summary with median and worst per-message latency"""
+    if not results:
+        return "no messages"
+    latencies = sorted(result.latency for result in results)
+    sent = sum(1 for result in results if result.ok)
+    return (f"{sent}/{len(results)} delivered, latency median {latencies[len(latencies) // 2]:.3f}s, "
+            f"max {latencies[-1]:.3f}s")
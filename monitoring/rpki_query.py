@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+RPKI Query Service
+Small HTTP/JSON service that answers "what's wrong with host X" and
+"which hosts have error Y" from the latest check, using responses
+precomputed per host, error type, severity and CA contact, plus
+drill-downs into repository paths from a rolled-up path index
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from rpki_paths import PathIndex
+
+logger = logging.getLogger(__name__)
+
+# Path prefix -> the ErrorIndex dictionary answering it
+COLLECTIONS = {
+    'hosts': 'by_host',
+    'types': 'by_type',
+    'severities': 'by_severity',
+    'cas': 'by_ca',
+}
+
+
+def encode(document) -> bytes:
+    return json.dumps(document, indent=2).encode('utf-8') + b'\n'
+
+
+def count_by(errors, attribute: str) -> Dict[str, int]:
+    """Errors per value of attribute, largest first"""
+    counts = {}
+    for error in errors:
+        value = getattr(error, attribute)
+        counts[value] = counts.get(value, 0) + 1
+    return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+
+class ErrorIndex:
+    """Immutable snapshot of one check, every response already JSON encoded.
+
+    Built once per check from the errors grouped by CA (as the checker
+    reports them); lookups are then a dictionary access. Hostnames are
+    case-insensitive, so hosts are keyed in lowercase; error types,
+    severities and CA contacts keep their exact spelling and fall back
+    to a case-insensitive match when that is unambiguous. Hosts list at
+    most max_errors individual errors each; all counts are complete.
+    """
+
+    def __init__(self, ca_errors: Dict[str, List], ca_contacts: Dict[str, List[str]],
+                 generated: Optional[str] = None, max_errors: int = 100):
+        self.generated = generated or datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        hosts: Dict[str, List] = {}
+        host_ca: Dict[str, str] = {}
+        types: Dict[str, List] = {}
+        severities: Dict[str, List] = {}
+        total = 0
+        for ca, errors in ca_errors.items():
+            total += len(errors)
+            for error in errors:
+                host = error.repository.lower()
+                hosts.setdefault(host, []).append(error)
+                host_ca[host] = ca
+                types.setdefault(error.error_type, []).append(error)
+                severities.setdefault(error.severity, []).append(error)
+
+        self.by_host = {host: encode({
+            'host': host,
+            'ca': host_ca[host],
+            'contacts': ca_contacts.get(host_ca[host], []),
+            'errors_total': len(errors),
+            'by_type': count_by(errors, 'error_type'),
+            'by_severity': count_by(errors, 'severity'),
+            'errors': [self.describe(error) for error in errors[:max_errors]],
+            'generated': self.generated
+        }) for host, errors in hosts.items()}
+        self.by_type = {error_type: encode({
+            'error_type': error_type,
+            'errors_total': len(errors),
+            'hosts': count_by(errors, 'repository'),
+            'generated': self.generated
+        }) for error_type, errors in types.items()}
+        self.by_severity = {severity: encode({
+            'severity': severity,
+            'errors_total': len(errors),
+            'hosts': count_by(errors, 'repository'),
+            'by_type': count_by(errors, 'error_type'),
+            'generated': self.generated
+        }) for severity, errors in severities.items()}
+        self.by_ca = {ca: encode({
+            'ca': ca,
+            'contacts': ca_contacts.get(ca, []),
+            'errors_total': len(errors),
+            'hosts': count_by(errors, 'repository'),
+            'by_type': count_by(errors, 'error_type'),
+            'by_severity': count_by(errors, 'severity'),
+            'generated': self.generated
+        }) for ca, errors in ca_errors.items()}
+        self.paths = PathIndex()
+        for errors in ca_errors.values():
+            for error in errors:
+                self.paths.add(error.file_path, (error.error_type,), error.severity)
+        # Path drill-downs are computed on first request, then reused
+        self.path_answers: Dict[Tuple, bytes] = {}
+        self.listings = {name: encode(sorted(getattr(self, attribute)))
+                         for name, attribute in COLLECTIONS.items()}
+        # Lowercased key -> the exact keys it folds, for case-insensitive fallback
+        self.folded: Dict[str, Dict[str, List[str]]] = {}
+        for attribute in COLLECTIONS.values():
+            folded = self.folded[attribute] = {}
+            for key in getattr(self, attribute):
+                folded.setdefault(key.lower(), []).append(key)
+        self.summary = encode({
+            'generated': self.generated,
+            'errors_total': total,
+            'hosts': len(hosts),
+            'cas': len(ca_errors),
+            'by_type': {error_type: len(errors) for error_type, errors in
+                        sorted(types.items(), key=lambda item: -len(item[1]))},
+            'by_severity': {severity: len(errors) for severity, errors in severities.items()}
+        })
+
+    @staticmethod
+    def describe(error) -> Dict[str, str]:
+        described = {
+            'timestamp': error.timestamp,
+            'error_type': error.error_type,
+            'severity': error.severity,
+            'file_path': error.file_path,
+            'message': error.error_message
+        }
+        if error.source:
+            described['source'] = error.source
+        return described
+
+    def lookup_path(self, prefix: str, query: str) -> Tuple[int, bytes]:
+        """Totals under a repository path prefix, its largest children and its
+        most broken CA directories (?severity=HIGH ranks by one severity, ?limit=N)"""
+        params = parse_qs(query)
+        severity = params.get('severity', [None])[0]
+        try:
+            limit = min(int(params.get('limit', ['20'])[0]), 1000)
+        except ValueError:
+            return 400, encode({'error': 'limit must be a number'})
+        key = (prefix, severity, limit)
+        answer = self.path_answers.get(key)
+        if answer is None:
+            described = self.paths.describe(prefix, limit, severity)
+            if described is None:
+                return 404, encode({'error': f"no errors under {prefix}", 'generated': self.generated})
+            described['top_ca_directories'] = self.paths.top_directories(prefix, limit, severity)
+            described['generated'] = self.generated
+            answer = encode(described)
+            if len(self.path_answers) >= 1024:
+                self.path_answers.clear()
+            self.path_answers[key] = answer
+        return 200, answer
+
+    def lookup(self, path: str) -> Tuple[int, bytes]:
+        """(HTTP status, JSON body) for a request path"""
+        url = urlsplit(path)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        if parts == ['']:
+            return 200, self.summary
+        if parts[0] == 'paths':
+            return self.lookup_path('/'.join(parts[1:]), url.query)
+        if len(parts) == 1 and parts[0] in self.listings:
+            return 200, self.listings[parts[0]]
+        if len(parts) == 2 and parts[0] in COLLECTIONS:
+            attribute = COLLECTIONS[parts[0]]
+            answers = getattr(self, attribute)
+            body = answers.get(parts[1])
+            if body is not None:
+                return 200, body
+            keys = self.folded[attribute].get(parts[1].lower(), [])
+            if len(keys) == 1:
+                return 200, answers[keys[0]]
+            missing = {'error': f"no errors for {parts[0][:-1]} {parts[1]}", 'generated': self.generated}
+            if keys:
+                missing['error'] = f"{parts[1]} matches several {parts[0]}, ask for one exactly"
+                missing['matches'] = sorted(keys)
+            return 404, encode(missing)
+        return 404, encode({'error': 'unknown path', 'paths': ['/', '/hosts/<host>', '/types/<type>',
+                                                               '/severities/<severity>', '/cas/<ca>',
+                                                               '/paths/<repository path prefix>']})
+
+
+class QueryServer(ThreadingHTTPServer):
+    # Dashboards poll in bursts; the default backlog of 5 makes clients retry SYNs
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class QueryService:
+    """Serves the current ErrorIndex over HTTP from a background thread.
+
+    publish() replaces the index with a single reference assignment, so a
+    request is answered entirely from either the old or the new snapshot
+    and readers never wait for a refresh.
+    """
+
+    def __init__(self, listen: str = '127.0.0.1', port: int = 8787):
+        self.listen = listen
+        self.port = port
+        self.index: Optional[ErrorIndex] = None
+        self.server: Optional[QueryServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def publish(self, index: ErrorIndex):
+        self.index = index
+
+    def respond(self, path: str) -> Tuple[int, bytes]:
+        index = self.index
+        if index is None:
+            return 503, encode({'error': 'no check has completed yet'})
+        return index.lookup(path)
+
+    def start(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = service.respond(self.path)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Query {self.address_string()}: {format % args}")
+
+        self.server = QueryServer((self.listen, self.port), Handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='rpki-query', daemon=True)
+        self.thread.start()
+        logger.info(f"Query service listening on http://{self.listen}:{self.port}/")
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
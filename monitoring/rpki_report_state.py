@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+RPKI Report State
+Per-CA fingerprints of the last reported error set, so that a run only
+reports CAs whose errors changed since the previous one
+"""
+
+import os
+import json
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def error_key(repository: str, error_type: str, file_path: str) -> int:
+    """Signed 64-bit hash of the (repository, error_type, file_path) identity of an error"""
+    digest = hashlib.blake2b('\x1f'.join((repository, error_type, file_path)).encode('utf-8'),
+                             digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def fingerprint(keys: List[int]) -> str:
+    """Order-independent fingerprint of a set of error keys (keys must be sorted)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for key in keys:
+        digest.update(key.to_bytes(8, 'big', signed=True))
+    return digest.hexdigest()
+
+
+@dataclass
+class CADelta:
+    """How a CA's error set differs from the one last reported"""
+    ca: str
+    new: int
+    resolved: int
+    persisting: int
+    fingerprint: str
+    keys: List[int]
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.new or self.resolved)
+
+
+class ReportState:
+    """Last reported fingerprint and error keys per CA, kept in a JSON file.
+
+    Without a state file every CA counts as new and nothing is persisted.
+    A read_only state (dry runs) is loaded and diffed but never saved.
+    """
+
+    def __init__(self, state_file: Optional[str] = None, read_only: bool = False):
+        self.state_file = state_file
+        self.read_only = read_only
+        self.cas = self.load()
+
+    def load(self) -> Dict[str, Dict]:
+        if not self.state_file:
+            return {}
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f).get('cas', {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable report state {self.state_file}: {e}")
+            return {}
+
+    def save(self):
+        """Persist the state, replacing the state file atomically"""
+        if not self.state_file or self.read_only:
+            return
+        tmp_file = f"{self.state_file}.tmp"
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump({'cas': self.cas}, f)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logger.warning(f"Failed to save report state {self.state_file}: {e}")
+
+    def diff(self, ca_errors, partial: bool = False) -> Dict[str, CADelta]:
+        """Deltas for every CA with errors now or at the last report.
+
+        partial means some sources could not be checked: errors missing
+        now may only be unseen, so nothing counts as resolved and every
+        CA keeps its last reported errors in addition to its new ones.
+        """
+        deltas = {}
+        for ca, errors in ca_errors.items():
+            keys = sorted({error_key(error.repository, error.error_type, error.file_path)
+                           for error in errors})
+            current = fingerprint(keys)
+            previous = self.cas.get(ca)
+            if previous is None:
+                deltas[ca] = CADelta(ca, len(keys), 0, 0, current, keys)
+            elif previous['fingerprint'] == current:
+                deltas[ca] = CADelta(ca, 0, 0, len(keys), current, keys)
+            else:
+                previous_keys = set(previous['keys'])
+                if partial:
+                    keys = sorted(previous_keys.union(keys))
+                    deltas[ca] = CADelta(ca, len(keys) - len(previous_keys), 0, len(previous_keys),
+                                         fingerprint(keys), keys)
+                    continue
+                persisting = sum(1 for key in keys if key in previous_keys)
+                deltas[ca] = CADelta(ca, len(keys) - persisting, len(previous_keys) - persisting,
+                                     persisting, current, keys)
+
+        for ca, previous in self.cas.items():
+            if ca not in ca_errors:
+                if partial:
+                    deltas[ca] = CADelta(ca, 0, 0, len(previous['keys']), previous['fingerprint'],
+                                         previous['keys'])
+                else:
+                    deltas[ca] = CADelta(ca, 0, len(previous['keys']), 0, fingerprint([]), [])
+        return deltas
+
+    def update(self, deltas: List[CADelta]):
+        """Record deltas as reported; CAs left without errors are forgotten"""
+        reported = datetime.now().isoformat(timespec='seconds')
+        for delta in deltas:
+            if delta.keys:
+                self.cas[delta.ca] = {'fingerprint': delta.fingerprint, 'keys': delta.keys,
+                                      'reported': reported}
+            else:
+                self.cas.pop(delta.ca, None)
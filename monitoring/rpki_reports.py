@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+RPKI Per-CA Report Rendering
+Groups a CA's errors in one pass and writes its report straight to a
+stream, optionally rendering many CAs in parallel worker processes
+"""
+
+import io
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from typing import Dict, Optional, TextIO, Tuple
+
+SEVERITIES = ("HIGH", "MEDIUM", "LOW")
+
+def summarize_errors(errors) -> Dict[str, Dict[str, Tuple[Dict[str, int], Dict[str, str]]]]:
+    """severity -> error_type -> (occurrences per message, first file path per message).
+
+    Types and messages keep the order in which they first occur.
+    """
+    groups = defaultdict(lambda: defaultdict(list))
+    for error in errors:
+        groups[error.severity][error.error_type].append(error)
+
+    summary = {}
+    for severity, types in groups.items():
+        summary[severity] = {}
+        for error_type, type_errors in types.items():
+            counts = {}
+            paths = {}
+            for error in type_errors:
+                message = error.error_message
+                if message in counts:
+                    counts[message] += 1
+                else:
+                    counts[message] = 1
+                    paths[message] = error.file_path
+            summary[severity][error_type] = (counts, paths)
+    return summary
+
+
+def count_sources(errors) -> Dict[str, int]:
+    """Errors seen from each vantage point (empty for single-source errors)"""
+    counts = {}
+    for error in errors:
+        if error.source:
+            for name in error.source.split(','):
+                counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+def get_recommendations(error_summary) -> str:
+    """Generate recommendations based on error types"""
+    recommendations = []
+
+    if "HIGH" in error_summary:
+        if "EXPIRED_CERTIFICATE" in error_summary["HIGH"]:
+            recommendations.append("• URGENT: Renew expired certificates immediately to restore RPKI validation")
+        if "EXPIRED_CRL" in error_summary["HIGH"]:
+            recommendations.append("• URGENT: Update Certificate Revocation Lists (CRLs)")
+        if "RESOURCE_VIOLATION" in error_summary["HIGH"]:
+            recommendations.append("• URGENT: Fix resource certification - certificates contain resources not authorized by parent")
+
+    if "MEDIUM" in error_summary:
+        if "INVALID_MANIFEST" in error_summary["MEDIUM"]:
+            recommendations.append("• Update or republish manifest files")
+        if "SEQUENCE_GAP" in error_summary["MEDIUM"]:
+            recommendations.append("• Check manifest sequence numbers for gaps")
+        if "TLS_ERROR" in error_summary["MEDIUM"]:
+            recommendations.append("• Review TLS configuration and certificates")
+
+    if "LOW" in error_summary:
+        if "CONNECTION_ERROR" in error_summary["LOW"]:
+            recommendations.append("• Check network connectivity and firewall configurations")
+        if "DNS_ERROR" in error_summary["LOW"]:
+            recommendations.append("• Verify DNS configuration for repository hostnames")
+
+    if not recommendations:
+        recommendations.append("• Review specific error messages for appropriate corrective actions")
+
+    return "\n".join(recommendations)
+
+
+def write_report(out: TextIO, ca: str, summary, total: int, generated: str,
+                 max_errors: Optional[int] = None, sources: Optional[Dict[str, int]] = None):
+    """Write a CA's report to out.
+
+    max_errors caps the messages listed in the detailed breakdown; the
+    rest of each type is replaced with a single '... not shown' line.
+    Counts in the summary and section headings always cover every error.
+    sources (from count_sources) adds the errors seen per vantage point.
+    """
+    write = out.write
+    seen_from = ''
+    if sources:
+        seen_from = "Seen From: " + ", ".join(f"{name} ({count})" for name, count in sources.items()) + "\n"
+    write(f"""
+RPKI Validation Errors Report
+=============================
+CA/Repository: {ca}
+Generated: {generated}
+Total Errors: {total}
+{seen_from}
+EXECUTIVE SUMMARY
+================
+""")
+
+    # Summary by severity
+    for severity in SEVERITIES:
+        if severity in summary:
+            count = sum(sum(counts.values()) for counts, _ in summary[severity].values())
+            write(f"{severity} Priority: {count} errors\n")
+
+    write("\nDETAILED BREAKDOWN\n")
+    write("==================\n")
+
+    # Detailed breakdown by severity and type
+    budget = max_errors
+    for severity in SEVERITIES:
+        if severity not in summary:
+            continue
+        write(f"\n{severity} PRIORITY ISSUES:\n")
+        write("-" * (len(severity) + 18) + "\n")
+
+        for error_type, (counts, paths) in summary[severity].items():
+            write(f"\n{error_type} ({sum(counts.values())} occurrences):\n")
+
+            shown = counts.items()
+            if budget is not None:
+                shown = list(islice(shown, max(budget, 0)))
+                budget -= len(shown)
+            for message, count in shown:
+                if count > 1:
+                    write(f"  • {message}\n    Affected files: {count}\n")
+                else:
+                    write(f"  • {message}\n    File: {paths[message]}\n")
+            if len(shown) < len(counts):
+                write(f"  ... {len(counts) - len(shown)} more messages not shown "
+                      f"(max_errors_per_report)\n")
+
+    write("\nRECOMMENDED ACTIONS\n")
+    write("===================\n")
+    write(get_recommendations(summary))
+
+    write("\n\nCONTACT INFORMATION\n")
+    write("===================\n")
+    write("This report was generated by an automated RPKI monitoring system.\n")
+    write("For questions or assistance, please contact: rpki-monitor@example.com\n")
+
+
+def render_report(ca: str, summary, total: int, generated: str,
+                  max_errors: Optional[int] = None, sources: Optional[Dict[str, int]] = None) -> str:
+    """Render a CA's report from its summary (runs in worker processes)"""
+    out = io.StringIO()
+    write_report(out, ca, summary, total, generated, max_errors, sources)
+    return out.getvalue()
+
+
+def render_reports(ca_errors: Dict[str, list], generated: str,
+                   max_errors: Optional[int] = None, workers: int = 1) -> Dict[str, str]:
+    """Render every CA's report from its RPKIError list.
+
+    Errors are summarized here; with workers > 1 the summaries, which hold
+    each distinct message once, are formatted in that many processes.
+    """
+    summaries = {ca: summarize_errors(errors) for ca, errors in ca_errors.items()}
+    totals = [len(ca_errors[ca]) for ca in summaries]
+    sources = [count_sources(ca_errors[ca]) for ca in summaries]
+    if workers <= 1 or len(summaries) <= 1:
+        return {ca: render_report(ca, summary, total, generated, max_errors, seen)
+                for (ca, summary), total, seen in zip(summaries.items(), totals, sources)}
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(summaries))) as executor:
+        texts = executor.map(render_report, summaries, summaries.values(), totals,
+                             repeat(generated), repeat(max_errors), sources)
+        return dict(zip(summaries, texts))
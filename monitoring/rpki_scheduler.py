@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+RPKI Check Scheduler
+Runs the checker repeatedly inside one long-lived process, on an interval
+with random jitter, reloading on SIGHUP and stopping cleanly on SIGTERM/SIGINT
+"""
+
+import time
+import random
+import signal
+import logging
+import threading
+from typing import Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CheckScheduler:
+    """Calls check() every interval seconds plus up to jitter seconds.
+
+    schedule() returns the current (interval, jitter) and is asked again
+    before every wait, so a reload can change them. Signals only set
+    flags: a reload requested during a check is applied once the check
+    returns, and a stop request lets the check in progress finish
+    (including its email delivery) before run() returns.
+    """
+
+    def __init__(self, check: Callable[[], bool], reload: Callable[[], None],
+                 schedule: Callable[[], Tuple[float, float]], run_at_start: bool = True):
+        self.check = check
+        self.reload = reload
+        self.schedule = schedule
+        self.run_at_start = run_at_start
+        self.stopping = threading.Event()
+        self.wake = threading.Event()
+        self.reload_requested = False
+        self.checks = 0
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        signal.signal(signal.SIGHUP, self.request_reload)
+
+    def request_stop(self, signum=None, frame=None):
+        logger.info("Stop requested, finishing the current check")
+        self.stopping.set()
+        self.wake.set()
+
+    def request_reload(self, signum=None, frame=None):
+        self.reload_requested = True
+        self.wake.set()
+
+    def next_delay(self) -> float:
+        interval, jitter = self.schedule()
+        return interval + random.uniform(0, jitter)
+
+    def wait(self, seconds: float):
+        """Sleep until seconds have passed or a signal asks for attention"""
+        self.wake.wait(seconds)
+        self.wake.clear()
+
+    def run(self) -> int:
+        """Run checks until stopped; returns the number of checks run"""
+        next_run = time.monotonic() if self.run_at_start else time.monotonic() + self.next_delay()
+        while not self.stopping.is_set():
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+                next_run = min(next_run, time.monotonic() + self.next_delay())
+
+            remaining = next_run - time.monotonic()
+            if remaining > 0:
+                self.wait(remaining)
+                continue
+
+            try:
+                if not self.check():
+                    logger.warning("Check failed, retrying at the next interval")
+            except Exception:
+                logger.exception("Check raised, retrying at the next interval")
+            self.checks += 1
+
+            delay = self.next_delay()
+            next_run = time.monotonic() + delay
+            if not self.stopping.is_set():
+                logger.info(f"Next check in {delay:.0f}s")
+        return self.checks
@@ -32,6 +32,8 @@ echo ""
 echo "4. Schedule regular checks with cron:"
 echo "   # Add to crontab (runs every 6 hours):"
 echo "   0 */6 * * * /path/to/rpki_env/bin/python /path/to/rpki_checker.py"
+echo "   Or run it as a daemon that schedules checks itself (kill -HUP reloads config):"
+echo "   /path/to/rpki_env/bin/python /path/to/rpki_checker.py --daemon"
 echo ""
 echo "5. Check generated reports:"
 echo "   ls -la rpki_report_*.txt"
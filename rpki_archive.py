@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+RPKI Error Columnar Archive
+Append-only, memory-mapped numpy columns of error occurrences with a
+string dictionary, plus vectorized group-by aggregation over them
+"""
+
+import os
+import re
+import sys
+import csv
+import json
+import time
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+from rpki_history import SEVERITY_CODES, SEVERITY_NAMES, parse_syslog_timestamp
+
+# Column name -> numpy dtype; each column is a raw little-endian file
+COLUMNS = {
+    'epoch': np.dtype('<i8'),
+    'host': np.dtype('<i4'),
+    'error_type': np.dtype('<i2'),
+    'severity': np.dtype('<i1'),
+}
+GROUP_KEYS = ('host', 'error_type', 'severity', 'bucket')
+
+# Stored for records without a parsable timestamp or host
+MISSING = -1
+
+
+class ErrorArchive:
+    """Directory of append-only column files plus strings.json.
+
+    strings.json maps host and error type ids to names; it is replaced
+    atomically before the columns are appended, so ids in the columns
+    always resolve. It also records the digest of every appended batch,
+    so importing the same CSV export or analyzer run twice does not
+    count its errors twice. Columns are opened with np.memmap, so
+    aggregations page in only what they touch.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.strings = self._load_strings()
+        self.host_ids = {name: i for i, name in enumerate(self.strings['hosts'])}
+        self.type_ids = {name: i for i, name in enumerate(self.strings['error_types'])}
+        self._repair()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load_strings(self) -> Dict[str, List[str]]:
+        try:
+            with open(self._path('strings.json'), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'hosts': [], 'error_types': [], 'batches': {}}
+
+    def _save_strings(self):
+        tmp_file = self._path('strings.json.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(self.strings, f)
+        os.replace(tmp_file, self._path('strings.json'))
+
+    def _rows_on_disk(self, name: str) -> int:
+        try:
+            return os.path.getsize(self._path(f'{name}.col')) // COLUMNS[name].itemsize
+        except FileNotFoundError:
+            return 0
+
+    def _repair(self):
+        """Truncate columns to a common length after an interrupted append,
+        and forget batches that did not make it into the columns"""
+        rows = min(self._rows_on_disk(name) for name in COLUMNS)
+        for name, dtype in COLUMNS.items():
+            path = self._path(f'{name}.col')
+            if os.path.exists(path) and os.path.getsize(path) != rows * dtype.itemsize:
+                with open(path, 'r+b') as f:
+                    f.truncate(rows * dtype.itemsize)
+        batches = self.strings.setdefault('batches', {})
+        lost = [digest for digest, batch in batches.items() if batch['end'] > rows]
+        for digest in lost:
+            del batches[digest]
+        if lost:
+            self._save_strings()
+
+    def __len__(self) -> int:
+        return self._rows_on_disk('epoch')
+
+    def _code(self, names: List[str], ids: Dict[str, int], name: Optional[str]) -> int:
+        if name is None:
+            return MISSING
+        if name not in ids:
+            ids[name] = len(names)
+            names.append(name)
+        return ids[name]
+
+    def append(self, rows: Iterable[Tuple], now: Optional[float] = None,
+               source: Optional[str] = None) -> int:
+        """Append (timestamp, host, error_type, severity) rows; returns the count.
+
+        Syslog timestamps are converted to epoch seconds relative to now
+        (see parse_syslog_timestamp); integers are taken as epoch seconds.
+        A batch whose encoded rows were appended before is skipped and
+        counts 0; source names it in strings.json.
+        """
+        epochs = {}
+        columns = {name: [] for name in COLUMNS}
+        for timestamp, host, error_type, severity in rows:
+            if timestamp not in epochs:
+                epochs[timestamp] = (timestamp if isinstance(timestamp, int)
+                                     else parse_syslog_timestamp(timestamp, now))
+            epoch = epochs[timestamp]
+            columns['epoch'].append(MISSING if epoch is None else epoch)
+            columns['host'].append(self._code(self.strings['hosts'], self.host_ids, host))
+            columns['error_type'].append(
+                self._code(self.strings['error_types'], self.type_ids, error_type))
+            columns['severity'].append(SEVERITY_CODES.get(severity, 0))
+
+        count = len(columns['epoch'])
+        if not count:
+            return 0
+        # Ids never change within an archive, so equal rows encode to equal bytes
+        encoded = {name: np.asarray(columns[name], dtype=dtype).tobytes() for name, dtype in COLUMNS.items()}
+        digest = hashlib.sha256(b''.join(encoded.values())).hexdigest()
+        batches = self.strings['batches']
+        if digest in batches:
+            return 0
+        batches[digest] = {'source': source, 'rows': count, 'end': len(self) + count}
+        self._save_strings()
+        for name in COLUMNS:
+            with open(self._path(f'{name}.col'), 'ab') as f:
+                f.write(encoded[name])
+        return count
+
+    def append_csv(self, filepath: str) -> int:
+        """Append an analyzer CSV export (Timestamp,Host,Error_Type,Severity,Message).
+
+        The year of its timestamps is anchored on a YYYYMMDD date in the
+        file name (e.g. rpki_errors_20250928.csv), else its modification time.
+        """
+        match = re.search(r'(\d{8})', os.path.basename(filepath))
+        try:
+            now = datetime.strptime(match.group(1), '%Y%m%d').replace(
+                tzinfo=timezone.utc).timestamp() + 86400 if match else None
+        except ValueError:
+            now = None
+        if now is None:
+            now = os.path.getmtime(filepath)
+        with open(filepath, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            return self.append(((row['Timestamp'], row['Host'] or None,
+                                 row['Error_Type'], row['Severity']) for row in reader), now,
+                               f"{os.path.basename(filepath)} ({os.path.getsize(filepath)} bytes)")
+
+    def column(self, name: str) -> np.ndarray:
+        """Memory-mapped, read-only view of a column"""
+        rows = len(self)
+        if rows == 0:
+            return np.empty(0, dtype=COLUMNS[name])
+        return np.memmap(self._path(f'{name}.col'), dtype=COLUMNS[name], mode='r', shape=(rows,))
+
+    def aggregate(self, by: Sequence[str] = ('host', 'error_type'), bucket_seconds: int = 86400,
+                  since: Optional[int] = None, until: Optional[int] = None,
+                  severity: Optional[str] = None, error_type: Optional[str] = None,
+                  host: Optional[str] = None) -> List[Dict]:
+        """Count errors grouped by any of host, error_type, severity and time bucket.
+
+        Filters and grouping run as numpy array operations; only the
+        resulting groups are turned into Python dicts, largest first.
+        Buckets are epoch seconds of the bucket start.
+        """
+        unknown = set(by) - set(GROUP_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown group-by keys: {', '.join(sorted(unknown))}")
+
+        epoch = self.column('epoch')
+        mask = np.ones(len(epoch), dtype=bool)
+        if since is not None:
+            mask &= epoch >= since
+        if until is not None:
+            mask &= epoch < until
+        if severity is not None:
+            mask &= self.column('severity') == SEVERITY_CODES[severity]
+        if error_type is not None:
+            mask &= self.column('error_type') == self.type_ids.get(error_type, -2)
+        if host is not None:
+            mask &= self.column('host') == self.host_ids.get(host, -2)
+
+        if not by:
+            return [{'count': int(mask.sum())}]
+
+        keys = []
+        for key in by:
+            if key == 'bucket':
+                values = epoch[mask]
+                keys.append(np.where(values == MISSING, MISSING, values // bucket_seconds * bucket_seconds))
+            else:
+                keys.append(self.column(key)[mask].astype(np.int64))
+
+        if not keys[0].size:
+            return []
+
+        # Factorize each key, then count a single combined int64 key
+        uniques, inverses = zip(*(np.unique(values, return_inverse=True) for values in keys))
+        dims = tuple(len(u) for u in uniques)
+        combined, counts = np.unique(np.ravel_multi_index(inverses, dims), return_counts=True)
+        positions = np.unravel_index(combined, dims)
+        order = np.argsort(-counts, kind='stable')
+        return [self._decode(by, [int(uniques[k][positions[k][i]]) for k in range(len(by))],
+                             int(counts[i]))
+                for i in order]
+
+    def _decode(self, by: Sequence[str], group: List[int], count: int) -> Dict:
+        row = {}
+        for key, value in zip(by, group):
+            if value == MISSING:
+                row[key] = None
+            elif key == 'host':
+                row[key] = self.strings['hosts'][value]
+            elif key == 'error_type':
+                row[key] = self.strings['error_types'][value]
+            elif key == 'severity':
+                row[key] = SEVERITY_NAMES[value]
+            else:
+                row[key] = datetime.fromtimestamp(value, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        row['count'] = count
+        return row
+
+
+def parse_date(value: str) -> int:
+    """YYYY-MM-DD (UTC) to epoch seconds"""
+    return int(datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Columnar RPKI error archive')
+    parser.add_argument('archive', help='Archive directory')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='Append analyzer CSV exports')
+    import_parser.add_argument('files', nargs='+', help='CSV files written by rpki_error_analyzer.py --csv')
+
+    agg_parser = subparsers.add_parser('aggregate', help='Count errors by group')
+    agg_parser.add_argument('--by', default='host,error_type',
+                            help=f"Comma separated group keys from {', '.join(GROUP_KEYS)}")
+    agg_parser.add_argument('--bucket', type=int, default=86400,
+                            help='Time bucket size in seconds (default: 86400)')
+    agg_parser.add_argument('--since', type=parse_date, help='Start date, YYYY-MM-DD')
+    agg_parser.add_argument('--until', type=parse_date, help='End date (exclusive), YYYY-MM-DD')
+    agg_parser.add_argument('--severity', choices=list(SEVERITY_CODES), help='Only this severity')
+    agg_parser.add_argument('--error-type', help='Only this error type')
+    agg_parser.add_argument('--host', help='Only this host')
+    agg_parser.add_argument('--limit', type=int, default=50, help='Rows to print (default: 50)')
+
+    args = parser.parse_args()
+    archive = ErrorArchive(args.archive)
+
+    if args.command == 'import':
+        for filepath in args.files:
+            appended = archive.append_csv(filepath)
+            print(f"{filepath}: {appended} rows" if appended else f"{filepath}: nothing new (already archived or empty)")
+        print(f"Archive now holds {len(archive)} rows")
+        return
+
+    by = [key.strip() for key in args.by.split(',') if key.strip()]
+    start = time.perf_counter()
+    try:
+        rows = archive.aggregate(by, args.bucket, args.since, args.until,
+                                 args.severity, args.error_type, args.host)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    for row in rows[:args.limit]:
+        print('  '.join(f"{key}={row[key]}" for key in by), f"count={row['count']}")
+    print(f"{len(rows)} groups over {len(archive)} rows in {elapsed:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
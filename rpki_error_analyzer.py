@@ -4,90 +4,462 @@ RPKI-Client Error Log Analyzer
 Analyzes error output from rpki-client console logs
 """
 
+import io
+import os
 import re
 import sys
+import bz2
+import glob
+import gzip
 import json
+import lzma
+import time
 import argparse
+from array import array
 from collections import defaultdict, Counter
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
 import requests
 from urllib.parse import urlparse
 
-class RPKIErrorAnalyzer:
-    def __init__(self):
-        self.error_patterns = {
-            'connection_timeout': r'connect timeout',
-            'connection_refused': r'connect refused',
-            'no_route_to_host': r'No route to host',
-            'dns_resolution_failed': r'no address associated with name',
-            'crl_expired': r'CRL has expired',
-            'cert_expired': r'certificate has expired',
-            'cert_not_yet_valid': r'certificate is not yet valid',
-            'manifest_unavailable': r'no valid manifest available',
-            'seqnum_gap': r'seqnum gap detected',
-            'tls_handshake_failed': r'TLS handshake.*certificate verification failed',
-            'unexpected_manifest_number': r'unexpected manifest number',
-            'rfc3779_resource_violation': r'RFC 3779 resource not subset',
-            'notification_not_modified': r'notification file not modified',
-            'fallback_to_rsync': r'fallback to rsync',
-            'fallback_to_cache': r'fallback to cache',
-            'cross_origin_redirect': r'cross origin redirect',
-            'unexpected_end_of_file': r'unexpected end of file',
-            'invalid_vcard': r'invalid vCard'
+from rpki_http import ConditionalFetcher, NotModified
+from rpki_history import ErrorHistory, split_error_line
+from rpki_patterns import ERROR_TYPE_PATTERNS
+from rpki_metrics import RunMetrics, atomic_write
+from rpki_sources import Source, collect_sources, load_sources
+from rpki_windows import RollingWindows, parse_duration
+from rpki_sketch import ErrorSketch
+from rpki_export import RecordSink, open_sinks, read_export
+from rpki_paths import PathIndex, object_location
+from rpki_parse_cache import MISSING, ParseCache, line_template
+
+REGEX_METACHARS = set('.^$*+?{}[]\\|()')
+
+
+def literal_prefix(pattern: str) -> Tuple[str, bool]:
+    """Return the literal text every match of pattern must start with.
+
+    The second element is True when the whole pattern is a plain literal,
+    in which case a substring test is an exact substitute for re.search.
+    """
+    if '|' in pattern or not pattern.isascii():
+        return '', False
+
+    prefix = []
+    for char in pattern:
+        if char in REGEX_METACHARS:
+            # A quantifier makes the preceding character optional/repeated
+            if char in '*?{+' and prefix:
+                prefix.pop()
+            return ''.join(prefix), False
+        prefix.append(char)
+    return pattern, True
+
+
+class LogLineMatcher:
+    """Precompiled matching engine for rpki-client log lines.
+
+    Every error pattern is reduced to a lowercase literal that is checked
+    with a plain substring test against the lowercased line; only patterns
+    that are not pure literals (e.g. the TLS handshake one) fall through to
+    their compiled regex, and only when their literal prefix is present.
+    Non-ASCII lines use the compiled regexes directly so that re.IGNORECASE
+    case folding rules are preserved exactly.
+    """
+
+    # Syslog pads single-digit days with a space: 'Sep  7 23:39:26'
+    TIMESTAMP_RE = re.compile(r'^(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})')
+    URL_RE = re.compile(r'https?://([^/\s:]+)')
+    RSYNC_RE = re.compile(r'rsync://([^/\s:]+)')
+    PATH_RE = re.compile(r'([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})')
+
+    def __init__(self, error_patterns: Dict[str, str]):
+        self.compiled = []
+        for error_type, pattern in error_patterns.items():
+            prefix, exact = literal_prefix(pattern)
+            regex = re.compile(pattern, re.IGNORECASE)
+            self.compiled.append((error_type, prefix.lower(), None if exact else regex, regex))
+
+    def match_error_types(self, line: str) -> List[str]:
+        """Return matching error types in error_patterns order"""
+        if not line.isascii():
+            return [error_type for error_type, _, _, regex in self.compiled
+                    if regex.search(line)]
+
+        line_lower = line.lower()
+        error_types = []
+        for error_type, literal, verify, _ in self.compiled:
+            if literal in line_lower and (verify is None or verify.search(line)):
+                error_types.append(error_type)
+        return error_types
+
+    def match_timestamp(self, line: str) -> Optional[str]:
+        """Extract the leading syslog timestamp, if any"""
+        match = self.TIMESTAMP_RE.match(line)
+        return match.group(1) if match else None
+
+    def match_host(self, line: str) -> Optional[str]:
+        """Extract the host from an https/rsync URL or a bare repository path"""
+        if '://' in line:
+            match = self.URL_RE.search(line) or self.RSYNC_RE.search(line)
+            if match:
+                return match.group(1)
+        match = self.PATH_RE.search(line)
+        return match.group(1) if match else None
+
+
+# Leading bytes of the compressed formats accepted by open_log
+COMPRESSION_MAGIC = [
+    (b'\x1f\x8b', gzip.open),
+    (b'BZh', bz2.open),
+    (b'\xfd7zXZ\x00', lzma.open),
+]
+
+
+@contextmanager
+def open_log(filepath: str) -> Iterator[io.TextIOBase]:
+    """Open a log for line-by-line reading.
+
+    '-' reads from stdin. gzip, bzip2 and xz input is detected from its
+    magic bytes and decompressed on the fly, so nothing is ever read into
+    memory as a whole.
+    """
+    raw = sys.stdin.buffer if filepath == '-' else open(filepath, 'rb')
+    if not isinstance(raw, io.BufferedReader):
+        raw = io.BufferedReader(raw)
+    stream = None
+    try:
+        head = raw.peek(8)
+        opener = next((opener for magic, opener in COMPRESSION_MAGIC
+                       if head.startswith(magic)), None)
+        if opener:
+            stream = opener(raw, 'rt', encoding='utf-8')
+        else:
+            stream = io.TextIOWrapper(raw, encoding='utf-8')
+        yield stream
+    finally:
+        if filepath == '-':
+            # Leave stdin open for the rest of the process
+            if stream is not None:
+                stream.detach()
+        else:
+            if stream is not None:
+                stream.close()
+            raw.close()
+
+
+def iter_text_lines(content: str) -> Iterator[str]:
+    """Yield the lines of content one at a time, equivalent to content.split('\\n')"""
+    start = 0
+    while True:
+        end = content.find('\n', start)
+        if end == -1:
+            yield content[start:]
+            return
+        yield content[start:end]
+        start = end + 1
+
+
+class LogFollower:
+    """Reads the lines appended to a log since a byte offset, like tail -F.
+
+    Only complete lines are returned; a trailing partial line is left for
+    the next read. If the file is truncated it is re-read from the start,
+    and if it is rotated (the path now names a different inode) the rest
+    of the old file is drained before switching to the new one.
+    """
+
+    def __init__(self, filepath: str, inode: Optional[int] = None, offset: int = 0):
+        self.filepath = filepath
+        self.inode = inode
+        self.offset = offset
+        self.file = None
+
+    def _open(self) -> bool:
+        try:
+            self.file = open(self.filepath, 'rb')
+        except FileNotFoundError:
+            return False
+        inode = os.fstat(self.file.fileno()).st_ino
+        if inode != self.inode:
+            self.inode = inode
+            self.offset = 0
+        return True
+
+    def _path_inode(self) -> Optional[int]:
+        try:
+            return os.stat(self.filepath).st_ino
+        except FileNotFoundError:
+            return None
+
+    def _read_lines(self) -> Iterator[str]:
+        self.file.seek(self.offset)
+        for raw in self.file:
+            if not raw.endswith(b'\n'):
+                break
+            self.offset += len(raw)
+            yield raw.decode('utf-8', errors='replace')
+
+    def read_new_lines(self) -> Iterator[str]:
+        """Yield every complete line appended since the last call"""
+        if self.file is None and not self._open():
+            return
+        if os.fstat(self.file.fileno()).st_size < self.offset:
+            # Truncated in place (e.g. logrotate copytruncate)
+            self.offset = 0
+        yield from self._read_lines()
+
+        if self._path_inode() not in (None, self.inode):
+            self.file.close()
+            self.file = None
+            if self._open():
+                yield from self._read_lines()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class LogRecord:
+    """A matched log line, stored once for both the timeline and error details.
+
+    Supports the dict-style access of the former timeline entries, with
+    'message' as an alias of 'raw_line' as used by error details. source
+    names the vantage point the line came from when several were fetched.
+    """
+
+    __slots__ = ('timestamp', 'host', 'error_types', 'raw_line', 'severity', 'source')
+
+    def __init__(self, timestamp: Optional[str], host: Optional[str],
+                 error_types: Tuple[str, ...], raw_line: str, severity: str,
+                 source: Optional[str] = None):
+        self.timestamp = timestamp
+        self.host = host
+        self.error_types = error_types
+        self.raw_line = raw_line
+        self.severity = severity
+        self.source = source
+
+    def __reduce__(self):
+        return (LogRecord, (self.timestamp, self.host, self.error_types,
+                            self.raw_line, self.severity, self.source))
+
+    def __getitem__(self, key: str):
+        if key == 'message':
+            key = 'raw_line'
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def as_timeline_entry(self) -> Dict:
+        """The record in the shape of a parse_log_line() result"""
+        entry = {
+            'timestamp': self.timestamp,
+            'host': self.host,
+            'error_types': list(self.error_types),
+            'raw_line': self.raw_line,
+            'severity': self.severity
         }
+        if self.source is not None:
+            entry['source'] = self.source
+        return entry
+
+    def as_detail(self) -> Dict:
+        """The record in the shape of an error_details entry"""
+        detail = {
+            'timestamp': self.timestamp,
+            'host': self.host,
+            'message': self.raw_line,
+            'severity': self.severity
+        }
+        if self.source is not None:
+            detail['source'] = self.source
+        return detail
+
+
+class RecordStore:
+    """Append-only store of LogRecords with a per-error-type index.
+
+    Timestamps, hosts and error type combinations are interned so that
+    repeated values share one object, and each error type keeps the
+    positions of its records in a compact unsigned int array.
+    """
+
+    def __init__(self):
+        self.records: List[LogRecord] = []
+        self.type_index: Dict[str, array] = {}
+        self.interned: Dict = {}
+
+    def intern(self, value):
+        """Return the shared instance of value (None passes through)"""
+        if value is None:
+            return None
+        return self.interned.setdefault(value, value)
+
+    def add(self, timestamp: Optional[str], host: Optional[str], error_types,
+            raw_line: str, severity: str, source: Optional[str] = None) -> LogRecord:
+        """Append a record and index it under each of its error types"""
+        record = LogRecord(self.intern(timestamp), self.intern(host),
+                           self.intern(tuple(error_types)), raw_line, severity,
+                           self.intern(source))
+        position = len(self.records)
+        self.records.append(record)
+        for error_type in record.error_types:
+            indices = self.type_index.get(error_type)
+            if indices is None:
+                indices = self.type_index[error_type] = array('I')
+            indices.append(position)
+        return record
+
+    def extend(self, records: Iterable[LogRecord], source: Optional[str] = None):
+        """Append records from another store, tagging them with source if given"""
+        for record in records:
+            self.add(record.timestamp, record.host, record.error_types,
+                     record.raw_line, record.severity, source or record.source)
+
+
+class ErrorDetailList(Sequence):
+    """Read-only view of the records of one error type as error_details dicts"""
+
+    def __init__(self, store: RecordStore, error_type: str):
+        self.store = store
+        self.error_type = error_type
+
+    def _indices(self) -> array:
+        return self.store.type_index.get(self.error_type, array('I'))
+
+    def __len__(self) -> int:
+        return len(self._indices())
+
+    def __getitem__(self, index):
+        records = self.store.records
+        if isinstance(index, slice):
+            return [records[i].as_detail() for i in self._indices()[index]]
+        return records[self._indices()[index]].as_detail()
+
+    def __iter__(self) -> Iterator[Dict]:
+        records = self.store.records
+        for i in self._indices():
+            yield records[i].as_detail()
+
+
+class ErrorDetailsView(Mapping):
+    """error_type -> ErrorDetailList over a RecordStore.
+
+    Like the defaultdict it replaces, looking up an unseen error type
+    yields an empty list instead of raising KeyError.
+    """
+
+    def __init__(self, store: RecordStore):
+        self.store = store
+
+    def __getitem__(self, error_type: str) -> ErrorDetailList:
+        return ErrorDetailList(self.store, error_type)
+
+    def __contains__(self, error_type) -> bool:
+        return error_type in self.store.type_index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.type_index)
+
+    def __len__(self) -> int:
+        return len(self.store.type_index)
+
+
+def json_default(obj):
+    """json.dump fallback that expands record store views"""
+    if isinstance(obj, LogRecord):
+        return obj.as_timeline_entry()
+    if isinstance(obj, ErrorDetailsView):
+        return dict(obj)
+    if isinstance(obj, ErrorDetailList):
+        return list(obj)
+    return str(obj)
+
+
+class RPKIErrorAnalyzer:
+    def __init__(self, cache_size: int = 4096):
+        self.error_patterns = dict(ERROR_TYPE_PATTERNS)
         
+        self.store = RecordStore()
         self.results = {
             'error_counts': defaultdict(int),
-            'error_details': defaultdict(list),
+            'error_details': ErrorDetailsView(self.store),
             'affected_hosts': defaultdict(set),
-            'timeline': [],
+            'timeline': self.store.records,
             'summary_stats': {},
             'recommendations': []
         }
 
+        self.matcher = LogLineMatcher(self.error_patterns)
+        # Classification per message template; see rpki_parse_cache
+        self.parse_cache = ParseCache(cache_size)
+
+        # Severity counts of lines not in the timeline: analyzed by earlier
+        # runs (from a checkpoint) or not kept (keep_records False)
+        self.prior_severity_counts = Counter()
+        # Log lines read by analyze_lines (including merged partial results)
+        self.lines_scanned = 0
+        # Error lines matched in this run, kept in the timeline or not
+        self.lines_matched = 0
+
+        # With keep_records False only counters and windows are updated, so
+        # memory no longer grows with the number of lines (e.g. --follow)
+        self.keep_records = True
+        # Rolling per-(host, error type) counts; see enable_windows
+        self.windows: Optional[RollingWindows] = None
+        self.window_sizes: List[int] = []
+        # Approximate host/object/message counts in fixed memory; see enable_sketch
+        self.sketch: Optional[ErrorSketch] = None
+        # Streaming exports written as lines are matched; see rpki_export
+        self.sinks: List[RecordSink] = []
+        # Error counts by repository / CA directory / object path; see enable_paths
+        self.paths: Optional[PathIndex] = None
+
     def parse_log_line(self, line: str) -> Optional[Dict]:
         """Parse a single log line and extract structured information"""
-        # Extract timestamp
-        timestamp_pattern = r'^(\w{3}\s+\d{2}\s+\d{2}:\d{2}:\d{2})'
-        timestamp_match = re.search(timestamp_pattern, line)
-        timestamp = timestamp_match.group(1) if timestamp_match else None
-        
-        # Extract host/URL information
-        url_pattern = r'https?://([^/\s:]+)'
-        rsync_pattern = r'rsync://([^/\s:]+)'
-        path_pattern = r'([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'
-        
-        host = None
-        url_match = re.search(url_pattern, line)
-        if url_match:
-            host = url_match.group(1)
-        else:
-            rsync_match = re.search(rsync_pattern, line)
-            if rsync_match:
-                host = rsync_match.group(1)
-            else:
-                path_match = re.search(path_pattern, line)
-                if path_match:
-                    host = path_match.group(1)
-        
-        # Identify error types
-        error_types = []
-        for error_type, pattern in self.error_patterns.items():
-            if re.search(pattern, line, re.IGNORECASE):
-                error_types.append(error_type)
-        
-        if not error_types:
+        timestamp = self.matcher.match_timestamp(line)
+        classified = self.classify_cached(line, timestamp)
+        if classified is None:
             return None
-            
+
+        error_types, severity = classified
         return {
             'timestamp': timestamp,
-            'host': host,
-            'error_types': error_types,
+            'host': self.matcher.match_host(line),
+            'error_types': list(error_types),
             'raw_line': line.strip(),
-            'severity': self.classify_severity(error_types)
+            'severity': severity
         }
 
+    def classify_cached(self, line: str, timestamp: Optional[str] = None) -> Optional[Tuple[Tuple[str, ...], str]]:
+        """classify_line through the parse cache, keyed on the line's template"""
+        if not self.parse_cache.maxsize:
+            return self.classify_line(line)
+        template = line_template(line, timestamp)
+        classified = self.parse_cache.get(template)
+        if classified is MISSING:
+            classified = self.classify_line(line)
+            self.parse_cache.put(template, classified)
+        return classified
+
+    def classify_line(self, line: str) -> Optional[Tuple[Tuple[str, ...], str]]:
+        """Return (error_types, severity) for a line, or None if it has no errors"""
+        error_types = self.matcher.match_error_types(line)
+        if not error_types:
+            return None
+        return tuple(error_types), self.classify_severity(error_types)
+
     def classify_severity(self, error_types: List[str]) -> str:
         """Classify error severity based on error types"""
         high_severity = ['cert_expired', 'cert_not_yet_valid', 'rfc3779_resource_violation']
@@ -102,9 +474,12 @@ class RPKIErrorAnalyzer:
 
     def analyze_log_content(self, content: str):
         """Analyze log content and extract error patterns"""
-        lines = content.split('\n')
-        
-        for line in lines:
+        self.analyze_lines(iter_text_lines(content))
+
+    def analyze_lines(self, lines: Iterable[str]):
+        """Analyze an iterable of log lines, consuming it one line at a time"""
+        scanned = 0
+        for scanned, line in enumerate(lines, 1):
             if 'rpki-client:' not in line and 'openrsync:' not in line:
                 continue
                 
@@ -112,27 +487,76 @@ class RPKIErrorAnalyzer:
             if not parsed:
                 continue
                 
-            # Update counters
-            for error_type in parsed['error_types']:
+            self.add_record(parsed['timestamp'], parsed['host'], parsed['error_types'],
+                            parsed['raw_line'], parsed['severity'])
+        self.lines_scanned += scanned
+
+    def add_record(self, timestamp: Optional[str], host: Optional[str], error_types: List[str],
+                   raw_line: str, severity: str, source: Optional[str] = None) -> Optional[LogRecord]:
+        """Store one parsed error line and update the counters.
+
+        Returns None when records are not kept.
+        """
+        self.lines_matched += 1
+        for sink in self.sinks:
+            sink.write(timestamp, host, error_types, raw_line, severity, source)
+        if self.windows is not None:
+            self.windows.add(timestamp, host, error_types)
+        if self.sketch is not None:
+            self.sketch.add(host, error_types, raw_line, timestamp)
+        if self.paths is not None:
+            self.paths.add(object_location(raw_line), error_types, severity)
+        if not self.keep_records:
+            self.prior_severity_counts[severity] += 1
+            for error_type in error_types:
                 self.results['error_counts'][error_type] += 1
-                self.results['error_details'][error_type].append({
-                    'timestamp': parsed['timestamp'],
-                    'host': parsed['host'],
-                    'message': parsed['raw_line'],
-                    'severity': parsed['severity']
-                })
-                
-                if parsed['host']:
-                    self.results['affected_hosts'][error_type].add(parsed['host'])
+                if host and self.sketch is None:
+                    self.results['affected_hosts'][error_type].add(self.store.intern(host))
+            return None
+        record = self.store.add(timestamp, host, error_types, raw_line, severity, source)
+        for error_type in record.error_types:
+            self.results['error_counts'][error_type] += 1
             
-            self.results['timeline'].append(parsed)
+            if record.host:
+                self.results['affected_hosts'][error_type].add(record.host)
+        return record
+
+    def enable_windows(self, sizes: List[int], bucket_seconds: int = 60):
+        """Keep rolling counts for windows of sizes seconds (the largest is the span)"""
+        if any(size % bucket_seconds for size in sizes):
+            raise ValueError(f"windows must be multiples of the {bucket_seconds}s bucket")
+        self.window_sizes = sorted(set(sizes))
+        self.windows = RollingWindows(bucket_seconds, self.window_sizes[-1])
+
+    def enable_sketch(self, precision: int = 12, width: int = 2048):
+        """Count hosts, objects and messages approximately instead of keeping them.
+
+        Affected hosts per error type become HyperLogLog estimates and the
+        top hosts/messages come from a Count-Min sketch, so memory stays
+        fixed however many lines are analyzed; error lines are not kept.
+        """
+        self.sketch = ErrorSketch(precision, width)
+        self.keep_records = False
+
+    def enable_paths(self):
+        """Index errors by object path, for drill-downs below the host level"""
+        self.paths = PathIndex()
+
+    def merge_needs_records(self) -> bool:
+        """Whether merge_results() feeds the merged records to windows, sinks or paths"""
+        return self.windows is not None or bool(self.sinks) or self.paths is not None
+
+    def close_sinks(self):
+        """Finish the streaming exports, reporting how many lines each received"""
+        for sink in self.sinks:
+            sink.close()
+            print(f"{sink.records} error lines streamed to {sink.path}")
 
     def analyze_file(self, filepath: str):
-        """Analyze errors from a log file"""
+        """Analyze errors from a log file, stdin ('-') or a gzip/xz/bz2 compressed log"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-            self.analyze_log_content(content)
+            with open_log(filepath) as f:
+                self.analyze_lines(f)
         except FileNotFoundError:
             print(f"Error: File '{filepath}' not found")
             sys.exit(1)
@@ -140,17 +564,278 @@ class RPKIErrorAnalyzer:
             print(f"Error reading file: {e}")
             sys.exit(1)
 
-    def fetch_console_data(self, url: str = "https://console.rpki-client.org/"):
-        """Fetch current error data from RPKI console"""
+    def import_export(self, filepath: str):
+        """Load a CSV (-c or --stream) or NDJSON export of an earlier run.
+
+        The exported lines are added as already classified records, with
+        no pattern matching, so summaries, recommendations and exports
+        can be produced again from archived data. Compressed exports and
+        '-' (stdin) are read like logs.
+        """
+        sources = Counter()
+        add_record = self.add_record
+        try:
+            with open_log(filepath) as f:
+                # Rows of -c exports are only rejoined exactly when records are kept anyway
+                records = read_export(f, scattered=self.keep_records)
+                for timestamp, host, error_types, raw_line, severity, source in records:
+                    add_record(timestamp, host, error_types, raw_line, severity, source)
+                    if source is not None:
+                        sources[source] += 1
+        except FileNotFoundError:
+            print(f"Error: File '{filepath}' not found")
+            sys.exit(1)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error importing {filepath}: {e}")
+            sys.exit(1)
+
+        for name, count in sources.items():
+            imported = self.results.setdefault('sources', {}).setdefault(
+                name, {'url': None, 'status': 'imported', 'lines': 0, 'errors': 0, 'seconds': 0})
+            imported['lines'] += count
+            imported['errors'] += count
+
+    def analyze_files(self, filepaths: List[str], jobs: Optional[int] = None):
+        """Analyze several log files across a process pool of jobs workers.
+
+        Each worker returns the results of one file; they are merged in
+        input order so the outcome matches analyzing the files one by one.
+        """
+        # Sketch workers keep no records, which some consumers of the merge need
+        needs_records = self.sketch is not None and self.merge_needs_records()
+        if jobs == 1 or len(filepaths) < 2 or '-' in filepaths or needs_records:
+            for filepath in filepaths:
+                self.analyze_file(filepath)
+            return
+
+        sketches = [self.sketch.empty() if self.sketch is not None else None for _ in filepaths]
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for partial in executor.map(analyze_file_partial, filepaths, sketches):
+                self.merge_results(partial)
+
+    def partial_results(self) -> Dict:
+        """The results merge_results() needs, without the derived views"""
+        # error_details is a view over the timeline and is rebuilt on merge
+        partial = {key: self.results[key]
+                   for key in ('error_counts', 'affected_hosts', 'timeline')}
+        partial['lines_scanned'] = self.lines_scanned
+        partial['lines_matched'] = self.lines_matched
+        partial['severity_counts'] = dict(self.prior_severity_counts)
+        if self.sketch is not None:
+            partial['sketch'] = self.sketch
+        return partial
+
+    def merge_results(self, other: Dict, source: Optional[str] = None):
+        """Merge another analyzer's results into this one.
+
+        Merging is associative, so partial results can be combined in any
+        grouping as long as their order is preserved. source tags the
+        merged records with the vantage point they came from.
+        """
+        for error_type, count in other['error_counts'].items():
+            self.results['error_counts'][error_type] += count
+        if other.get('sketch') is not None:
+            if self.sketch is None:
+                self.sketch = other['sketch'].empty()
+            self.sketch.merge(other['sketch'])
+        elif self.sketch is not None:
+            for record in other['timeline']:
+                self.sketch.add(record.host, record.error_types, record.raw_line, record.timestamp)
+        if self.sketch is None:
+            for error_type, hosts in other['affected_hosts'].items():
+                self.results['affected_hosts'][error_type].update(self.store.intern(host) for host in hosts)
+        if self.windows is not None:
+            for record in other['timeline']:
+                self.windows.add(record.timestamp, record.host, record.error_types)
+        if self.paths is not None:
+            for record in other['timeline']:
+                self.paths.add(object_location(record.raw_line), record.error_types, record.severity)
+        for sink in self.sinks:
+            for record in other['timeline']:
+                sink.write(record.timestamp, record.host, record.error_types,
+                           record.raw_line, record.severity, source or record.source)
+        self.lines_matched += other.get('lines_matched', len(other['timeline']))
+        self.prior_severity_counts.update(other.get('severity_counts', {}))
+        if self.keep_records:
+            # error_details is a view over the timeline records
+            self.store.extend(other['timeline'], source)
+        else:
+            self.prior_severity_counts.update(record.severity for record in other['timeline'])
+        self.lines_scanned += other.get('lines_scanned', 0)
+
+    def load_checkpoint(self, checkpoint_file: str, filepath: str) -> LogFollower:
+        """Restore running counters from a checkpoint and return a LogFollower
+        positioned after the last line analyzed for filepath.
+
+        Exits if the checkpoint belongs to another log, whose counters
+        would otherwise be added to those of filepath.
+        """
+        try:
+            with open(checkpoint_file, 'r') as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return LogFollower(filepath)
+        except (OSError, ValueError) as e:
+            print(f"Error reading checkpoint {checkpoint_file}: {e}")
+            sys.exit(1)
+        if checkpoint['path'] != filepath:
+            print(f"Error: checkpoint {checkpoint_file} is for {checkpoint['path']}, not {filepath} "
+                  f"(use another checkpoint file, or remove it to start over)")
+            sys.exit(1)
+
+        for error_type, count in checkpoint['error_counts'].items():
+            self.results['error_counts'][error_type] += count
+        for error_type, hosts in checkpoint['affected_hosts'].items():
+            self.results['affected_hosts'][error_type].update(hosts)
+        self.prior_severity_counts.update(checkpoint['severity_counts'])
+        saved_windows = checkpoint.get('windows')
+        if (self.windows is not None and saved_windows
+                and saved_windows['bucket_seconds'] == self.windows.bucket_seconds
+                and saved_windows['size'] == self.windows.size):
+            self.windows = RollingWindows.from_dict(saved_windows)
+        saved_sketch = checkpoint.get('sketch')
+        if (self.sketch is not None and saved_sketch
+                and saved_sketch['precision'] == self.sketch.precision
+                and saved_sketch['width'] == self.sketch.width):
+            self.sketch = ErrorSketch.from_dict(saved_sketch)
+        if self.paths is not None and checkpoint.get('paths'):
+            self.paths = PathIndex.from_dict(checkpoint['paths'])
+        return LogFollower(filepath, checkpoint['inode'], checkpoint['offset'])
+
+    def save_checkpoint(self, checkpoint_file: str, follower: LogFollower):
+        """Save the follower position and the cumulative counters"""
+        severity_counts = Counter(self.prior_severity_counts)
+        for entry in self.results['timeline']:
+            severity_counts[entry['severity']] += 1
+
+        checkpoint = {
+            'path': follower.filepath,
+            'inode': follower.inode,
+            'offset': follower.offset,
+            'saved_at': datetime.now().isoformat(),
+            'error_counts': dict(self.results['error_counts']),
+            'affected_hosts': {k: sorted(v) for k, v in self.results['affected_hosts'].items()},
+            'severity_counts': dict(severity_counts)
+        }
+        if self.windows is not None:
+            checkpoint['windows'] = self.windows.to_dict()
+        if self.sketch is not None:
+            checkpoint['sketch'] = self.sketch.to_dict()
+        if self.paths is not None:
+            checkpoint['paths'] = self.paths.to_dict()
+        tmp_file = f"{checkpoint_file}.tmp"
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(checkpoint, f, indent=2)
+            os.replace(tmp_file, checkpoint_file)
+        except OSError as e:
+            print(f"Error saving checkpoint: {e}")
+
+    def analyze_incremental(self, filepath: str, checkpoint_file: Optional[str] = None,
+                            follow: bool = False, poll_interval: float = 1.0):
+        """Analyze only the lines appended to filepath since the last checkpoint.
+
+        Counters restored from the checkpoint are cumulative; timeline and
+        error details hold the newly analyzed lines only. With follow, keep
+        polling for appended lines until interrupted, saving the checkpoint
+        after every batch.
+        """
+        if checkpoint_file:
+            follower = self.load_checkpoint(checkpoint_file, filepath)
+        else:
+            follower = LogFollower(filepath)
+
         try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            self.analyze_log_content(response.text)
+            while True:
+                position = (follower.inode, follower.offset)
+                self.analyze_lines(follower.read_new_lines())
+                if follow and (follower.inode, follower.offset) != position:
+                    if checkpoint_file:
+                        self.save_checkpoint(checkpoint_file, follower)
+                    if self.windows is not None:
+                        print(self.windows.format_line(self.window_sizes))
+                    for sink in self.sinks:
+                        sink.flush()
+                if not follow:
+                    break
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            print("\nStopped following")
+        finally:
+            follower.close()
+
+        if checkpoint_file:
+            self.save_checkpoint(checkpoint_file, follower)
+
+    def fetch_console_data(self, url: str = "https://console.rpki-client.org/",
+                           cache_file: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """Fetch current error data from RPKI console, parsing it as it downloads.
+
+        With cache_file, the page's ETag/Last-Modified are kept between runs
+        and an unchanged page is skipped without parsing; returns False then.
+        """
+        fetcher = ConditionalFetcher(cache_file)
+        try:
+            self.analyze_lines(fetcher.iter_lines(url, timeout))
+            fetcher.save_cache()
             print(f"Successfully fetched data from {url}")
+            return True
+        except NotModified:
+            print(f"No changes at {url} since the last fetch")
+            return False
         except requests.RequestException as e:
             print(f"Error fetching data from {url}: {e}")
             sys.exit(1)
 
+    def fetch_sources(self, sources: List[Source], cache_file: Optional[str] = None) -> bool:
+        """Fetch several vantage points at once and merge them, tagged by source.
+
+        Each source is parsed in its own thread into a partial analyzer
+        (sharing this one's parse cache); the partials are merged in the
+        order given. Failed sources are reported and skipped; exits only
+        if every source failed. Returns False if nothing changed anywhere.
+        """
+        def consume(source: Source, lines: Iterable[str]) -> Dict:
+            partial = RPKIErrorAnalyzer(self.parse_cache.maxsize)
+            partial.parse_cache = self.parse_cache
+            if self.sketch is not None and not self.merge_needs_records():
+                partial.sketch = self.sketch.empty()
+                partial.keep_records = False
+            partial.analyze_lines(lines)
+            return partial.partial_results()
+
+        fetcher = ConditionalFetcher(cache_file)
+        results = collect_sources(sources, fetcher, consume)
+        if any(result.ok for result in results) and any(result.not_modified for result in results):
+            # Unchanged sources are fetched again so the merged view stays complete
+            unchanged = [result.source for result in results if result.not_modified]
+            refetched = {result.source.name: result
+                         for result in collect_sources(unchanged, fetcher, consume, conditional=False)}
+            results = [refetched.get(result.source.name, result) for result in results]
+
+        self.results['sources'] = {}
+        for result in results:
+            self.results['sources'][result.source.name] = {
+                'url': result.source.url,
+                'status': result.status,
+                'lines': result.lines,
+                'errors': result.value['lines_matched'] if result.ok else 0,
+                'seconds': round(result.seconds, 3)
+            }
+            if result.ok:
+                self.merge_results(result.value, result.source.name)
+            print(f"{result.source.name}: {result.status} ({result.source.url}, "
+                  f"{result.lines} lines in {result.seconds:.1f}s)")
+
+        if all(result.error is not None for result in results):
+            print("Error: no source could be fetched")
+            sys.exit(1)
+        if not any(result.ok for result in results):
+            print("No changes at any source since the last fetch")
+            return False
+        fetcher.save_cache()
+        return True
+
     def generate_summary(self) -> Dict:
         """Generate summary statistics"""
         total_errors = sum(self.results['error_counts'].values())
@@ -158,7 +843,7 @@ class RPKIErrorAnalyzer:
         for hosts in self.results['affected_hosts'].values():
             unique_hosts.update(hosts)
         
-        severity_counts = Counter()
+        severity_counts = Counter(self.prior_severity_counts)
         for entry in self.results['timeline']:
             severity_counts[entry['severity']] += 1
         
@@ -169,6 +854,17 @@ class RPKIErrorAnalyzer:
             'severity_breakdown': dict(severity_counts),
             'most_common_errors': dict(Counter(self.results['error_counts']).most_common(10))
         }
+        if self.windows is not None:
+            self.results['windows'] = self.windows.snapshot(self.window_sizes)
+        if self.paths is not None:
+            self.results['paths'] = {
+                'repositories': self.paths.describe(limit=10)['children'],
+                'top_ca_directories': self.paths.top_directories(limit=10),
+                'lines_without_path': self.paths.skipped
+            }
+        if self.sketch is not None:
+            self.results['approximate'] = self.sketch.summary()
+            self.results['summary_stats']['affected_hosts_count'] = self.results['approximate']['distinct_hosts']
         
         return self.results['summary_stats']
 
@@ -236,7 +932,11 @@ class RPKIErrorAnalyzer:
         print(f"\nOVERALL STATISTICS:")
         print(f"  Total Errors: {stats['total_errors']}")
         print(f"  Unique Error Types: {stats['unique_error_types']}")
-        print(f"  Affected Hosts: {stats['affected_hosts_count']}")
+        if self.sketch is not None:
+            error = self.results['approximate']['bounds']['distinct_relative_error']
+            print(f"  Affected Hosts: ~{stats['affected_hosts_count']} (±{error:.1%})")
+        else:
+            print(f"  Affected Hosts: {stats['affected_hosts_count']}")
         
         print(f"\nERROR SEVERITY BREAKDOWN:")
         for severity, count in stats['severity_breakdown'].items():
@@ -246,7 +946,8 @@ class RPKIErrorAnalyzer:
         for error_type, count in stats['most_common_errors'].items():
             print(f"  {error_type.replace('_', ' ').title()}: {count}")
         
-        print(f"\nAFFECTED HOSTS BY ERROR TYPE:")
+        if self.sketch is None:
+            print(f"\nAFFECTED HOSTS BY ERROR TYPE:")
         for error_type, hosts in self.results['affected_hosts'].items():
             if hosts:
                 print(f"  {error_type.replace('_', ' ').title()}: {len(hosts)} hosts")
@@ -255,12 +956,71 @@ class RPKIErrorAnalyzer:
                 if len(hosts) > 5:
                     print(f"    ... and {len(hosts) - 5} more")
         
+        if self.windows is not None:
+            windows = self.results['windows']
+            print(f"\nROLLING WINDOWS (log time, as of {windows['as_of']}):")
+            for name, window in windows['windows'].items():
+                print(f"  Last {name}: {window['errors']} errors ({window['per_hour']}/hour)")
+                for host, count in list(window['top_hosts'].items())[:5]:
+                    print(f"    - {host}: {count}")
+            if windows['dropped']:
+                print(f"  {windows['dropped']} lines were older than the longest window")
+        
+        if self.sketch is not None:
+            approximate = self.results['approximate']
+            bounds = approximate['bounds']
+            print(f"\nAPPROXIMATE COUNTS (hosts/objects ±{bounds['distinct_relative_error']:.1%} "
+                  f"standard error; top counts never under, and over by at most the stated "
+                  f"amount with {bounds['top_count_confidence']:.0%} confidence):")
+            for error_type, hosts in sorted(approximate['hosts_by_type'].items(),
+                                            key=lambda item: -item[1]):
+                print(f"  {error_type.replace('_', ' ').title()}: ~{hosts} hosts, "
+                      f"~{approximate['objects_by_type'].get(error_type, 0)} objects")
+            print(f"  Top hosts (+{bounds['top_hosts_max_overcount']} at most):")
+            for host, count in list(approximate['top_hosts'].items())[:5]:
+                print(f"    - {host}: {count}")
+            print(f"  Top messages (+{bounds['top_messages_max_overcount']} at most):")
+            for message, count in list(approximate['top_messages'].items())[:5]:
+                print(f"    - {count}: {message.strip()[:100]}")
+        
+        if self.paths is not None:
+            print(f"\nMOST BROKEN CA DIRECTORIES:")
+            for directory in self.results['paths']['top_ca_directories']:
+                severities = ', '.join(f"{severity} {count}" for severity, count
+                                       in directory['by_severity'].items())
+                print(f"  {directory['path']}: {directory['errors']} errors in "
+                      f"{directory['objects']} objects ({severities})")
+        
+        if self.results.get('sources'):
+            print(f"\nERRORS BY SOURCE:")
+            for name, source in self.results['sources'].items():
+                print(f"  {name}: {source['errors']} errors in {source['lines']} lines ({source['status']})")
+        
         print(f"\nRECOMMENDATIONS:")
         for i, rec in enumerate(self.results['recommendations'], 1):
             print(f"  {i}. [{rec['priority']}] {rec['category']}")
             print(f"     {rec['description']}")
             print(f"     Action: {rec['action']}\n")
 
+    def print_paths(self, prefix: str = '', limit: int = 20):
+        """Print the errors under a repository path prefix and its most broken children"""
+        described = self.paths.describe(prefix, limit)
+        if described is None:
+            print(f"\nNo errors under {prefix}")
+            return
+        print(f"\nERRORS UNDER {described['path'] or 'ALL REPOSITORIES'}: "
+              f"{described['errors']} errors in {described['objects']} objects")
+        for severity, count in described['by_severity'].items():
+            print(f"  {severity}: {count}")
+        for error_type, count in list(described['by_type'].items())[:10]:
+            print(f"  {error_type.replace('_', ' ').title()}: {count}")
+        print(f"  Largest of {described['children_total']} entries below:")
+        for child in described['children']:
+            print(f"    - {child['name']}: {child['errors']} errors in {child['objects']} objects")
+        print(f"  Most broken CA directories below:")
+        for directory in self.paths.top_directories(prefix, limit):
+            print(f"    - {directory['path']}: {directory['errors']} errors in {directory['objects']} objects")
+
     def export_json(self, filename: str):
         """Export results to JSON file"""
         # Convert sets to lists for JSON serialization
@@ -269,11 +1029,64 @@ class RPKIErrorAnalyzer:
         
         try:
             with open(filename, 'w') as f:
-                json.dump(export_data, f, indent=2, default=str)
+                json.dump(export_data, f, indent=2, default=json_default)
             print(f"Results exported to {filename}")
         except Exception as e:
             print(f"Error exporting to JSON: {e}")
 
+    def export_summary(self, filename: str):
+        """Export everything but the per-line timeline and error details to JSON.
+
+        Meant to accompany the streaming exports, which hold the lines.
+        """
+        summary = {key: value for key, value in self.results.items()
+                   if key not in ('timeline', 'error_details')}
+        summary['affected_hosts'] = {k: sorted(v) for k, v in self.results['affected_hosts'].items()}
+        summary['lines_scanned'] = self.lines_scanned
+        summary['lines_matched'] = self.lines_matched
+        if self.sinks:
+            summary['exports'] = {sink.path: sink.records for sink in self.sinks}
+        try:
+            atomic_write(filename, json.dumps(summary, indent=2, default=json_default) + '\n')
+            print(f"Summary exported to {filename}")
+        except Exception as e:
+            print(f"Error exporting summary: {e}")
+
+    def export_history(self, db_path: str):
+        """Append error details to the SQLite error history"""
+        def rows():
+            for record in self.results['timeline']:
+                location, message = split_error_line(record.raw_line)
+                for error_type in record.error_types:
+                    yield record.timestamp, record.host, error_type, record.severity, location, message
+
+        try:
+            with ErrorHistory(db_path) as history:
+                inserted = history.add_errors(rows())
+            print(f"{inserted} new errors stored in history {db_path}")
+        except Exception as e:
+            print(f"Error writing history: {e}")
+
+    def export_archive(self, directory: str):
+        """Append error details to the columnar archive (requires numpy)"""
+        try:
+            from rpki_archive import ErrorArchive
+        except ImportError as e:
+            print(f"Error: the columnar archive requires numpy ({e})")
+            return
+
+        rows = ((record.timestamp, record.host, error_type, record.severity)
+                for record in self.results['timeline']
+                for error_type in record.error_types)
+        try:
+            appended = ErrorArchive(directory).append(rows, source='rpki_error_analyzer.py')
+            if appended or not self.results['timeline']:
+                print(f"{appended} errors appended to archive {directory}")
+            else:
+                print(f"These errors are already in archive {directory}, nothing appended")
+        except Exception as e:
+            print(f"Error writing archive: {e}")
+
     def export_csv(self, filename: str):
         """Export error details to CSV file"""
         import csv
@@ -281,58 +1094,266 @@ class RPKIErrorAnalyzer:
         try:
             with open(filename, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
-                writer.writerow(['Timestamp', 'Host', 'Error_Type', 'Severity', 'Message'])
+                tagged = bool(self.results.get('sources'))
+                writer.writerow(['Timestamp', 'Host', 'Error_Type', 'Severity', 'Message']
+                                + (['Source'] if tagged else []))
                 
                 for error_type, details in self.results['error_details'].items():
                     for detail in details:
-                        writer.writerow([
+                        row = [
                             detail['timestamp'],
                             detail['host'],
                             error_type,
                             detail['severity'],
                             detail['message']
-                        ])
+                        ]
+                        if tagged:
+                            row.append(detail.get('source'))
+                        writer.writerow(row)
             print(f"Error details exported to {filename}")
         except Exception as e:
             print(f"Error exporting to CSV: {e}")
 
+def expand_log_paths(patterns: Iterable[str]) -> List[str]:
+    """Expand glob patterns to sorted file lists, keeping other paths as given"""
+    filepaths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else []
+        filepaths.extend(matches or [pattern])
+    return filepaths
+
+
+def analyze_file_partial(filepath: str, sketch: Optional[ErrorSketch] = None) -> Dict:
+    """Process pool worker: analyze one file and return its partial results.
+
+    With an (empty) sketch, counts approximately instead of keeping records.
+    """
+    analyzer = RPKIErrorAnalyzer()
+    if sketch is not None:
+        analyzer.sketch = sketch
+        analyzer.keep_records = False
+    analyzer.analyze_file(filepath)
+    return analyzer.partial_results()
+
+
+def write_metrics(analyzer: RPKIErrorAnalyzer, metrics: RunMetrics, args, success: bool = True):
+    """Record the run's counters and write the metrics files requested on the command line"""
+    metrics.set('lines_scanned', analyzer.lines_scanned)
+    metrics.set('lines_matched', analyzer.lines_matched)
+    for error_type, count in analyzer.results['error_counts'].items():
+        metrics.set('analyzer_errors', count, error_type=error_type)
+    metrics.finish(success)
+    try:
+        metrics.write(args.metrics_textfile, args.metrics_json)
+    except OSError as e:
+        print(f"Error writing metrics: {e}")
+
 def main():
     parser = argparse.ArgumentParser(description='Analyze RPKI-client error logs')
-    parser.add_argument('-f', '--file', help='Path to log file to analyze')
-    parser.add_argument('-u', '--url', help='URL to fetch live data from', 
-                       default='https://console.rpki-client.org/')
+    parser.add_argument('-f', '--file', nargs='+',
+                       help='Log files or globs to analyze (- for stdin, gzip/xz/bz2 accepted)')
+    parser.add_argument('--import', nargs='+', dest='import_files', metavar='FILE',
+                       help='Load CSV or NDJSON exports of earlier runs instead of re-parsing logs '
+                            '(gzip/xz/bz2 accepted)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                       help='Worker processes for analyzing multiple files (default: CPU count)')
+    parser.add_argument('-u', '--url', nargs='+', default=['https://console.rpki-client.org/'],
+                       help='URLs to fetch live data from, optionally as name=URL; several '
+                            'are fetched concurrently and tagged by name')
+    parser.add_argument('--source-timeout', type=float, default=30,
+                       help='Seconds allowed for fetching each URL (default: 30)')
+    parser.add_argument('--checker-config', metavar='CONFIG',
+                       help='Fetch through monitoring/rpki_error_checker.py with this config and send its '
+                            'per-CA reports from the same parse; its sources and HTTP cache replace '
+                            '--url and --http-cache')
+    parser.add_argument('--all-cas', action='store_true',
+                       help='With --checker-config, report every CA, not only those whose errors changed')
+    parser.add_argument('--dry-run', action='store_true',
+                       help='With --checker-config, send no email and record nothing as reported')
     parser.add_argument('-j', '--json', help='Export results to JSON file')
     parser.add_argument('-c', '--csv', help='Export error details to CSV file')
+    parser.add_argument('--stream', nargs='+', metavar='FILE',
+                       help='Write error lines to these files while parsing: .csv (the -c columns, '
+                            'in log order) or .ndjson/.jsonl, optionally .gz; appended to with --checkpoint')
+    parser.add_argument('--summary-json',
+                       help='Export the summary, counters and recommendations without the per-line details')
+    parser.add_argument('--history', help='Store error details in this SQLite history database')
+    parser.add_argument('--archive', help='Append error details to this columnar archive directory (needs numpy)')
     parser.add_argument('--no-fetch', action='store_true', 
                        help='Skip fetching live data (only use with --file)')
+    parser.add_argument('--follow', action='store_true',
+                       help='Keep reading lines appended to the log file, following rotation like tail -F')
+    parser.add_argument('--checkpoint',
+                       help='File keeping the log position and running counters; only new lines are analyzed')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                       help='Seconds between checks for new lines with --follow (default: 1.0)')
+    parser.add_argument('--cache-size', type=int, default=4096,
+                       help='Message templates kept in the parse cache, 0 disables it (default: 4096)')
+    parser.add_argument('--cache-stats', action='store_true',
+                       help='Print parse cache hit/miss statistics')
+    parser.add_argument('--http-cache',
+                       help='File keeping ETag/Last-Modified between runs; an unchanged page is not re-parsed')
+    parser.add_argument('--windows',
+                       help='Comma separated rolling windows to report, e.g. 1h,24h (log time)')
+    parser.add_argument('--window-bucket', default='1m',
+                       help='Resolution of the rolling windows (default: 1m)')
+    parser.add_argument('--no-records', action='store_true',
+                       help="Don't keep individual error lines, only counters and windows "
+                            "(bounded memory for --follow; -c exports no rows)")
+    parser.add_argument('--approximate', action='store_true',
+                       help='Count affected hosts, objects and top hosts/messages with fixed-size '
+                            'sketches (HyperLogLog, Count-Min) for very large logs; implies --no-records')
+    parser.add_argument('--sketch-precision', type=int, default=12,
+                       help='HyperLogLog precision, 2**N registers per error type (default: 12, ±1.6%%)')
+    parser.add_argument('--sketch-width', type=int, default=2048,
+                       help='Count-Min sketch width; counts are over by at most e/width of all errors '
+                            '(default: 2048)')
+    parser.add_argument('--paths', nargs='?', const='', metavar='PREFIX',
+                       help='Index errors by repository/CA directory/object path and list the most '
+                            'broken CA directories; with a PREFIX (e.g. rpki.afrinic.net/repository) '
+                            'drill down into it')
+    parser.add_argument('--metrics-textfile',
+                       help='Write stage timings and counters to this Prometheus textfile')
+    parser.add_argument('--metrics-json', help='Write stage timings and counters to this JSON file')
+    parser.add_argument('--profile', help='Write cProfile stats of the parse stages to this file')
     
     args = parser.parse_args()
     
-    if not args.file and args.no_fetch:
-        print("Error: --no-fetch requires --file to be specified")
+    if not args.file and not args.import_files and args.no_fetch:
+        print("Error: --no-fetch requires --file or --import to be specified")
         sys.exit(1)
     
-    analyzer = RPKIErrorAnalyzer()
+    incremental = args.follow or args.checkpoint
+    if incremental and (not args.file or len(args.file) != 1 or args.file[0] == '-'):
+        print("Error: --follow and --checkpoint require a single --file")
+        sys.exit(1)
+    if incremental and not args.no_fetch:
+        print("Error: --follow and --checkpoint require --no-fetch")
+        sys.exit(1)
+    if args.checker_config and args.no_fetch:
+        print("Error: --checker-config can't be used with --no-fetch")
+        sys.exit(1)
+    
+    checker = None
+    if args.checker_config:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'monitoring'))
+        from rpki_error_checker import RPKIErrorChecker
+        checker = RPKIErrorChecker(args.checker_config, dry_run=args.dry_run)
+    
+    analyzer = RPKIErrorAnalyzer(args.cache_size)
+    analyzer.keep_records = not args.no_records
+    if args.approximate:
+        if not 4 <= args.sketch_precision <= 16 or args.sketch_width < 1:
+            print("Error: --sketch-precision must be 4..16 and --sketch-width positive")
+            sys.exit(1)
+        analyzer.enable_sketch(args.sketch_precision, args.sketch_width)
+    if args.windows:
+        try:
+            analyzer.enable_windows([parse_duration(size) for size in args.windows.split(',')],
+                                    parse_duration(args.window_bucket))
+        except ValueError as e:
+            print(f"Error: invalid --windows/--window-bucket: {e}")
+            sys.exit(1)
+    if args.paths is not None:
+        analyzer.enable_paths()
+    metrics = RunMetrics('analyzer', args.profile)
+    if args.stream:
+        tagged = not args.no_fetch and len(args.url if checker is None else checker.sources) > 1
+        try:
+            analyzer.sinks = open_sinks(args.stream, append=bool(args.checkpoint), source_column=tagged)
+        except (OSError, ValueError) as e:
+            print(f"Error: can't open --stream output: {e}")
+            sys.exit(1)
     
     # Analyze file if provided
-    if args.file:
-        print(f"Analyzing log file: {args.file}")
-        analyzer.analyze_file(args.file)
+    if incremental:
+        print(f"Analyzing new lines in log file: {args.file[0]}")
+        with metrics.stage('analyze', profile=True):
+            analyzer.analyze_incremental(args.file[0], args.checkpoint, args.follow, args.poll_interval)
+    elif args.file:
+        filepaths = expand_log_paths(args.file)
+        if len(filepaths) == 1:
+            print(f"Analyzing log file: {filepaths[0]}")
+        else:
+            print(f"Analyzing {len(filepaths)} log files with up to {args.jobs} workers")
+        with metrics.stage('analyze', profile=True):
+            analyzer.analyze_files(filepaths, args.jobs)
+    
+    if args.import_files:
+        filepaths = expand_log_paths(args.import_files)
+        print(f"Importing {len(filepaths)} export file(s)")
+        with metrics.stage('import', profile=True):
+            for filepath in filepaths:
+                analyzer.import_export(filepath)
     
     # Fetch live data unless explicitly disabled
-    if not args.no_fetch:
-        print(f"Fetching live data from: {args.url}")
-        analyzer.fetch_console_data(args.url)
+    if checker is not None:
+        print(f"Fetching live data from {len(checker.sources)} source(s) for the CA checker")
+        scanned = analyzer.lines_scanned
+        with metrics.stage('fetch', profile=True):
+            success = checker.run_check(only_changed=not args.all_cas, analyzer=analyzer)
+        checker.close()
+        if not success:
+            print("Error: the CA check failed")
+            sys.exit(1)
+        if analyzer.lines_scanned == scanned and not args.file and not args.import_files:
+            print("No changes at any source since the last check")
+            analyzer.close_sinks()
+            write_metrics(analyzer, metrics, args)
+            return
+    elif not args.no_fetch:
+        try:
+            sources = load_sources(args.url, args.source_timeout)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        with metrics.stage('fetch', profile=True):
+            if len(sources) == 1:
+                print(f"Fetching live data from: {sources[0].url}")
+                fetched = analyzer.fetch_console_data(sources[0].url, args.http_cache,
+                                                      sources[0].timeout)
+            else:
+                print(f"Fetching live data from {len(sources)} sources")
+                fetched = analyzer.fetch_sources(sources, args.http_cache)
+        if not fetched and not args.file and not args.import_files:
+            analyzer.close_sinks()
+            write_metrics(analyzer, metrics, args)
+            return
+    
+    analyzer.close_sinks()
     
     # Generate and display summary
-    analyzer.print_summary()
+    with metrics.stage('summary'):
+        analyzer.print_summary()
+    
+    if args.paths:
+        analyzer.print_paths(args.paths)
+    
+    if args.cache_stats:
+        print(f"Parse cache: {analyzer.parse_cache.format_stats()}")
     
     # Export results if requested
     if args.json:
-        analyzer.export_json(args.json)
+        with metrics.stage('export_json'):
+            analyzer.export_json(args.json)
     
     if args.csv:
-        analyzer.export_csv(args.csv)
+        with metrics.stage('export_csv'):
+            analyzer.export_csv(args.csv)
+    
+    if args.summary_json:
+        with metrics.stage('export_summary'):
+            analyzer.export_summary(args.summary_json)
+    
+    if args.history:
+        with metrics.stage('export_history'):
+            analyzer.export_history(args.history)
+    
+    if args.archive:
+        with metrics.stage('export_archive'):
+            analyzer.export_archive(args.archive)
+    
+    write_metrics(analyzer, metrics, args)
 
 if __name__ == '__main__':
     main()
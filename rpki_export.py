@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+RPKI Streaming Export Sinks
+NDJSON and CSV writers that receive each error line as it is parsed by
+rpki_error_analyzer.py, so bulk exports start immediately and use
+constant memory; a '.gz' suffix compresses the output. The readers turn
+these exports (and -c CSV exports) back into records without re-parsing
+"""
+
+import os
+import csv
+import gzip
+import json
+from abc import ABC, abstractmethod
+from itertools import chain
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+CSV_HEADER = ['Timestamp', 'Host', 'Error_Type', 'Severity', 'Message']
+
+# (timestamp, host, error_types, raw_line, severity, source) of one error line
+ExportRecord = Tuple[Optional[str], Optional[str], Tuple[str, ...], str, str, Optional[str]]
+
+
+def open_output(path: str, append: bool = False):
+    """Open path for writing text, gzip compressed if it ends in .gz.
+
+    Appending to a .gz file adds a gzip member, which readers (gzip -d,
+    gzip.open) concatenate transparently.
+    """
+    mode = 'at' if append else 'wt'
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def is_empty(path: str) -> bool:
+    try:
+        return os.path.getsize(path) == 0
+    except OSError:
+        return True
+
+
+class RecordSink(ABC):
+    """Receives every matched error line; subclasses write it somewhere"""
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        self.records = 0
+        self.file = open_output(path, append)
+
+    @abstractmethod
+    def write(self, timestamp: Optional[str], host: Optional[str], error_types: Iterable[str],
+              raw_line: str, severity: str, source: Optional[str] = None):
+        """Write one error line"""
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class NDJSONSink(RecordSink):
+    """One JSON object per line, in the shape of the analyzer's timeline entries"""
+
+    def write(self, timestamp, host, error_types, raw_line, severity, source=None):
+        entry = {
+            'timestamp': timestamp,
+            'host': host,
+            'error_types': list(error_types),
+            'raw_line': raw_line,
+            'severity': severity
+        }
+        if source is not None:
+            entry['source'] = source
+        self.file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        self.records += 1
+
+
+class CSVSink(RecordSink):
+    """The columns of the analyzer's -c export, one row per error type of a
+    line, in the order the lines are parsed; source_column adds Source"""
+
+    def __init__(self, path: str, append: bool = False, source_column: bool = False):
+        new_file = not append or is_empty(path)
+        super().__init__(path, append)
+        self.source_column = source_column
+        self.writer = csv.writer(self.file)
+        if new_file:
+            self.writer.writerow(CSV_HEADER + (['Source'] if source_column else []))
+
+    def write(self, timestamp, host, error_types, raw_line, severity, source=None):
+        for error_type in error_types:
+            row = [timestamp, host, error_type, severity, raw_line]
+            if self.source_column:
+                row.append(source)
+            self.writer.writerow(row)
+        self.records += 1
+
+
+def open_sink(path: str, append: bool = False, source_column: bool = False) -> RecordSink:
+    """A sink for path chosen by its extension: .csv, or .ndjson/.jsonl (plus optional .gz)"""
+    name = path[:-len('.gz')] if path.endswith('.gz') else path
+    if name.endswith('.csv'):
+        return CSVSink(path, append, source_column)
+    if name.endswith(('.ndjson', '.jsonl')):
+        return NDJSONSink(path, append)
+    raise ValueError(f"can't tell the format of {path} (use .csv, .ndjson or .jsonl, optionally .gz)")
+
+
+def open_sinks(paths: Iterable[str], append: bool = False, source_column: bool = False) -> List[RecordSink]:
+    """Sinks for all paths; those already opened are closed if one fails"""
+    sinks = []
+    try:
+        for path in paths:
+            sinks.append(open_sink(path, append, source_column))
+    except (OSError, ValueError):
+        for sink in sinks:
+            sink.close()
+        raise
+    return sinks
+
+
+def read_ndjson(lines: Iterable[str]) -> Iterator[ExportRecord]:
+    """Records of an NDJSON export"""
+    loads = json.loads
+    for line in lines:
+        if not line.strip():
+            continue
+        entry = loads(line)
+        yield (entry.get('timestamp'), entry.get('host'), tuple(entry['error_types']),
+               entry['raw_line'], entry['severity'], entry.get('source'))
+
+
+def read_csv(lines: Iterable[str], scattered: bool = False) -> Iterator[ExportRecord]:
+    """Records of a CSV export, joining the rows of each line's error types.
+
+    Streamed CSVs list a line's error types on consecutive rows, which
+    are joined as they are read. The -c export groups rows by error type,
+    so a line with several types has rows far apart; scattered joins
+    those too, at the cost of holding every record until the end (in
+    order of first appearance). Without it such a line is read as one
+    record per type: error counts and hosts stay exact, but the line is
+    counted once per type in the timeline and severities. Empty cells
+    are None, as they were before export.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    if header[:len(CSV_HEADER)] != CSV_HEADER:
+        raise ValueError(f"not an analyzer CSV export (header {','.join(header)})")
+    tagged = len(header) > len(CSV_HEADER)
+
+    if scattered:
+        records = []
+        by_line = {}
+        for row in reader:
+            timestamp, host, error_type, severity, message = row[:5]
+            source = (row[5] or None) if tagged else None
+            key = (timestamp, host, message, severity, source)
+            for record in by_line.get(key, ()):
+                if error_type not in record[2]:
+                    record[2].append(error_type)
+                    break
+            else:
+                record = (timestamp or None, host or None, [error_type], message, severity, source)
+                records.append(record)
+                by_line.setdefault(key, []).append(record)
+        for timestamp, host, error_types, message, severity, source in records:
+            yield timestamp, host, tuple(error_types), message, severity, source
+        return
+
+    pending = None
+    for row in reader:
+        timestamp, host, error_type, severity, message = row[:5]
+        source = (row[5] or None) if tagged else None
+        if (pending is not None and message == pending[3] and timestamp == (pending[0] or '')
+                and host == (pending[1] or '') and source == pending[5]
+                and error_type not in pending[2]):
+            pending = pending[:2] + (pending[2] + (error_type,),) + pending[3:]
+            continue
+        if pending is not None:
+            yield pending
+        pending = (timestamp or None, host or None, (error_type,), message, severity, source)
+    if pending is not None:
+        yield pending
+
+
+def read_export(lines: Iterable[str], scattered: bool = False) -> Iterator[ExportRecord]:
+    """Records of a CSV or NDJSON export, told apart by the first line;
+    scattered is passed on to read_csv()"""
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return iter(())
+    lines = chain((first,), lines)
+    if first.lstrip().startswith('{'):
+        return read_ndjson(lines)
+    return read_csv(lines, scattered)
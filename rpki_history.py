@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+RPKI Error History Store
+Embedded SQLite store for RPKI errors found by rpki_error_analyzer.py and
+monitoring/rpki_error_checker.py, written in batched transactions. Both
+store the analyzer's error types and the message and object location of
+each line, so their rows deduplicate and are queried alike
+"""
+
+import re
+import sqlite3
+import hashlib
+import calendar
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from rpki_parse_cache import PROGRAM_TAGS
+from rpki_paths import strip_address
+from rpki_patterns import ERROR_TYPE_PATTERNS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS error_types (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS errors (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER,
+    host_id INTEGER REFERENCES hosts(id),
+    error_type_id INTEGER NOT NULL REFERENCES error_types(id),
+    severity INTEGER NOT NULL,
+    path TEXT,
+    message TEXT NOT NULL,
+    content_hash INTEGER NOT NULL UNIQUE
+);
+
+-- Indexes for the common queries: per host, per type, per time range
+CREATE INDEX IF NOT EXISTS idx_errors_host_ts ON errors(host_id, ts);
+CREATE INDEX IF NOT EXISTS idx_errors_type_ts ON errors(error_type_id, ts);
+CREATE INDEX IF NOT EXISTS idx_errors_ts ON errors(ts);
+"""
+
+# History error type of messages that match none of the patterns
+OTHER_ERROR_TYPE = 'other'
+
+SEVERITY_CODES = {'LOW': 0, 'MEDIUM': 1, 'HIGH': 2}
+SEVERITY_NAMES = {code: name for name, code in SEVERITY_CODES.items()}
+
+SYSLOG_MONTHS = {name: i for i, name in enumerate(
+    ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+     'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], 1)}
+
+
+def parse_syslog_timestamp(timestamp: Optional[str], now: Optional[float] = None) -> Optional[int]:
+    """Convert a syslog 'Sep 27 23:39:26' timestamp to UTC epoch seconds.
+
+    Syslog timestamps carry no year: the current year is assumed, or the
+    previous one if that would put the timestamp more than a day ahead of
+    now (a December line read in January).
+    """
+    if not timestamp:
+        return None
+    try:
+        month_name, day, clock = timestamp.split()
+        hour, minute, second = clock.split(':')
+        seconds = int(hour) * 3600 + int(minute) * 60 + int(second)
+        now = time.time() if now is None else now
+        year = time.gmtime(now).tm_year
+        epoch = syslog_midnight(year, month_name, day) + seconds
+        if epoch > now + 86400:
+            epoch = syslog_midnight(year - 1, month_name, day) + seconds
+        return epoch
+    except (ValueError, KeyError):
+        return None
+
+
+@lru_cache(maxsize=1024)
+def syslog_midnight(year: int, month_name: str, day: str) -> int:
+    """UTC epoch of the start of a syslog day ('Sep', '27') in year"""
+    return calendar.timegm((year, SYSLOG_MONTHS[month_name], int(day), 0, 0, 0))
+
+
+def split_error_line(line: str) -> Tuple[Optional[str], str]:
+    """(object location, message) of an rpki-client log line.
+
+    The location loses its trailing ' (address)'; lines without a
+    location are (None, line).
+    """
+    for tag in PROGRAM_TAGS:
+        start = line.find(tag)
+        if start != -1:
+            break
+    else:
+        return None, line
+    start += len(tag)
+    end = line.find(': ', start)
+    if end == -1:
+        return None, line
+    return strip_address(line[start:end]), line[end + 2:].strip()
+
+
+class ErrorTypeMatcher:
+    """Error types of messages (a checker's), memoized per message"""
+
+    def __init__(self):
+        self.patterns = [(error_type, re.compile(pattern, re.IGNORECASE))
+                         for error_type, pattern in ERROR_TYPE_PATTERNS.items()]
+        self.cache: Dict[str, List[str]] = {}
+
+    def error_types(self, message: str) -> List[str]:
+        """Matching error types in ERROR_TYPE_PATTERNS order, [OTHER_ERROR_TYPE] if none"""
+        error_types = self.cache.get(message)
+        if error_types is None:
+            if len(self.cache) >= 4096:
+                self.cache.clear()
+            error_types = self.cache[message] = [error_type for error_type, regex in self.patterns
+                                                 if regex.search(message)] or [OTHER_ERROR_TYPE]
+        return error_types
+
+
+def content_hash(ts: Optional[int], error_type: str, path: Optional[str], message: str) -> int:
+    """Signed 64-bit hash identifying an error occurrence, used for dedup.
+
+    ts is the epoch from parse_syslog_timestamp, not the syslog text, so
+    the same line seen in different years is stored once per year.
+    """
+    digest = hashlib.blake2b(
+        '\x1f'.join(('' if ts is None else str(ts), error_type, path or '', message)).encode('utf-8'),
+        digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class ErrorHistory:
+    """SQLite error history with integer-coded hosts, types and timestamps"""
+
+    def __init__(self, db_path: str, batch_size: int = 50000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        # Keep the index b-trees in memory during large random-key inserts
+        self.conn.execute('PRAGMA cache_size=-65536')
+        self.conn.executescript(SCHEMA)
+        self.host_ids = dict(self.conn.execute('SELECT name, id FROM hosts'))
+        self.type_ids = dict(self.conn.execute('SELECT name, id FROM error_types'))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _lookup_id(self, table: str, cache: Dict[str, int], name: str) -> int:
+        if name not in cache:
+            self.conn.execute(f'INSERT OR IGNORE INTO {table} (name) VALUES (?)', (name,))
+            cache[name] = self.conn.execute(
+                f'SELECT id FROM {table} WHERE name = ?', (name,)).fetchone()[0]
+        return cache[name]
+
+    def _encode(self, rows: Iterable[Tuple], now: float) -> Iterator[Tuple]:
+        epochs = {}
+        for timestamp, host, error_type, severity, path, message in rows:
+            if timestamp not in epochs:
+                epochs[timestamp] = parse_syslog_timestamp(timestamp, now)
+            ts = epochs[timestamp]
+            yield (
+                ts,
+                self._lookup_id('hosts', self.host_ids, host) if host else None,
+                self._lookup_id('error_types', self.type_ids, error_type),
+                SEVERITY_CODES.get(severity, 0),
+                path,
+                message,
+                content_hash(ts, error_type, path, message)
+            )
+
+    def add_errors(self, rows: Iterable[Tuple]) -> int:
+        """Insert (timestamp, host, error_type, severity, path, message) rows.
+
+        error_type is one of ERROR_TYPE_PATTERNS (or OTHER_ERROR_TYPE), path
+        and message are split from the log line as by split_error_line, so
+        the same error from the analyzer and the checker is stored once.
+        Rows are written with executemany in transactions of batch_size;
+        rows already stored (same content hash) are skipped. Returns the
+        number of new rows.
+        """
+        inserted = 0
+        encoded = self._encode(rows, time.time())
+        while True:
+            batch = [row for _, row in zip(range(self.batch_size), encoded)]
+            if not batch:
+                break
+            with self.conn:
+                cursor = self.conn.executemany(
+                    'INSERT OR IGNORE INTO errors '
+                    '(ts, host_id, error_type_id, severity, path, message, content_hash) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+                inserted += cursor.rowcount
+        return inserted
+
+    def _select(self, where: str, params: List, since: Optional[int], until: Optional[int]) -> List[Dict]:
+        if since is not None:
+            where += ' AND e.ts >= ?'
+            params.append(since)
+        if until is not None:
+            where += ' AND e.ts < ?'
+            params.append(until)
+        cursor = self.conn.execute(
+            'SELECT e.ts, h.name, t.name, e.severity, e.path, e.message FROM errors e '
+            'LEFT JOIN hosts h ON h.id = e.host_id '
+            'JOIN error_types t ON t.id = e.error_type_id '
+            f'WHERE {where} ORDER BY e.ts', params)
+        return [{
+            'timestamp': ts,
+            'host': host,
+            'error_type': error_type,
+            'severity': SEVERITY_NAMES[severity],
+            'path': path,
+            'message': message
+        } for ts, host, error_type, severity, path, message in cursor]
+
+    def errors_for_host(self, host: str, since: Optional[int] = None,
+                        until: Optional[int] = None) -> List[Dict]:
+        """Errors recorded for host, optionally limited to [since, until)"""
+        host_id = self.host_ids.get(host)
+        if host_id is None:
+            return []
+        return self._select('e.host_id = ?', [host_id], since, until)
+
+    def errors_of_type(self, error_type: str, since: Optional[int] = None,
+                       until: Optional[int] = None) -> List[Dict]:
+        """Errors recorded with error_type, optionally limited to [since, until)"""
+        type_id = self.type_ids.get(error_type)
+        if type_id is None:
+            return []
+        return self._select('e.error_type_id = ?', [type_id], since, until)
+
+    def errors_between(self, since: int, until: int) -> List[Dict]:
+        """All errors with since <= timestamp < until"""
+        return self._select('1', [], since, until)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+RPKI Console HTTP Fetching
+Streams the rpki-client console page line by line and remembers its
+ETag/Last-Modified validators between runs for conditional requests
+"""
+
+import os
+import json
+import codecs
+import logging
+from typing import Dict, Iterator, Optional
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class NotModified(Exception):
+    """Raised when the server answers a conditional request with 304"""
+
+
+class ConditionalFetcher:
+    """Fetches pages as line streams, sending If-None-Match/If-Modified-Since
+    from the validators persisted in cache_file by the previous run"""
+
+    def __init__(self, cache_file: Optional[str] = None, timeout: int = 30,
+                 session: Optional[requests.Session] = None):
+        self.cache_file = cache_file
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.validators = self.load_cache()
+
+    def load_cache(self) -> Dict[str, Dict[str, str]]:
+        """Load per-URL validators saved by a previous run"""
+        if not self.cache_file:
+            return {}
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable HTTP cache {self.cache_file}: {e}")
+            return {}
+
+    def save_cache(self):
+        """Persist validators, replacing the cache file atomically"""
+        if not self.cache_file:
+            return
+        tmp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(self.validators, f, indent=2)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            logger.warning(f"Failed to save HTTP cache {self.cache_file}: {e}")
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Request headers that let the server answer 304 for an unchanged page"""
+        headers = {}
+        cached = self.validators.get(url, {})
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        return headers
+
+    def iter_lines(self, url: str, timeout: Optional[float] = None,
+                   conditional: bool = True) -> Iterator[str]:
+        """Fetch url and return an iterator over its decoded lines.
+
+        Lines are yielded while the body is still downloading. Validators
+        are only recorded once the iterator is exhausted and only persisted
+        by save_cache(), which callers invoke after the page has been fully
+        processed, so an interrupted run is retried in full next time.
+        Raises NotModified on 304 and requests.RequestException on any
+        other failure. timeout overrides the fetcher's default; with
+        conditional=False the page is fetched even if unchanged.
+        """
+        headers = self.conditional_headers(url) if conditional else {}
+        response = self.session.get(url, headers=headers,
+                                    timeout=timeout or self.timeout, stream=True)
+        if response.status_code == 304:
+            response.close()
+            raise NotModified(url)
+        try:
+            response.raise_for_status()
+        except requests.RequestException:
+            response.close()
+            raise
+        if response.encoding is None:
+            response.encoding = 'utf-8'
+        return self._stream_lines(url, response)
+
+    def _stream_lines(self, url: str, response: requests.Response) -> Iterator[str]:
+        # Split on '\n' (dropping the '\r' of '\r\n') only; the
+        # str.splitlines() behind response.iter_lines() would also split on
+        # '\x0b', '\x85', '\u2028' and friends inside a message
+        decoder = codecs.getincrementaldecoder(response.encoding)(errors='replace')
+        pending = ''
+        with response:
+            for chunk in response.iter_content(chunk_size=65536):
+                lines = (pending + decoder.decode(chunk)).split('\n')
+                pending = lines.pop()
+                for line in lines:
+                    yield line[:-1] if line.endswith('\r') else line
+            pending += decoder.decode(b'', final=True)
+        if pending:
+            yield pending[:-1] if pending.endswith('\r') else pending
+        self.remember(url, response.headers)
+
+    def remember(self, url: str, headers) -> None:
+        """Record the validators of a fully processed response"""
+        validators = {}
+        if headers.get('ETag'):
+            validators['etag'] = headers['ETag']
+        if headers.get('Last-Modified'):
+            validators['last_modified'] = headers['Last-Modified']
+        if validators:
+            self.validators[url] = validators
+        else:
+            self.validators.pop(url, None)
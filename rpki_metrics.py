@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+RPKI Run Metrics
+Per-stage wall time and counters for a run of rpki_error_analyzer.py or
+monitoring/rpki_error_checker.py, written as a Prometheus node-exporter
+textfile and a JSON sidecar, with optional cProfile dumps of hot stages
+"""
+
+import os
+import json
+import time
+import cProfile
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+PREFIX = 'rpki'
+
+# name -> (type, help) of the metrics written to the textfile
+METRIC_HELP = {
+    'stage_duration_seconds': ('gauge', 'Wall time of each stage of the last run'),
+    'run_duration_seconds': ('gauge', 'Wall time of the last run'),
+    'last_run_timestamp_seconds': ('gauge', 'Unix time the last run finished'),
+    'last_run_success': ('gauge', '1 if the last run succeeded'),
+    'lines_scanned': ('gauge', 'Log lines read in the last run'),
+    'lines_matched': ('gauge', 'Log lines that matched an error in the last run'),
+    # Each tool classifies errors its own way, so each has its own series
+    'checker_errors': ('gauge', 'Errors found in the last run per checker category and severity'),
+    'analyzer_errors': ('gauge', 'Errors found in the last run per analyzer error type'),
+    'emails_sent': ('gauge', 'Report emails delivered in the last run'),
+    'emails_failed': ('gauge', 'Report emails that failed in the last run'),
+    'source_success': ('gauge', '1 if the source was fetched in the last run'),
+    'source_duration_seconds': ('gauge', 'Wall time of fetching and parsing the source in the last run'),
+    'email_latency_seconds': ('summary', 'Per-message email delivery latency in the last run'),
+}
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class RunMetrics:
+    """Stage timers and labelled values for one run.
+
+    stage() accumulates wall time per stage name; set() and add() record
+    values under a metric name and label set. profile_path enables
+    cProfile for stages entered with profile=True; their combined stats
+    are dumped by write(). Every series is labelled tool="<tool>" (not
+    job, which Prometheus sets itself when scraping).
+    """
+
+    def __init__(self, tool: str, profile_path: Optional[str] = None):
+        self.tool = tool
+        self.started = time.time()
+        self.stages: Dict[str, float] = {}
+        self.values: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.profile_path = profile_path
+        self.profiler = cProfile.Profile() if profile_path else None
+
+    @contextmanager
+    def stage(self, name: str, profile: bool = False) -> Iterator[None]:
+        """Time the enclosed block as stage name"""
+        profiler = self.profiler if profile else None
+        if profiler:
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+            if profiler:
+                profiler.disable()
+
+    def set(self, name: str, value: float, **labels):
+        self.values[name, tuple(sorted(labels.items()))] = value
+
+    def add(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.values[key] = self.values.get(key, 0) + value
+
+    def count_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        """Pass lines through, counting them as lines_scanned"""
+        count = 0
+        try:
+            for line in lines:
+                count += 1
+                yield line
+        finally:
+            self.add('lines_scanned', count)
+
+    def observe_latencies(self, name: str, latencies: List[float]):
+        """Record count, sum, median and maximum of a list of latencies"""
+        if not latencies:
+            return
+        ordered = sorted(latencies)
+        self.set(name, ordered[len(ordered) // 2], quantile='0.5')
+        self.set(name, ordered[-1], quantile='1')
+        self.set(f'{name}_sum', sum(ordered))
+        self.set(f'{name}_count', len(ordered))
+
+    def finish(self, success: bool = True):
+        """Record the run's total duration and outcome"""
+        self.set('run_duration_seconds', time.time() - self.started)
+        self.set('last_run_timestamp_seconds', time.time())
+        self.set('last_run_success', 1 if success else 0)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """(metric name, labels, value) for every stage and value, tool label included"""
+        rows = [('stage_duration_seconds', {'tool': self.tool, 'stage': stage}, seconds)
+                for stage, seconds in self.stages.items()]
+        rows.extend((name, dict(labels, tool=self.tool), value)
+                    for (name, labels), value in self.values.items())
+        return rows
+
+    def to_prometheus(self) -> str:
+        lines = []
+        described = set()
+        for name, labels, value in sorted(self.samples(), key=lambda row: row[0]):
+            base = name[:-len('_sum')] if name.endswith('_sum') else \
+                name[:-len('_count')] if name.endswith('_count') else name
+            if base not in described and base in METRIC_HELP:
+                metric_type, help_text = METRIC_HELP[base]
+                lines.append(f"# HELP {PREFIX}_{base} {help_text}")
+                lines.append(f"# TYPE {PREFIX}_{base} {metric_type}")
+                described.add(base)
+            label_text = ','.join(f'{key}="{escape_label(val)}"' for key, val in sorted(labels.items()))
+            lines.append(f"{PREFIX}_{name}{{{label_text}}} {format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self) -> Dict:
+        values = {}
+        for (name, labels), value in self.values.items():
+            values.setdefault(name, []).append(dict(labels, value=value))
+        return {
+            'tool': self.tool,
+            'started': self.started,
+            'stages': {stage: round(seconds, 6) for stage, seconds in self.stages.items()},
+            'values': values
+        }
+
+    def write(self, textfile: Optional[str] = None, json_file: Optional[str] = None):
+        """Write the textfile, the JSON sidecar and the profile, each atomically"""
+        if textfile:
+            atomic_write(textfile, self.to_prometheus())
+        if json_file:
+            atomic_write(json_file, json.dumps(self.to_json(), indent=2) + '\n')
+        if self.profiler:
+            self.profiler.dump_stats(self.profile_path)
+
+
+def format_value(value: float) -> str:
+    """Integers as-is, floats to microsecond precision (timestamps keep all digits)"""
+    if isinstance(value, int):
+        return str(value)
+    return repr(round(value, 6))
+
+
+def atomic_write(path: str, text: str):
+    """Replace path with text so readers (e.g. node-exporter) never see a partial file"""
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'w') as f:
+        f.write(text)
+    os.replace(tmp_file, path)
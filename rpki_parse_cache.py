@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+RPKI Parse Cache
+LRU cache of classification results keyed on a normalized message
+template, used by rpki_error_analyzer.py and rpki_error_checker.py
+"""
+
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+# Program tags after which rpki-client log lines carry the object location
+PROGRAM_TAGS = ('rpki-client: ', 'openrsync: ')
+
+MISSING = object()
+
+
+def line_template(line: str, timestamp: Optional[str] = None) -> str:
+    """Reduce a log line to a template shared by lines that differ only in
+    their syslog timestamp, object file name or peer IP address.
+
+    timestamp is the line's leading timestamp, if already extracted. In the
+    object location (between the program tag and the next ': '), the file
+    name stem and a trailing ' (address)' are replaced with '*'. Only
+    whitespace-free text is replaced, so multi-word error patterns match a
+    template exactly when they match the line.
+    """
+    if timestamp and line.startswith(timestamp):
+        line = line[len(timestamp):]
+    for tag in PROGRAM_TAGS:
+        start = line.find(tag)
+        if start != -1:
+            break
+    else:
+        return line
+    start += len(tag)
+    end = line.find(': ', start)
+    if end == -1:
+        return line
+
+    location = line[start:end]
+    address = ''
+    paren = location.rfind(' (')
+    if paren != -1 and location.endswith(')') and ' ' not in location[paren + 2:]:
+        location = location[:paren]
+        address = ' (*)'
+    if ' ' in location:
+        return line
+    slash = location.rfind('/')
+    dot = location.rfind('.')
+    if dot > slash >= 0:
+        location = location[:slash + 1] + '*' + location[dot:]
+    return line[:start] + location + address + line[end:]
+
+
+class ParseCache:
+    """LRU-bounded mapping of message templates to classification results.
+
+    May be shared by threads (e.g. concurrently parsed sources); the
+    hit/miss counters are then approximate.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default=MISSING):
+        """Return the cached value for key (marking it recently used) or default"""
+        value = self.entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+            return default
+        try:
+            self.entries.move_to_end(key)
+        except KeyError:
+            pass  # evicted by another thread since the lookup
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value):
+        """Cache value under key, evicting the least recently used entry when full"""
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = value
+        try:
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        except KeyError:
+            pass  # another thread evicted first
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def format_stats(self) -> str:
+        stats = self.stats()
+        return (f"{stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.1%} hit rate), {stats['size']}/{stats['maxsize']} entries, "
+                f"{stats['evictions']} evictions")
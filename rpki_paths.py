@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+RPKI Repository Path Index
+Prefix tree of error counts over repository / CA directory / object paths,
+with counts by error type and severity rolled up at every node, so any
+subtree can be drilled into and its most broken CA directories ranked
+without going back to the individual errors
+"""
+
+import heapq
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from rpki_parse_cache import PROGRAM_TAGS
+
+SEVERITIES = ('HIGH', 'MEDIUM', 'LOW')
+# Signed objects a CA publishes; a directory holding any is a CA directory
+OBJECT_SUFFIXES = ('.cer', '.crl', '.mft', '.roa', '.gbr', '.asa', '.aspa', '.tak', '.spl')
+
+
+def strip_address(location: str) -> str:
+    """location without a trailing ' (address)' of the peer it was fetched from"""
+    paren = location.rfind(' (')
+    if paren != -1 and location.endswith(')') and ' ' not in location[paren + 2:]:
+        return location[:paren]
+    return location
+
+
+def object_location(line: str) -> Optional[str]:
+    """The object URI/path a log line is about, without a trailing ' (address)'"""
+    for tag in PROGRAM_TAGS:
+        start = line.find(tag)
+        if start != -1:
+            break
+    else:
+        return None
+    start += len(tag)
+    end = line.find(': ', start)
+    if end == -1:
+        return None
+    return strip_address(line[start:end])
+
+
+def split_location(location: str) -> Optional[List[str]]:
+    """Path segments of an object location, repository host first.
+
+    'rsync://' and 'https://' prefixes, the '.rsync/' and '.rrdp/<hash>/'
+    cache directories and a trailing ' (address)' are dropped, so the
+    same object has the same path however it was fetched. None if the
+    location doesn't start with a host name (e.g. 'warning').
+    """
+    location = strip_address(location)
+    scheme = location.find('://')
+    if scheme != -1:
+        location = location[scheme + 3:]
+    segments = [segment for segment in location.split('/') if segment]
+    if segments and segments[0] == '.rsync':
+        segments = segments[1:]
+    elif segments and segments[0] == '.rrdp':
+        segments = segments[2:]
+    if not segments or '.' not in segments[0] or ' ' in segments[0]:
+        return None
+    return segments
+
+
+class PathNode:
+    """One path segment: its children and the errors below it"""
+
+    __slots__ = ('children', 'counts', 'total', 'objects')
+
+    def __init__(self):
+        # None for objects (leaves)
+        self.children: Optional[Dict[str, 'PathNode']] = None
+        # (error_type, severity) -> errors in this subtree; most objects only
+        # ever get one kind of error, so a single key is kept as the bare
+        # (error_type, severity) tuple (counting total) until a second appears
+        self.counts = None
+        self.total = 0
+        # Distinct objects with errors in this subtree
+        self.objects = 0
+
+    def count_items(self) -> Iterable[Tuple[Tuple[str, str], int]]:
+        counts = self.counts
+        if counts is None:
+            return ()
+        if isinstance(counts, tuple):
+            return ((counts, self.total),)
+        return counts.items()
+
+    def add(self, counts: List[Tuple[Tuple[str, str], int]], total: int):
+        node_counts = self.counts
+        if len(counts) == 1 and (node_counts is None or node_counts == counts[0][0]):
+            self.counts = counts[0][0]
+        else:
+            if node_counts is None:
+                node_counts = self.counts = {}
+            elif isinstance(node_counts, tuple):
+                node_counts = self.counts = {node_counts: self.total}
+            for key, count in counts:
+                node_counts[key] = node_counts.get(key, 0) + count
+        self.total += total
+
+    def by_severity(self) -> Dict[str, int]:
+        counts = {}
+        for (error_type, severity), count in self.count_items():
+            counts[severity] = counts.get(severity, 0) + count
+        return {severity: counts[severity] for severity in
+                sorted(counts, key=lambda s: SEVERITIES.index(s) if s in SEVERITIES else len(SEVERITIES))}
+
+    def by_type(self) -> Dict[str, int]:
+        counts = {}
+        for (error_type, severity), count in self.count_items():
+            counts[error_type] = counts.get(error_type, 0) + count
+        return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+    def severity_count(self, severity: Optional[str]) -> int:
+        if severity is None:
+            return self.total
+        return sum(count for (error_type, level), count in self.count_items() if level == severity)
+
+
+class PathIndex:
+    """Prefix tree of error counts keyed by repository path segments.
+
+    add() increments the counts of every node on an object's path, so
+    each node holds the totals of its whole subtree and describe() or
+    top_directories() never revisit individual errors.
+    """
+
+    def __init__(self):
+        self.root = PathNode()
+        self.root.children = {}
+        self.skipped = 0
+        # Shared (error_type, severity) keys, held by most objects
+        self.keys: Dict[Tuple[str, str], Tuple[str, str]] = {}
+
+    def add(self, location: Optional[str], error_types: Iterable[str], severity: str, count: int = 1):
+        """Count an error line about location under each of its error types"""
+        segments = split_location(location) if location else None
+        if segments is None:
+            self.skipped += count
+            return
+        keys = self.keys
+        self.add_segments(segments, [(keys.setdefault((error_type, severity), (error_type, severity)), count)
+                                     for error_type in error_types])
+
+    def add_segments(self, segments: List[str], counts: List[Tuple[Tuple[str, str], int]]):
+        node = self.root
+        path = [node]
+        created = False
+        for segment in segments:
+            children = node.children
+            if children is None:
+                # An object name turned out to be a directory too
+                children = node.children = {}
+            child = children.get(segment)
+            created = child is None
+            if created:
+                child = children[segment] = PathNode()
+            node = child
+            path.append(node)
+
+        total = sum(count for key, count in counts)
+        single = counts[0][0] if len(counts) == 1 else None
+        for node in path:
+            node_counts = node.counts
+            if single is not None and type(node_counts) is dict:
+                # The common case for directories, inlined
+                node_counts[single] = node_counts.get(single, 0) + total
+                node.total += total
+            else:
+                node.add(counts, total)
+            if created:
+                node.objects += 1
+
+    def node(self, path: str = '') -> Optional[PathNode]:
+        """The node for a path prefix ('' for the root)"""
+        node = self.root
+        for segment in (split_location(path) or []) if path else []:
+            if node.children is None:
+                return None
+            node = node.children.get(segment)
+            if node is None:
+                return None
+        return node
+
+    def describe(self, path: str = '', limit: int = 20, severity: Optional[str] = None) -> Optional[Dict]:
+        """JSON-ready totals of a subtree and its largest children"""
+        node = self.node(path)
+        if node is None:
+            return None
+        children = node.children or {}
+        largest = heapq.nlargest(limit, children.items(),
+                                 key=lambda item: (item[1].severity_count(severity), item[0]))
+        return {
+            'path': '/'.join(split_location(path) or []) if path else '',
+            'errors': node.total,
+            'objects': node.objects,
+            'by_severity': node.by_severity(),
+            'by_type': node.by_type(),
+            'children_total': len(children),
+            'children': [{'name': name, 'errors': child.total, 'objects': child.objects,
+                          'by_severity': child.by_severity()} for name, child in largest]
+        }
+
+    def directories(self, path: str = '') -> Iterator[Tuple[str, PathNode]]:
+        """(path, node) of every CA directory (holding signed objects) under a path prefix"""
+        start = self.node(path)
+        if start is None or start.children is None:
+            return
+        prefix = '/'.join(split_location(path) or []) if path else ''
+        stack = [(prefix, start)]
+        while stack:
+            current, node = stack.pop()
+            holds_objects = False
+            for name, child in node.children.items():
+                if child.children is None:
+                    holds_objects = holds_objects or name.endswith(OBJECT_SUFFIXES)
+                else:
+                    stack.append((f"{current}/{name}" if current else name, child))
+            if holds_objects and current:
+                yield current, node
+
+    def top_directories(self, path: str = '', limit: int = 10,
+                        severity: Optional[str] = None) -> List[Dict]:
+        """The CA directories under path with the most errors (of severity, if given)"""
+        largest = heapq.nlargest(limit, self.directories(path),
+                                 key=lambda item: (item[1].severity_count(severity), item[0]))
+        return [{'path': directory, 'errors': node.total, 'objects': node.objects,
+                 'by_severity': node.by_severity(), 'by_type': node.by_type()}
+                for directory, node in largest if node.severity_count(severity)]
+
+    def to_dict(self) -> Dict:
+        """State for a checkpoint; from_dict() restores it.
+
+        Each node is [total, objects, counts, children], counts being
+        [error_type, severity] for a single kind of error or a list of
+        [error_type, severity, count], and children a dict (None for objects).
+        """
+        def encode(node: PathNode) -> List:
+            counts = node.counts
+            if isinstance(counts, tuple):
+                counts = list(counts)
+            elif counts is not None:
+                counts = [[error_type, severity, count] for (error_type, severity), count in counts.items()]
+            children = None if node.children is None else \
+                {name: encode(child) for name, child in node.children.items()}
+            return [node.total, node.objects, counts, children]
+
+        return {'skipped': self.skipped, 'root': encode(self.root)}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'PathIndex':
+        index = cls()
+        keys = index.keys
+
+        def decode(saved: List) -> PathNode:
+            node = PathNode()
+            node.total, node.objects, counts, children = saved
+            if counts and isinstance(counts[0], str):
+                key = (counts[0], counts[1])
+                node.counts = keys.setdefault(key, key)
+            elif counts is not None:
+                node.counts = {}
+                for error_type, severity, count in counts:
+                    key = (error_type, severity)
+                    node.counts[keys.setdefault(key, key)] = count
+            if children is not None:
+                node.children = {name: decode(child) for name, child in children.items()}
+            return node
+
+        index.skipped = state['skipped']
+        index.root = decode(state['root'])
+        return index
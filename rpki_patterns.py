@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+RPKI Error Type Patterns
+rpki-client message patterns per error type, shared by the analyzer's
+line classification and the error types of the history store
+"""
+
+# Case-insensitive regex per error type, in classification order
+ERROR_TYPE_PATTERNS = {
+    'connection_timeout': r'connect timeout',
+    'connection_refused': r'connect refused',
+    'no_route_to_host': r'No route to host',
+    'dns_resolution_failed': r'no address associated with name',
+    'crl_expired': r'CRL has expired',
+    'cert_expired': r'certificate has expired',
+    'cert_not_yet_valid': r'certificate is not yet valid',
+    'manifest_unavailable': r'no valid manifest available',
+    'seqnum_gap': r'seqnum gap detected',
+    'tls_handshake_failed': r'TLS handshake.*certificate verification failed',
+    'unexpected_manifest_number': r'unexpected manifest number',
+    'rfc3779_resource_violation': r'RFC 3779 resource not subset',
+    'notification_not_modified': r'notification file not modified',
+    'fallback_to_rsync': r'fallback to rsync',
+    'fallback_to_cache': r'fallback to cache',
+    'cross_origin_redirect': r'cross origin redirect',
+    'unexpected_end_of_file': r'unexpected end of file',
+    'invalid_vcard': r'invalid vCard'
+}
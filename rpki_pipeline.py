@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+RPKI Shared Ingest Pipeline
+Fetches the rpki-client console once and parses each line once into a
+single record stream that feeds both the analyzer's summary/exports and
+the checker's per-CA reports
+"""
+
+import os
+import sys
+import argparse
+import threading
+from typing import Iterable, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'monitoring'))
+from rpki_error_analyzer import RPKIErrorAnalyzer, open_log
+from rpki_error_checker import ERROR_LINE_RE, REPOSITORY_RE, RPKIError, RPKIErrorChecker, logger
+from rpki_history import SEVERITY_CODES
+
+
+class IngestRecord:
+    """One parsed console line with the fields both consumers need.
+
+    error_types are the analyzer's pattern names (empty if none matched),
+    category is the checker's; location, message and repository are set
+    only for lines in the checker's 'timestamp rpki-client: location:
+    message' form. host is the analyzer's, repository the checker's (taken
+    from the location, so CAs are grouped as by the checker alone).
+    timestamp and severity are shared by both outputs.
+    """
+
+    __slots__ = ('timestamp', 'host', 'repository', 'location', 'message', 'raw_line',
+                 'error_types', 'category', 'severity')
+
+    def __init__(self, timestamp, host, repository, location, message, raw_line,
+                 error_types, category, severity):
+        self.timestamp = timestamp
+        self.host = host
+        self.repository = repository
+        self.location = location
+        self.message = message
+        self.raw_line = raw_line
+        self.error_types = error_types
+        self.category = category
+        self.severity = severity
+
+
+class SharedIngest:
+    """Parses console lines once and hands each record to an analyzer and a checker.
+
+    Timestamps come from the analyzer's matcher. A line's severity is the
+    higher of the analyzer's and the checker's (config) classification,
+    so the same line is never reported at two different severities.
+    Several sources may be parsed at once (see parse_errors); the
+    analyzer is only updated under a lock.
+    """
+
+    def __init__(self, analyzer: RPKIErrorAnalyzer, checker: RPKIErrorChecker):
+        self.analyzer = analyzer
+        self.checker = checker
+        self.lock = threading.Lock()
+        self.lines = 0
+        self.records = 0
+
+    def parse_line(self, line: str) -> Optional[IngestRecord]:
+        """Parse a console line, or return None if neither consumer wants it"""
+        if 'rpki-client:' not in line and 'openrsync:' not in line:
+            return None
+        line = line.strip()
+
+        timestamp = self.analyzer.matcher.match_timestamp(line)
+        match = ERROR_LINE_RE.match(line)
+        if match:
+            _, location, message = match.groups()
+            repo_match = REPOSITORY_RE.search(location)
+            repository = repo_match.group(1) if repo_match else "unknown"
+        else:
+            location = message = repository = None
+
+        classified = self.analyzer.classify_cached(line, timestamp)
+        if classified is None and message is None:
+            return None
+        error_types, analyzer_severity = classified or ((), None)
+
+        category, severity = self.checker.classify_message(message if message is not None else line)
+        if analyzer_severity and SEVERITY_CODES[analyzer_severity] > SEVERITY_CODES.get(severity, 0):
+            severity = analyzer_severity
+
+        return IngestRecord(timestamp, self.analyzer.matcher.match_host(line), repository, location,
+                            message, line, error_types, category, severity)
+
+    def to_error(self, record: IngestRecord) -> Optional[RPKIError]:
+        """The checker's error for a record, None if the line isn't in its form"""
+        if record.message is None:
+            return None
+        return RPKIError(
+            timestamp=record.timestamp,
+            error_type=record.category,
+            repository=record.repository,
+            file_path=record.location,
+            error_message=record.message,
+            severity=record.severity
+        )
+
+    def parse_errors(self, lines: Iterable[str], source: Optional[str] = None) -> List[RPKIError]:
+        """The checker's errors in lines, feeding the analyzer on the way.
+
+        This is what RPKIErrorChecker.parse_rpki_errors does with an
+        analyzer attached (see RPKIErrorChecker.run_check); analyzer
+        records are tagged with source.
+        """
+        errors = []
+        scanned = records = 0
+        for scanned, line in enumerate(lines, 1):
+            record = self.parse_line(line)
+            if record is None:
+                continue
+            records += 1
+            if record.error_types:
+                with self.lock:
+                    self.analyzer.add_record(record.timestamp, record.host, list(record.error_types),
+                                             record.raw_line, record.severity, source)
+            error = self.to_error(record)
+            if error is not None:
+                errors.append(error)
+        with self.lock:
+            self.lines += scanned
+            self.records += records
+            self.analyzer.lines_scanned += scanned
+        return errors
+
+    def ingest(self, lines: Iterable[str]) -> int:
+        """Parse and feed every line; returns the number of records"""
+        self.checker.errors.extend(self.parse_errors(lines))
+        return self.records
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Fetch and parse the RPKI console once for both the analyzer and the CA notifier')
+    parser.add_argument('--config', default='config.json',
+                        help='Checker configuration file (default: config.json)')
+    parser.add_argument('-f', '--file', help='Read this log file (- for stdin) instead of fetching')
+    parser.add_argument('-j', '--json', help='Export analyzer results to JSON file')
+    parser.add_argument('-c', '--csv', help='Export analyzer error details to CSV file')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Run without sending emails')
+    parser.add_argument('--all-cas', action='store_true',
+                        help='Report every CA, not only those whose errors changed since the last report')
+
+    args = parser.parse_args()
+
+    checker = RPKIErrorChecker(args.config, dry_run=args.dry_run)
+    analyzer = RPKIErrorAnalyzer(checker.config.get('parse_cache_size', 4096))
+    if args.dry_run:
+        logger.info("Running in dry-run mode - no emails will be sent")
+
+    if args.file:
+        pipeline = SharedIngest(analyzer, checker)
+        with open_log(args.file) as lines:
+            pipeline.ingest(lines)
+        logger.info(f"Parsed {pipeline.lines} lines into {pipeline.records} records")
+        checker.report_errors(only_changed=not args.all_cas)
+        success = True
+    else:
+        # The checker's own check, every configured source fetched once
+        success = checker.run_check(only_changed=not args.all_cas, analyzer=analyzer)
+    checker.close()
+    if not success:
+        sys.exit(1)
+    if not analyzer.lines_scanned:
+        # Every source unchanged since the last check
+        return
+
+    analyzer.print_summary()
+
+    if args.json:
+        analyzer.export_json(args.json)
+
+    if args.csv:
+        analyzer.export_csv(args.csv)
+
+
+if __name__ == '__main__':
+    main()
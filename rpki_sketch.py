@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+RPKI Approximate Counting
+Fixed-size sketches for very large log corpora: HyperLogLog for distinct
+hosts and object URIs per error type, and a Count-Min sketch with a
+heavy-hitter heap for the top hosts and message templates. Memory does
+not depend on the number of lines, and every estimate has a known bound
+"""
+
+import math
+import heapq
+import base64
+import hashlib
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rpki_parse_cache import line_template
+from rpki_paths import object_location
+
+
+def hash64(value: str) -> int:
+    """Stable 64-bit hash (unlike hash(), the same in every process)"""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def encode_array(values) -> str:
+    return base64.b64encode(bytes(values)).decode('ascii')
+
+
+def decode_array(typecode: str, text: str) -> array:
+    values = array(typecode)
+    values.frombytes(base64.b64decode(text))
+    return values
+
+
+class HyperLogLog:
+    """Distinct count estimate in 2**precision one-byte registers.
+
+    The standard error is 1.04 / sqrt(2**precision), e.g. 1.6% for the
+    default precision of 12 (4 KiB).
+    """
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+        self.alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def add_hash(self, hashed: int):
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add(self, value: str):
+        self.add_hash(hash64(value))
+
+    def merge(self, other: 'HyperLogLog'):
+        """Fold other's registers into this one (the union of both sets)"""
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        estimate = self.alpha * self.m * self.m / sum(2.0 ** -rank for rank in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Small range: linear counting is more accurate
+            estimate = self.m * math.log(self.m / zeros)
+        return round(estimate)
+
+
+class CountMinSketch:
+    """Frequency estimates in depth rows of width counters.
+
+    An estimate never undercounts and overcounts by at most
+    epsilon * total with probability 1 - delta, where epsilon = e / width
+    and delta = e ** -depth.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array('Q', bytes(8 * width)) for _ in range(depth)]
+        self.total = 0
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    def _columns(self, hashed: int) -> List[int]:
+        # Kirsch-Mitzenmacher: depth hash functions from two halves of one hash
+        low, high = hashed & 0xFFFFFFFF, hashed >> 32
+        return [(low + row * high) % self.width for row in range(self.depth)]
+
+    def add_hash(self, hashed: int, count: int = 1) -> int:
+        """Count hashed and return its new estimate"""
+        self.total += count
+        estimate = None
+        for row, column in zip(self.rows, self._columns(hashed)):
+            row[column] += count
+            if estimate is None or row[column] < estimate:
+                estimate = row[column]
+        return estimate
+
+    def estimate_hash(self, hashed: int) -> int:
+        return min(row[column] for row, column in zip(self.rows, self._columns(hashed)))
+
+    def merge(self, other: 'CountMinSketch'):
+        for row, other_row in zip(self.rows, other.rows):
+            for column, count in enumerate(other_row):
+                if count:
+                    row[column] += count
+        self.total += other.total
+
+
+class HeavyHitters:
+    """The k keys with the highest Count-Min estimates, kept in a min-heap.
+
+    The heap is updated lazily: every new estimate of a candidate is
+    pushed, and entries that no longer match the candidate's current
+    estimate are discarded when they reach the top.
+    """
+
+    def __init__(self, k: int = 50, width: int = 2048, depth: int = 4):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self.candidates: Dict[str, int] = {}
+        self.heap: List[Tuple[int, str]] = []
+
+    def add(self, key: str, count: int = 1, hashed: Optional[int] = None):
+        estimate = self.sketch.add_hash(hash64(key) if hashed is None else hashed, count)
+        self.offer(key, estimate)
+
+    def offer(self, key: str, estimate: int):
+        candidates = self.candidates
+        if key in candidates or len(candidates) < self.k:
+            candidates[key] = estimate
+            heapq.heappush(self.heap, (estimate, key))
+        else:
+            heap = self.heap
+            while heap[0][0] != candidates.get(heap[0][1]):
+                heapq.heappop(heap)
+            if estimate <= heap[0][0]:
+                return
+            del candidates[heapq.heappop(heap)[1]]
+            candidates[key] = estimate
+            heapq.heappush(heap, (estimate, key))
+        if len(self.heap) > 8 * self.k:
+            self.heap = [(estimate, key) for key, estimate in candidates.items()]
+            heapq.heapify(self.heap)
+
+    def merge(self, other: 'HeavyHitters'):
+        """Merge sketches, then re-rank the candidates of both on the merged counts"""
+        self.sketch.merge(other.sketch)
+        keys = set(self.candidates) | set(other.candidates)
+        self.candidates = {}
+        self.heap = []
+        for key in keys:
+            self.offer(key, self.sketch.estimate_hash(hash64(key)))
+
+    def top(self, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        ranked = sorted(self.candidates.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit else ranked
+
+
+class ErrorSketch:
+    """Approximate per-error-type host/object cardinalities and top hosts/messages.
+
+    Replaces the exact affected-host sets and per-line details of the
+    analyzer; its size is fixed by precision, width, depth and k.
+    """
+
+    def __init__(self, precision: int = 12, width: int = 2048, depth: int = 4, k: int = 50):
+        self.precision = precision
+        self.width = width
+        self.depth = depth
+        self.k = k
+        self.hosts: Dict[str, HyperLogLog] = {}
+        self.objects: Dict[str, HyperLogLog] = {}
+        self.all_hosts = HyperLogLog(precision)
+        self.top_hosts = HeavyHitters(k, width, depth)
+        self.top_messages = HeavyHitters(k, width, depth)
+        # Hashes of recent hosts and message templates, which repeat a lot
+        self.hashes: Dict[str, int] = {}
+
+    def empty(self) -> 'ErrorSketch':
+        """A new sketch of the same size, e.g. for a worker whose result is merged here"""
+        return ErrorSketch(self.precision, self.width, self.depth, self.k)
+
+    def _hash(self, key: str) -> int:
+        hashed = self.hashes.get(key)
+        if hashed is None:
+            if len(self.hashes) >= 4096:
+                self.hashes.clear()
+            hashed = self.hashes[key] = hash64(key)
+        return hashed
+
+    def _hll(self, sketches: Dict[str, HyperLogLog], error_type: str) -> HyperLogLog:
+        sketch = sketches.get(error_type)
+        if sketch is None:
+            sketch = sketches[error_type] = HyperLogLog(self.precision)
+        return sketch
+
+    def add(self, host: Optional[str], error_types: Iterable[str], raw_line: str,
+            timestamp: Optional[str] = None):
+        """Count one matched line"""
+        location = object_location(raw_line)
+        object_hash = hash64(location) if location else None
+        host_hash = None
+        if host:
+            host_hash = self._hash(host)
+            self.all_hosts.add_hash(host_hash)
+            self.top_hosts.add(host, hashed=host_hash)
+        for error_type in error_types:
+            if host_hash is not None:
+                self._hll(self.hosts, error_type).add_hash(host_hash)
+            if object_hash is not None:
+                self._hll(self.objects, error_type).add_hash(object_hash)
+        template = line_template(raw_line, timestamp)
+        self.top_messages.add(template, hashed=self._hash(template))
+
+    def merge(self, other: 'ErrorSketch'):
+        """Fold in a sketch of the same size built from other lines"""
+        if (other.precision, other.width, other.depth) != (self.precision, self.width, self.depth):
+            raise ValueError("only sketches of the same size can be merged")
+        for mine, theirs in ((self.hosts, other.hosts), (self.objects, other.objects)):
+            for error_type, sketch in theirs.items():
+                self._hll(mine, error_type).merge(sketch)
+        self.all_hosts.merge(other.all_hosts)
+        self.top_hosts.merge(other.top_hosts)
+        self.top_messages.merge(other.top_messages)
+
+    def bounds(self) -> Dict:
+        """Error bounds of the estimates, for the summary"""
+        hosts, messages = self.top_hosts.sketch, self.top_messages.sketch
+        return {
+            'distinct_relative_error': round(self.all_hosts.relative_error, 4),
+            'top_count_epsilon': round(hosts.epsilon, 6),
+            'top_count_confidence': round(1 - hosts.delta, 4),
+            'top_hosts_max_overcount': math.ceil(hosts.epsilon * hosts.total),
+            'top_messages_max_overcount': math.ceil(messages.epsilon * messages.total)
+        }
+
+    def summary(self, limit: int = 10) -> Dict:
+        """JSON-ready estimates and their bounds"""
+        return {
+            'distinct_hosts': self.all_hosts.count(),
+            'hosts_by_type': {error_type: sketch.count() for error_type, sketch in self.hosts.items()},
+            'objects_by_type': {error_type: sketch.count() for error_type, sketch in self.objects.items()},
+            'top_hosts': dict(self.top_hosts.top(limit)),
+            'top_messages': dict(self.top_messages.top(limit)),
+            'bounds': self.bounds()
+        }
+
+    def to_dict(self) -> Dict:
+        """State for a checkpoint (registers and counters base64 encoded); from_dict() restores it"""
+        def heavy_hitters(hitters: HeavyHitters) -> Dict:
+            return {'total': hitters.sketch.total,
+                    'rows': [encode_array(row) for row in hitters.sketch.rows],
+                    'candidates': hitters.candidates}
+
+        return {
+            'precision': self.precision,
+            'width': self.width,
+            'depth': self.depth,
+            'k': self.k,
+            'hosts': {error_type: encode_array(sketch.registers) for error_type, sketch in self.hosts.items()},
+            'objects': {error_type: encode_array(sketch.registers) for error_type, sketch in self.objects.items()},
+            'all_hosts': encode_array(self.all_hosts.registers),
+            'top_hosts': heavy_hitters(self.top_hosts),
+            'top_messages': heavy_hitters(self.top_messages)
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'ErrorSketch':
+        sketch = cls(state['precision'], state['width'], state['depth'], state['k'])
+        for sketches, saved in ((sketch.hosts, state['hosts']), (sketch.objects, state['objects'])):
+            for error_type, registers in saved.items():
+                sketch._hll(sketches, error_type).registers = bytearray(base64.b64decode(registers))
+        sketch.all_hosts.registers = bytearray(base64.b64decode(state['all_hosts']))
+        for hitters, saved in ((sketch.top_hosts, state['top_hosts']),
+                               (sketch.top_messages, state['top_messages'])):
+            hitters.sketch.total = saved['total']
+            hitters.sketch.rows = [decode_array('Q', row) for row in saved['rows']]
+            for key, estimate in saved['candidates'].items():
+                hitters.offer(key, estimate)
+        return sketch
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+RPKI Console Sources
+Fetches the console pages or logs of several rpki-client vantage points
+concurrently, each with its own timeout, and hands every source's line
+stream to a consumer running in that source's worker thread
+"""
+
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+from urllib.parse import urlparse
+import requests
+
+from rpki_http import ConditionalFetcher, NotModified
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30
+
+
+class SourceTimeout(requests.Timeout):
+    """Raised when a source has not been fully read within its timeout"""
+
+
+@dataclass
+class Source:
+    """One vantage point: a name used to tag its results, a URL and a timeout
+    in seconds for the whole download (connect and each read included)"""
+    name: str
+    url: str
+    timeout: float = DEFAULT_TIMEOUT
+
+
+@dataclass
+class SourceResult:
+    """Outcome of collecting one source; value is what the consumer returned"""
+    source: Source
+    value: Any = None
+    lines: int = 0
+    seconds: float = 0.0
+    not_modified: bool = False
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.not_modified
+
+    @property
+    def status(self) -> str:
+        if self.error is not None:
+            return f"failed: {self.error}"
+        return "not modified" if self.not_modified else "ok"
+
+
+def parse_source(spec: Union[str, Dict], timeout: float = DEFAULT_TIMEOUT) -> Source:
+    """A Source from a config entry ({"name", "url", "timeout"}) or a
+    'name=url' / bare URL string; the name defaults to the URL's host"""
+    if isinstance(spec, dict):
+        url = spec['url']
+        return Source(spec.get('name') or urlparse(url).hostname or url, url,
+                      spec.get('timeout', timeout))
+    name, sep, url = spec.partition('=')
+    if not sep or '://' in name:
+        name, url = urlparse(spec).hostname or spec, spec
+    return Source(name, url, timeout)
+
+
+def load_sources(specs: Iterable[Union[str, Dict]], timeout: float = DEFAULT_TIMEOUT) -> List[Source]:
+    """Sources for specs, rejecting duplicate names (they tag the results)"""
+    sources = [parse_source(spec, timeout) for spec in specs]
+    names = [source.name for source in sources]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"duplicate source names: {', '.join(duplicates)}")
+    return sources
+
+
+def within_deadline(lines: Iterable[str], source: Source, deadline: float) -> Iterator[str]:
+    """Pass lines through, raising SourceTimeout once the deadline has passed"""
+    for count, line in enumerate(lines):
+        if not count & 1023 and time.monotonic() > deadline:
+            raise SourceTimeout(f"{source.url} not read within {source.timeout}s")
+        yield line
+
+
+def collect_sources(sources: List[Source], fetcher: ConditionalFetcher,
+                    consume: Callable[[Source, Iterable[str]], Any],
+                    conditional: bool = True) -> List[SourceResult]:
+    """Fetch every source at once and run consume(source, lines) on each stream.
+
+    Each source is read in its own thread over the fetcher's pooled
+    session, so one slow source only delays its own result. consume runs
+    in that thread and must not share unsynchronized state with the other
+    sources. Results are returned in the order of sources; a source that
+    fails or times out, or whose consume raises, is reported in its result
+    instead of raising.
+    """
+    def collect(source: Source) -> SourceResult:
+        result = SourceResult(source)
+        start = time.monotonic()
+
+        def counted(lines):
+            for line in lines:
+                result.lines += 1
+                yield line
+
+        try:
+            lines = fetcher.iter_lines(source.url, timeout=source.timeout, conditional=conditional)
+            result.value = consume(source, counted(within_deadline(lines, source,
+                                                                   start + source.timeout)))
+        except NotModified:
+            result.not_modified = True
+        except requests.RequestException as e:
+            result.error = str(e)
+        except Exception as e:
+            # Anything else (a malformed page tripping up consume) only
+            # fails this source, not the sources collected alongside it
+            logger.exception(f"Collecting {source.name} failed")
+            result.error = f"{type(e).__name__}: {e}"
+        result.seconds = time.monotonic() - start
+        return result
+
+    if not sources:
+        return []
+    with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+        return list(executor.map(collect, sources))
+
+
+def format_sources(results: List[SourceResult]) -> str:
+    """One 'name: status, lines, seconds' entry per source"""
+    return '; '.join(f"{result.source.name}: {result.status}, {result.lines} lines, "
+                     f"{result.seconds:.1f}s" for result in results)
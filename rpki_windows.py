@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+RPKI Rolling Window Aggregates
+Per-(host, error type) error counts in fixed-size time buckets kept in
+ring buffers, driven by the syslog timestamps of the log lines, so that
+"errors in the last hour/day" and rates are answered without keeping or
+re-scanning every line
+"""
+
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rpki_history import parse_syslog_timestamp
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_duration(value: str) -> int:
+    """'90s' / '15m' / '1h' / '7d' / '3600' to seconds"""
+    value = value.strip().lower()
+    if value and value[-1] in DURATION_UNITS:
+        return int(float(value[:-1]) * DURATION_UNITS[value[-1]])
+    return int(value)
+
+
+def format_duration(seconds: int) -> str:
+    for unit in ('d', 'h', 'm'):
+        if seconds % DURATION_UNITS[unit] == 0:
+            return f"{seconds // DURATION_UNITS[unit]}{unit}"
+    return f"{seconds}s"
+
+
+class SyslogClock:
+    """Converts 'Sep 27 23:39:26' syslog timestamps to epoch seconds (UTC).
+
+    The year is resolved by rpki_history.parse_syslog_timestamp against
+    reference, as the history store does: the reference's year, or the
+    previous one for a timestamp more than a day ahead of it. Without a
+    reference each line is resolved against the current time, so a
+    followed log moves into the new year with the clock.
+    """
+
+    def __init__(self, reference: Optional[float] = None):
+        self.reference = reference
+        # Consecutive lines mostly share their timestamp
+        self.last_timestamp = None
+        self.last_epoch = None
+
+    def parse(self, timestamp: Optional[str]) -> Optional[int]:
+        """Epoch seconds of a syslog timestamp, None if it can't be parsed"""
+        if timestamp != self.last_timestamp:
+            self.last_timestamp = timestamp
+            self.last_epoch = parse_syslog_timestamp(timestamp, self.reference)
+        return self.last_epoch
+
+
+class RollingWindows:
+    """Error counts per (host, error type) over the last span seconds.
+
+    Time is divided into buckets of bucket_seconds; each key owns a ring
+    buffer of span / bucket_seconds counters, so memory is bounded by the
+    number of keys regardless of how many lines are added. Time advances
+    with the newest timestamp added. A key's slots are only cleared when
+    that key is written again (its newest bucket is remembered), keys
+    without errors in the span are dropped once per span, and lines older
+    than the span are counted in dropped instead.
+    """
+
+    def __init__(self, bucket_seconds: int = 60, span: int = 86400,
+                 clock: Optional[SyslogClock] = None):
+        if span < bucket_seconds or bucket_seconds <= 0:
+            raise ValueError("span must cover at least one bucket")
+        self.bucket_seconds = bucket_seconds
+        self.size = span // bucket_seconds
+        self.clock = clock or SyslogClock()
+        self.head: Optional[int] = None
+        self.swept: Optional[int] = None
+        self.rings: Dict[Tuple[str, str], array] = {}
+        self.latest: Dict[Tuple[str, str], int] = {}
+        self.dropped = 0
+
+    @property
+    def span(self) -> int:
+        return self.size * self.bucket_seconds
+
+    @property
+    def now(self) -> Optional[int]:
+        """End (exclusive) of the newest bucket, in epoch seconds"""
+        return None if self.head is None else (self.head + 1) * self.bucket_seconds
+
+    def advance(self, bucket: int):
+        """Make bucket the newest one, forgetting keys that have left the span"""
+        self.head = bucket
+        if self.swept is None:
+            self.swept = bucket
+        elif bucket - self.swept >= self.size:
+            oldest = bucket - self.size
+            for key in [key for key, latest in self.latest.items() if latest <= oldest]:
+                del self.rings[key], self.latest[key]
+            self.swept = bucket
+
+    def add(self, timestamp: Optional[str], host: Optional[str], error_types: Iterable[str],
+            count: int = 1):
+        """Count a line's error types under its host at its syslog timestamp"""
+        epoch = self.clock.parse(timestamp)
+        if epoch is None:
+            return
+        bucket = epoch // self.bucket_seconds
+        if self.head is None or bucket > self.head:
+            self.advance(bucket)
+        elif bucket <= self.head - self.size:
+            self.dropped += count
+            return
+        size = self.size
+        host = host or 'unknown'
+        for error_type in error_types:
+            key = (host, error_type)
+            ring = self.rings.get(key)
+            if ring is None:
+                ring = self.rings[key] = array('I', bytes(4 * size))
+                self.latest[key] = bucket
+            else:
+                latest = self.latest[key]
+                if bucket > latest:
+                    # Slots between the key's last write and now hold an older span
+                    for stale in range(max(latest + 1, bucket - size + 1), bucket + 1):
+                        ring[stale % size] = 0
+                    self.latest[key] = bucket
+            ring[bucket % size] += count
+
+    def _window_buckets(self, window: int) -> int:
+        if window % self.bucket_seconds or not 0 < window <= self.span:
+            raise ValueError(f"window must be a multiple of {self.bucket_seconds}s "
+                             f"up to {self.span}s")
+        return window // self.bucket_seconds
+
+    def _sum(self, ring: array, first: int, last: int) -> int:
+        """Sum of the slots of buckets first..last (at most size of them)"""
+        if last < first:
+            return 0
+        start, end = first % self.size, last % self.size + 1
+        if start < end:
+            return sum(ring[start:end])
+        return sum(ring[start:]) + sum(ring[:end])
+
+    def counts(self, window: int, host: Optional[str] = None,
+               error_type: Optional[str] = None) -> Dict[Tuple[str, str], int]:
+        """Errors per (host, error type) in the last window seconds, optionally filtered"""
+        if self.head is None:
+            return {}
+        first = self.head - self._window_buckets(window) + 1
+        counts = {}
+        for key, ring in self.rings.items():
+            if (host is None or key[0] == host) and (error_type is None or key[1] == error_type):
+                latest = self.latest[key]
+                count = self._sum(ring, max(first, latest - self.size + 1), latest)
+                if count:
+                    counts[key] = count
+        return counts
+
+    def count(self, window: int, host: Optional[str] = None, error_type: Optional[str] = None) -> int:
+        """Errors in the last window seconds, optionally for one host and/or type"""
+        return sum(self.counts(window, host, error_type).values())
+
+    def rate(self, window: int, host: Optional[str] = None, error_type: Optional[str] = None,
+             per: int = 3600) -> float:
+        """Errors per per seconds (default: per hour) over the last window seconds"""
+        return self.count(window, host, error_type) * per / window
+
+    def top(self, window: int, by: str = 'pair', limit: int = 10) -> List[Tuple]:
+        """Largest counts in the last window by 'host', 'error_type' or (host, type) 'pair'"""
+        grouped: Dict = {}
+        for (host, error_type), count in self.counts(window).items():
+            key = host if by == 'host' else error_type if by == 'error_type' else (host, error_type)
+            grouped[key] = grouped.get(key, 0) + count
+        return sorted(grouped.items(), key=lambda item: (-item[1], str(item[0])))[:limit]
+
+    def snapshot(self, windows: Iterable[int], limit: int = 10) -> Dict:
+        """JSON-ready totals, hourly rates and top hosts/types for each window"""
+        snapshot = {'as_of': None if self.now is None else
+                    time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.now)),
+                    'bucket_seconds': self.bucket_seconds, 'dropped': self.dropped, 'windows': {}}
+        for window in windows:
+            snapshot['windows'][format_duration(window)] = {
+                'errors': self.count(window),
+                'per_hour': round(self.rate(window), 2),
+                'top_hosts': dict(self.top(window, 'host', limit)),
+                'top_error_types': dict(self.top(window, 'error_type', limit))
+            }
+        return snapshot
+
+    def format_line(self, windows: Iterable[int]) -> str:
+        """One-line status, e.g. '[2025-09-27T23:40:00Z] 1h: 420 errors (420.0/h), ...'"""
+        parts = [f"{format_duration(window)}: {self.count(window)} errors "
+                 f"({self.rate(window):.1f}/h)" for window in windows]
+        as_of = '-' if self.now is None else time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.now))
+        return f"[{as_of}] " + ', '.join(parts)
+
+    def to_dict(self) -> Dict:
+        """State for a checkpoint; from_dict() restores it"""
+        return {
+            'bucket_seconds': self.bucket_seconds,
+            'size': self.size,
+            'head': self.head,
+            'swept': self.swept,
+            'reference': self.clock.reference,
+            'dropped': self.dropped,
+            'rings': [[host, error_type, self.latest[host, error_type], list(ring)]
+                      for (host, error_type), ring in self.rings.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'RollingWindows':
+        windows = cls(state['bucket_seconds'], state['bucket_seconds'] * state['size'],
+                      SyslogClock(state.get('reference')))
+        windows.head = state['head']
+        windows.swept = state['swept']
+        windows.dropped = state['dropped']
+        for host, error_type, latest, counts in state['rings']:
+            windows.rings[host, error_type] = array('I', counts)
+            windows.latest[host, error_type] = latest
+        return windows
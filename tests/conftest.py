@@ -0,0 +1,11 @@
+"""
+The scripts import their modules from the repository root and from
+monitoring/ (see rpki_error_checker.py), so the tests do the same; the
+stand-in servers of benchmarks/ are shared with the tests
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'monitoring'), os.path.join(ROOT, 'benchmarks')]
@@ -0,0 +1,49 @@
+"""ErrorArchive appends each CSV export or analyzer run once"""
+
+import csv
+import os
+
+from rpki_archive import ErrorArchive
+
+ROWS = [('Sep 27 23:39:26', 'rpki.example.net', 'cert_expired', 'HIGH'),
+        ('Sep 27 23:39:27', None, 'connection_timeout', 'LOW')]
+
+
+def write_export(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Timestamp', 'Host', 'Error_Type', 'Severity', 'Message'])
+        for timestamp, host, error_type, severity in rows:
+            writer.writerow([timestamp, host or '', error_type, severity, 'message'])
+
+
+def test_importing_an_export_twice_counts_it_once(tmp_path):
+    export = str(tmp_path / 'rpki_errors_20250928.csv')
+    write_export(export, ROWS)
+    archive = ErrorArchive(str(tmp_path / 'archive'))
+    assert archive.append_csv(export) == 2
+    assert archive.append_csv(export) == 0
+    # Reopened, and under another name
+    os.rename(export, str(tmp_path / 'copy_20250928.csv'))
+    archive = ErrorArchive(str(tmp_path / 'archive'))
+    assert archive.append_csv(str(tmp_path / 'copy_20250928.csv')) == 0
+    assert archive.aggregate(by=()) == [{'count': 2}]
+    # The same lines a year later are other errors
+    write_export(str(tmp_path / 'rpki_errors_20260928.csv'), ROWS)
+    assert archive.append_csv(str(tmp_path / 'rpki_errors_20260928.csv')) == 2
+    assert len(archive) == 4
+
+
+def test_interrupted_append_can_be_repeated(tmp_path):
+    directory = str(tmp_path / 'archive')
+    archive = ErrorArchive(directory)
+    archive.append(ROWS, now=1759000000)
+    archive.append(ROWS[:1], now=1759000000 + 86400)
+    # The batch was recorded in strings.json, but its columns were cut short
+    for name in ('epoch', 'host'):
+        path = os.path.join(directory, f'{name}.col')
+        os.truncate(path, os.path.getsize(path) - 1)
+    archive = ErrorArchive(directory)
+    assert len(archive) == 2
+    assert archive.append(ROWS[:1], now=1759000000 + 86400) == 1
+    assert len(archive) == 3
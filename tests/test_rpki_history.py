@@ -0,0 +1,43 @@
+"""ErrorHistory dedup on the year-resolved timestamp"""
+
+import calendar
+
+from rpki_history import ErrorHistory, content_hash, parse_syslog_timestamp
+
+MESSAGE = 'certificate has expired'
+PATH = 'rsync://rpki.example.net/repo/ca/a.roa'
+
+
+def row(timestamp):
+    return (timestamp, 'rpki.example.net', 'cert_expired', 'HIGH', PATH, MESSAGE)
+
+
+def test_same_instant_is_stored_once(tmp_path, monkeypatch):
+    monkeypatch.setattr('time.time', lambda: calendar.timegm((2025, 9, 30, 0, 0, 0)))
+    history = ErrorHistory(str(tmp_path / 'history.db'))
+    # The analyzer's and the checker's spellings of one syslog timestamp
+    assert history.add_errors([row('Sep  7 23:39:26')]) == 1
+    assert history.add_errors([row('Sep 07 23:39:26')]) == 0
+    assert history.add_errors([row('Sep  7 23:39:27')]) == 1
+    assert [error['timestamp'] for error in history.errors_for_host('rpki.example.net')] == \
+        [calendar.timegm((2025, 9, 7, 23, 39, 26)), calendar.timegm((2025, 9, 7, 23, 39, 27))]
+    history.close()
+
+
+def test_same_text_a_year_later_is_a_new_error(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'history.db')
+    for year in (2025, 2025, 2026):
+        monkeypatch.setattr('time.time', lambda: calendar.timegm((year, 9, 30, 0, 0, 0)))
+        history = ErrorHistory(db_path)
+        history.add_errors([row('Sep 27 23:39:26')])
+        history.close()
+    history = ErrorHistory(db_path)
+    assert len(history.errors_for_host('rpki.example.net')) == 2
+    history.close()
+
+
+def test_content_hash():
+    ts = parse_syslog_timestamp('Sep 27 23:39:26', calendar.timegm((2025, 9, 30, 0, 0, 0)))
+    assert content_hash(ts, 'cert_expired', PATH, MESSAGE) == content_hash(ts, 'cert_expired', PATH, MESSAGE)
+    assert content_hash(ts, 'cert_expired', PATH, MESSAGE) != content_hash(ts + 1, 'cert_expired', PATH, MESSAGE)
+    assert content_hash(None, 'cert_expired', None, MESSAGE) != content_hash(None, 'other', None, MESSAGE)
@@ -0,0 +1,83 @@
+"""ConditionalFetcher against a local console page that answers 304 once unchanged"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from rpki_http import ConditionalFetcher, NotModified
+
+ETAG = '"console-1"'
+LAST_MODIFIED = 'Sat, 27 Sep 2025 23:40:00 GMT'
+BODY = ('Sep 27 23:39:26 rpki-client: rsync://a.net/repo/a.roa: certificate has expired\r\n'
+        'Sep 27 23:39:27 rpki-client: rsync://b.net/repo/b.mft: odd\x0bname\x85in\u2028message\n'
+        'Sep 27 23:39:28 rpki-client: https://c.net/n.xml (192.0.2.1): connect timeout')
+
+
+class ConsoleHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = BODY.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', ETAG)
+        self.send_header('Last-Modified', LAST_MODIFIED)
+        self.end_headers()
+        # Split mid-character so the decoder has to carry bytes across chunks
+        middle = body.index('\u2028'.encode('utf-8')) + 1
+        self.wfile.write(body[:middle])
+        self.wfile.flush()
+        self.wfile.write(body[middle:])
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def console():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ConsoleHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_validators_survive_a_restart(console, tmp_path):
+    server, url = console
+    cache_file = str(tmp_path / 'http_cache.json')
+
+    fetcher = ConditionalFetcher(cache_file)
+    assert list(fetcher.iter_lines(url)) == BODY.replace('\r\n', '\n').split('\n')
+    fetcher.save_cache()
+    with open(cache_file) as f:
+        assert json.load(f) == {url: {'etag': ETAG, 'last_modified': LAST_MODIFIED}}
+
+    restarted = ConditionalFetcher(cache_file)
+    with pytest.raises(NotModified):
+        restarted.iter_lines(url)
+    assert server.requests[-1]['If-None-Match'] == ETAG
+    assert server.requests[-1]['If-Modified-Since'] == LAST_MODIFIED
+
+    # Unconditional fetches ignore the validators
+    assert len(list(restarted.iter_lines(url, conditional=False))) == 3
+    assert 'If-None-Match' not in server.requests[-1]
+
+
+def test_unprocessed_pages_are_not_remembered(console, tmp_path):
+    _, url = console
+    cache_file = str(tmp_path / 'http_cache.json')
+    fetcher = ConditionalFetcher(cache_file)
+    lines = fetcher.iter_lines(url)
+    next(lines)
+    lines.close()
+    fetcher.save_cache()
+    # The interrupted page is fetched in full by the next run
+    assert len(list(ConditionalFetcher(cache_file).iter_lines(url))) == 3
@@ -0,0 +1,104 @@
+"""Mailer against the stand-in SMTP server of benchmarks/bench_smtp_delivery.py"""
+
+import os
+import json
+import threading
+
+import pytest
+
+from bench_smtp_delivery import StandInSMTPServer
+from rpki_mailer import Mailer, OutgoingMail
+
+NOW = 1750000000.0
+BASE_DELAY = 60
+
+
+@pytest.fixture
+def smtp_server():
+    server = StandInSMTPServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def mailer_for(server, queue_dir, **settings):
+    host, port = server.server_address
+    config = {'smtp_server': host, 'smtp_port': port, 'pool_size': 2,
+              'retry_queue_dir': str(queue_dir), 'retry_base_delay': BASE_DELAY}
+    config.update(settings)
+    return Mailer(config)
+
+
+def report_mails(count):
+    return [OutgoingMail(f"ca{n}.example.net", 'rpki-monitor@example.com', [f"noc@ca{n}.example.net"],
+                         f"Subject: RPKI Validation Errors for ca{n}\r\n\r\nerror line\r\n")
+            for n in range(count)]
+
+
+def failed_entries(queue_dir):
+    failed_dir = os.path.join(queue_dir, 'failed')
+    entries = []
+    for name in sorted(os.listdir(failed_dir)):
+        with open(os.path.join(failed_dir, name)) as f:
+            entries.append(json.load(f))
+    return entries
+
+
+def test_sessions_are_reused(smtp_server, tmp_path):
+    with mailer_for(smtp_server, tmp_path) as mailer:
+        results = mailer.send_all(report_mails(20))
+        results += mailer.send_all(report_mails(5))
+        assert mailer.pool.opened <= 2
+    assert all(result.ok for result in results)
+    assert smtp_server.received == 25
+    assert smtp_server.connections <= 2
+
+
+def test_temporary_failures_wait_for_their_backoff(smtp_server, tmp_path, monkeypatch):
+    monkeypatch.setattr('time.time', lambda: NOW)
+    smtp_server.reject = 3
+    with mailer_for(smtp_server, tmp_path) as mailer:
+        results = mailer.send_all(report_mails(10))
+        assert sum(not result.ok for result in results) == 3
+        assert len(mailer.retry_queue) == 3
+        queued = mailer.retry_queue.due(now=NOW + BASE_DELAY)
+        assert [entry['next_attempt'] for _, entry in queued] == [NOW + BASE_DELAY] * 3
+        assert all(entry['last_error'].startswith('(451') for _, entry in queued)
+
+        assert mailer.flush_retries(now=NOW + BASE_DELAY - 1) == []
+        retried = mailer.flush_retries(now=NOW + BASE_DELAY)
+        assert [(result.ok, result.attempts) for result in retried] == [(True, 2)] * 3
+        assert len(mailer.retry_queue) == 0
+    assert smtp_server.received == 10
+    assert failed_entries(tmp_path) == []
+
+
+def test_messages_fail_after_max_attempts(smtp_server, tmp_path, monkeypatch):
+    monkeypatch.setattr('time.time', lambda: NOW)
+    smtp_server.reject = 100
+    with mailer_for(smtp_server, tmp_path, retry_max_attempts=3) as mailer:
+        mailer.send_all(report_mails(1))
+        # Attempt 2 fails and doubles the backoff
+        assert not mailer.flush_retries(now=NOW + BASE_DELAY)[0].ok
+        (_, entry), = mailer.retry_queue.due(now=NOW + 3 * BASE_DELAY)
+        assert entry['attempts'] == 2
+        assert entry['next_attempt'] == NOW + 3 * BASE_DELAY
+        # Attempt 3 is the last one
+        assert mailer.flush_retries(now=NOW + 3 * BASE_DELAY)[0].attempts == 3
+        assert len(mailer.retry_queue) == 0
+    failed, = failed_entries(tmp_path)
+    assert (failed['ca'], failed['attempts']) == ('ca0.example.net', 3)
+    assert smtp_server.received == 0
+
+
+def test_permanent_rejections_are_not_retried(smtp_server, tmp_path):
+    smtp_server.reject = 2
+    smtp_server.reject_reply = '554 Message rejected'
+    with mailer_for(smtp_server, tmp_path) as mailer:
+        results = mailer.send_all(report_mails(5))
+        assert sum(result.permanent for result in results) == 2
+        assert len(mailer.retry_queue) == 0
+        assert mailer.flush_retries(now=NOW + 86400) == []
+    assert [entry['attempts'] for entry in failed_entries(tmp_path)] == [1, 1]
+    assert smtp_server.received == 3
@@ -0,0 +1,147 @@
+"""PathIndex rollups against counting every error under every prefix"""
+
+import json
+import random
+
+import pytest
+
+from rpki_paths import OBJECT_SUFFIXES, PathIndex, object_location, split_location, strip_address
+
+TYPES = ('cert_expired', 'manifest_unavailable', 'seqnum_gap', 'connection_timeout')
+SEVERITIES = ('HIGH', 'MEDIUM', 'LOW')
+SUFFIXES = ('.cer', '.crl', '.mft', '.roa', '.xml')
+
+
+def render(rng, segments):
+    """One of the forms rpki-client logs the object at segments in"""
+    path = '/'.join(segments)
+    form = rng.randrange(5)
+    if form == 0:
+        return f"rsync://{path}"
+    if form == 1:
+        return f"https://{path} (192.0.2.{rng.randint(1, 254)})"
+    if form == 2:
+        return f".rsync/{path}"
+    if form == 3:
+        return f".rrdp/{rng.getrandbits(64):016x}/{path}"
+    return path
+
+
+def random_errors(seed, count):
+    """(location, segments, error_types, severity, count) of random errors"""
+    rng = random.Random(seed)
+    errors = []
+    for _ in range(count):
+        segments = [f"rpki{rng.randint(0, 4)}.example.net", 'repo']
+        for _ in range(rng.randint(0, 3)):
+            segments.append(f"ca{rng.randint(0, 5)}")
+        segments.append(f"object{rng.randint(0, 30)}{rng.choice(SUFFIXES)}")
+        error_types = tuple(rng.sample(TYPES, 1 if rng.random() < 0.8 else 2))
+        errors.append((render(rng, segments), segments, error_types,
+                       rng.choice(SEVERITIES), rng.choice((1, 1, 1, 3))))
+    return errors
+
+
+def brute_force(errors):
+    """prefix -> (counts per (type, severity), objects below)"""
+    counts, objects = {}, {}
+    for _, segments, error_types, severity, count in errors:
+        for end in range(len(segments) + 1):
+            prefix = tuple(segments[:end])
+            prefix_counts = counts.setdefault(prefix, {})
+            for error_type in error_types:
+                key = (error_type, severity)
+                prefix_counts[key] = prefix_counts.get(key, 0) + count
+            objects.setdefault(prefix, set()).add(tuple(segments))
+    return counts, objects
+
+
+def build(errors):
+    index = PathIndex()
+    for location, _, error_types, severity, count in errors:
+        index.add(location, error_types, severity, count)
+    return index
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_rollups_match_brute_force(seed):
+    errors = random_errors(seed, 5000)
+    index = build(errors)
+    counts, objects = brute_force(errors)
+    for prefix, expected in counts.items():
+        node = index.node('/'.join(prefix))
+        assert dict(node.count_items()) == expected
+        assert node.total == sum(expected.values())
+        assert node.objects == len(objects[prefix])
+        assert node.severity_count('HIGH') == sum(count for (_, severity), count in expected.items()
+                                                  if severity == 'HIGH')
+        if node.children is None:
+            # Objects with one kind of error keep the bare key
+            assert isinstance(node.counts, tuple) == (len(expected) == 1)
+
+
+def test_top_directories_match_brute_force():
+    errors = random_errors(7, 5000)
+    index = build(errors)
+    counts, _ = brute_force(errors)
+    # Notification files (.xml) don't make a CA directory
+    directories = {tuple(segments[:-1]) for _, segments, _, _, _ in errors
+                   if segments[-1].endswith(OBJECT_SUFFIXES)}
+
+    for severity in (None, 'HIGH'):
+        def errors_of(prefix):
+            return sum(count for (_, level), count in counts[prefix].items()
+                       if severity is None or level == severity)
+        ranked = sorted(directories, key=lambda prefix: (errors_of(prefix), '/'.join(prefix)), reverse=True)
+        expected = [('/'.join(prefix), sum(counts[prefix].values()))
+                    for prefix in ranked[:10] if errors_of(prefix)]
+        top = index.top_directories(limit=10, severity=severity)
+        assert [(directory['path'], directory['errors']) for directory in top] == expected
+
+    below = index.top_directories('rpki1.example.net/repo/ca2', limit=1000)
+    assert {directory['path'] for directory in below} == \
+        {'/'.join(prefix) for prefix in directories if prefix[:3] == ('rpki1.example.net', 'repo', 'ca2')}
+
+
+def test_describe_and_unknown_prefixes():
+    errors = random_errors(8, 2000)
+    index = build(errors)
+    counts, _ = brute_force(errors)
+    described = index.describe('rsync://rpki0.example.net/repo', limit=3)
+    assert described['path'] == 'rpki0.example.net/repo'
+    assert described['errors'] == sum(counts['rpki0.example.net', 'repo'].values())
+    children = [child for prefix, child in counts.items()
+                if len(prefix) == 3 and prefix[:2] == ('rpki0.example.net', 'repo')]
+    assert described['children_total'] == len(children)
+    assert [child['errors'] for child in described['children']] == \
+        sorted((sum(child.values()) for child in children), reverse=True)[:3]
+    assert index.describe('rpki9.example.net') is None
+    assert index.describe('rpki0.example.net/repo/ca0/object0.roa/below') is None
+
+
+def test_round_trip():
+    errors = random_errors(9, 3000)
+    index = build(errors[:2000])
+    index.add('warning', ('cert_expired',), 'HIGH')
+    restored = PathIndex.from_dict(json.loads(json.dumps(index.to_dict())))
+    for location, _, error_types, severity, count in errors[2000:]:
+        index.add(location, error_types, severity, count)
+        restored.add(location, error_types, severity, count)
+    assert restored.to_dict() == index.to_dict()
+    assert restored.skipped == 1
+    assert restored.top_directories(limit=20) == index.top_directories(limit=20)
+
+
+def test_locations():
+    assert split_location('rsync://rpki.example.net/repo/ca/a.roa') == ['rpki.example.net', 'repo', 'ca', 'a.roa']
+    assert split_location('https://rrdp.example.net/notification.xml (192.0.2.1)') == \
+        ['rrdp.example.net', 'notification.xml']
+    assert split_location('.rsync/rpki.example.net/repo/a.mft') == ['rpki.example.net', 'repo', 'a.mft']
+    assert split_location('.rrdp/0123abcd/rpki.example.net/a.crl') == ['rpki.example.net', 'a.crl']
+    assert split_location('warning') is None
+    assert split_location('load from network failed') is None
+    assert strip_address('https://a.net/n.xml (2001:db8::1)') == 'https://a.net/n.xml'
+    assert strip_address('rsync://a.net/x (copy)/y') == 'rsync://a.net/x (copy)/y'
+    assert object_location('Sep 27 23:39:26 rpki-client: https://a.net/n.xml (192.0.2.1): '
+                           'TLS handshake: certificate verification failed') == 'https://a.net/n.xml'
+    assert object_location('Sep 27 23:39:26 kernel: nothing') is None
@@ -0,0 +1,54 @@
+"""SharedIngest against the checker and the analyzer each parsing on their own"""
+
+import pytest
+
+from rpki_error_analyzer import RPKIErrorAnalyzer
+from rpki_error_checker import RPKIErrorChecker
+from rpki_pipeline import SharedIngest
+from synthetic_log import iter_synthetic_lines
+
+SINGLE_DIGIT_DAYS = [
+    'Sep  7 23:39:26 rpki-client: rsync://rpki.example.net/repo/ca/a.roa: certificate has expired',
+    'Sep  7 23:39:27 rpki-client: https://rrdp.example.net/notification.xml (192.0.2.1): connect timeout',
+]
+
+
+@pytest.fixture
+def checker(tmp_path):
+    checker = RPKIErrorChecker(str(tmp_path / 'missing.json'), dry_run=True)
+    yield checker
+    checker.close()
+
+
+def console_lines(count):
+    return list(iter_synthetic_lines(count, 5)) + SINGLE_DIGIT_DAYS
+
+
+def test_same_errors_and_counts_as_each_tool_alone(checker):
+    lines = console_lines(5000)
+    alone = checker.parse_rpki_errors(lines)
+    analyzer_alone = RPKIErrorAnalyzer()
+    analyzer_alone.analyze_lines(lines)
+
+    analyzer = RPKIErrorAnalyzer()
+    pipeline = SharedIngest(analyzer, checker)
+    shared = pipeline.parse_errors(lines)
+
+    # Same CA grouping and timestamps; only severities may be raised
+    assert [(error.timestamp, error.repository, error.file_path, error.error_type) for error in shared] == \
+        [(error.timestamp, error.repository, error.file_path, error.error_type) for error in alone]
+    assert dict(checker.group_errors_by_ca(shared)).keys() == dict(checker.group_errors_by_ca(alone)).keys()
+    assert analyzer.results['error_counts'] == analyzer_alone.results['error_counts']
+    assert analyzer.lines_scanned == analyzer_alone.lines_scanned == pipeline.lines == len(lines)
+    assert [record.timestamp for record in analyzer.store.records[-2:]] == \
+        [error.timestamp for error in shared[-2:]] == ['Sep  7 23:39:26', 'Sep  7 23:39:27']
+
+
+def test_parse_rpki_errors_feeds_the_attached_analyzer(checker):
+    lines = console_lines(1000)
+    analyzer = RPKIErrorAnalyzer()
+    checker.ingest = SharedIngest(analyzer, checker)
+    errors = checker.parse_rpki_errors(lines, 'console')
+    assert errors and analyzer.lines_matched
+    assert {record.source for record in analyzer.store.records} == {'console'}
+    assert analyzer.lines_scanned == len(lines)
@@ -0,0 +1,40 @@
+"""ErrorIndex lookups, in particular keys that differ only in case"""
+
+import json
+
+from rpki_error_checker import RPKIError
+from rpki_query import ErrorIndex
+
+
+def error(repository, error_type, severity='HIGH'):
+    return RPKIError('Sep 27 23:39:26', error_type, repository, f"rsync://{repository}/repo/a.roa",
+                     'certificate has expired', severity)
+
+
+def lookup(index, path):
+    status, body = index.lookup(path)
+    return status, json.loads(body)
+
+
+def test_keys_that_differ_in_case_are_kept_apart():
+    index = ErrorIndex({
+        'noc@example.net': [error('RPKI.example.net', 'EXPIRED_CERT'), error('rpki.example.net', 'expired_cert')],
+        'NOC@example.net': [error('other.example.net', 'EXPIRED_CERT', 'LOW')],
+    }, {'noc@example.net': ['noc@example.net']})
+
+    # Hostnames are case-insensitive: both spellings are one host
+    status, host = lookup(index, '/hosts/Rpki.Example.Net')
+    assert (status, host['host'], host['errors_total']) == (200, 'rpki.example.net', 2)
+
+    # Error types and CAs are exact first
+    assert lookup(index, '/types/EXPIRED_CERT')[1]['errors_total'] == 2
+    assert lookup(index, '/types/expired_cert')[1]['errors_total'] == 1
+    assert lookup(index, '/cas/NOC@example.net')[1]['hosts'] == {'other.example.net': 1}
+    assert lookup(index, '/cas/noc@example.net')[1]['errors_total'] == 2
+
+    # An unambiguous spelling falls back case-insensitively
+    assert lookup(index, '/severities/low')[1]['errors_total'] == 1
+    status, missing = lookup(index, '/types/Expired_Cert')
+    assert (status, missing['matches']) == (404, ['EXPIRED_CERT', 'expired_cert'])
+    assert lookup(index, '/cas')[1] == ['NOC@example.net', 'noc@example.net']
+    assert lookup(index, '/hosts/missing.example.net')[0] == 404
@@ -0,0 +1,88 @@
+"""ReportState diffs against set arithmetic on the reported error keys"""
+
+import json
+import random
+from collections import namedtuple
+
+from rpki_report_state import ReportState, error_key, fingerprint
+
+Error = namedtuple('Error', 'repository error_type file_path')
+
+TYPES = ('EXPIRED_CERTIFICATE', 'INVALID_MANIFEST', 'CONNECTION_ERROR')
+
+
+def random_errors(rng, cas, count):
+    ca_errors = {}
+    for _ in range(count):
+        ca = rng.choice(cas)
+        ca_errors.setdefault(ca, []).append(
+            Error(ca, rng.choice(TYPES), f"rsync://{ca}/repo/{rng.randint(0, 30)}.roa"))
+    return ca_errors
+
+
+def keys_of(errors):
+    return {error_key(error.repository, error.error_type, error.file_path) for error in errors}
+
+
+def test_fingerprint_ignores_order_and_repeats():
+    errors = [Error('a.net', 'X', 'f1'), Error('a.net', 'Y', 'f2'), Error('a.net', 'X', 'f1')]
+    state = ReportState()
+    forward = state.diff({'a': errors})['a']
+    backward = state.diff({'a': errors[::-1]})['a']
+    assert forward.fingerprint == backward.fingerprint == fingerprint(sorted(keys_of(errors)))
+    assert forward.new == 2
+
+
+def test_diff_matches_set_arithmetic():
+    rng = random.Random(15)
+    cas = [f"ca{n}.example.net" for n in range(8)]
+    state = ReportState()
+    reported = {}
+    for _ in range(20):
+        ca_errors = random_errors(rng, cas[:rng.randint(1, len(cas))], rng.randint(0, 120))
+        deltas = state.diff(ca_errors)
+        assert set(deltas) == set(ca_errors) | set(reported)
+        for ca, delta in deltas.items():
+            current = keys_of(ca_errors.get(ca, []))
+            previous = reported.get(ca, set())
+            assert delta.new == len(current - previous)
+            assert delta.resolved == len(previous - current)
+            assert delta.persisting == len(current & previous)
+            assert delta.changed == (current != previous)
+            assert delta.keys == sorted(current)
+        state.update(list(deltas.values()))
+        reported = {ca: keys_of(errors) for ca, errors in ca_errors.items() if errors}
+        assert {ca: set(saved['keys']) for ca, saved in state.cas.items()} == reported
+
+
+def test_partial_diff_resolves_nothing():
+    state = ReportState()
+    first = {'a': [Error('a.net', 'X', 'f1'), Error('a.net', 'X', 'f2')], 'b': [Error('b.net', 'X', 'f1')]}
+    state.update(list(state.diff(first).values()))
+
+    deltas = state.diff({'a': [Error('a.net', 'X', 'f1'), Error('a.net', 'X', 'f3')]}, partial=True)
+    assert (deltas['a'].new, deltas['a'].resolved, deltas['a'].changed) == (1, 0, True)
+    assert deltas['a'].keys == sorted(keys_of(first['a'] + [Error('a.net', 'X', 'f3')]))
+    assert (deltas['b'].resolved, deltas['b'].changed) == (0, False)
+    assert deltas['b'].keys == state.cas['b']['keys']
+
+    state.update([delta for delta in deltas.values() if delta.changed])
+    assert set(state.cas) == {'a', 'b'}
+    full = state.diff({'a': [Error('a.net', 'X', 'f1')]})
+    assert (full['a'].resolved, full['b'].resolved) == (2, 1)
+
+
+def test_state_file_round_trip_and_read_only(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    errors = {'a': [Error('a.net', 'X', 'f1')]}
+    state = ReportState(state_file)
+    state.update(list(state.diff(errors).values()))
+    state.save()
+
+    dry = ReportState(state_file, read_only=True)
+    assert not dry.diff(errors)['a'].changed
+    dry.update(list(dry.diff({}).values()))
+    dry.save()
+    with open(state_file) as f:
+        assert set(json.load(f)['cas']) == {'a'}
+    assert not ReportState(state_file).diff(errors)['a'].changed
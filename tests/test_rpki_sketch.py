@@ -0,0 +1,135 @@
+"""Sketch estimates against exact counts, merges and checkpoint round trips"""
+
+import json
+import random
+
+import pytest
+
+from rpki_sketch import CountMinSketch, ErrorSketch, HeavyHitters, HyperLogLog, hash64
+
+
+def zipf_keys(seed, count, distinct):
+    """count keys out of distinct, a few of them very frequent"""
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, distinct + 1)]
+    return rng.choices([f"key{n}" for n in range(distinct)], weights, k=count)
+
+
+def error_lines(seed, count):
+    """(host, error_types, raw_line, timestamp) of random error lines"""
+    rng = random.Random(seed)
+    hosts = [f"rpki{n}.example.net" for n in range(400)]
+    messages = ('certificate has expired', 'no valid manifest available', 'connect timeout')
+    lines = []
+    for n in range(count):
+        host = hosts[min(int(rng.paretovariate(1.2)) - 1, len(hosts) - 1)]
+        message = rng.choice(messages)
+        timestamp = f"Sep 27 23:{n // 60 % 60:02d}:{n % 60:02d}"
+        raw_line = f"{timestamp} rpki-client: rsync://{host}/repo/{rng.randint(0, 3000)}.roa: {message}"
+        lines.append((host, (message.split()[0],), raw_line, timestamp))
+    return lines
+
+
+@pytest.mark.parametrize('distinct', [10, 1000, 50000])
+def test_hyperloglog_within_bound(distinct):
+    hll = HyperLogLog(12)
+    for n in range(distinct):
+        hll.add(f"rsync://host{n % 97}.example.net/object{n}.roa")
+    assert abs(hll.count() - distinct) <= 3 * hll.relative_error * distinct + 1
+
+
+def test_hyperloglog_merge_is_the_union():
+    left, right, union = HyperLogLog(10), HyperLogLog(10), HyperLogLog(10)
+    for n in range(20000):
+        key = f"key{n}"
+        (left if n % 3 else right).add(key)
+        union.add(key)
+        if n % 5 == 0:
+            right.add(key)
+    left.merge(right)
+    assert left.registers == union.registers
+
+
+def test_count_min_bounds():
+    keys = zipf_keys(1, 100000, 5000)
+    exact = {}
+    sketch = CountMinSketch(1024, 4)
+    for key in keys:
+        exact[key] = exact.get(key, 0) + 1
+        sketch.add_hash(hash64(key))
+    bound = sketch.epsilon * sketch.total
+    over = [sketch.estimate_hash(hash64(key)) - count for key, count in exact.items()]
+    assert min(over) >= 0
+    # Each estimate is within the bound with probability 1 - delta
+    assert sum(1 for excess in over if excess > bound) <= 2 * sketch.delta * len(exact)
+
+
+def test_heavy_hitters_find_the_top_keys():
+    keys = zipf_keys(2, 100000, 5000)
+    exact = {}
+    hitters = HeavyHitters(20, 2048, 4)
+    for key in keys:
+        exact[key] = exact.get(key, 0) + 1
+        hitters.add(key)
+    top = [key for key, _ in sorted(exact.items(), key=lambda item: -item[1])[:10]]
+    assert [key for key, _ in hitters.top(10)] == top
+    for key, estimate in hitters.top(10):
+        assert exact[key] <= estimate <= exact[key] + hitters.sketch.epsilon * hitters.sketch.total
+
+
+def test_merged_sketches_match_one_sketch():
+    lines = error_lines(3, 30000)
+    whole = ErrorSketch()
+    parts = [ErrorSketch() for _ in range(3)]
+    for n, line in enumerate(lines):
+        whole.add(*line)
+        parts[n * 3 // len(lines)].add(*line)
+    merged = parts[0].empty()
+    for part in parts:
+        merged.merge(part)
+
+    assert merged.all_hosts.registers == whole.all_hosts.registers
+    for error_type, sketch in whole.objects.items():
+        assert merged.objects[error_type].registers == sketch.registers
+    assert merged.top_hosts.sketch.rows == whole.top_hosts.sketch.rows
+    expected, summary = whole.summary(), merged.summary()
+    for key in ('distinct_hosts', 'hosts_by_type', 'objects_by_type', 'bounds'):
+        assert summary[key] == expected[key]
+    assert list(summary['top_hosts'])[:5] == list(expected['top_hosts'])[:5]
+
+
+def test_estimates_against_exact_counts():
+    lines = error_lines(4, 30000)
+    sketch = ErrorSketch()
+    hosts, objects, per_host = set(), {}, {}
+    for host, error_types, raw_line, timestamp in lines:
+        sketch.add(host, error_types, raw_line, timestamp)
+        hosts.add(host)
+        objects.setdefault(error_types[0], set()).add(raw_line.split(': ')[1])
+        per_host[host] = per_host.get(host, 0) + 1
+
+    summary = sketch.summary()
+    error = 3 * sketch.all_hosts.relative_error
+    assert abs(summary['distinct_hosts'] - len(hosts)) <= error * len(hosts) + 1
+    for error_type, seen in objects.items():
+        assert abs(summary['objects_by_type'][error_type] - len(seen)) <= error * len(seen) + 1
+    overcount = summary['bounds']['top_hosts_max_overcount']
+    for host, estimate in summary['top_hosts'].items():
+        assert per_host[host] <= estimate <= per_host[host] + overcount
+
+
+def test_round_trip():
+    lines = error_lines(5, 5000)
+    sketch = ErrorSketch(precision=10, width=512)
+    for line in lines[:3000]:
+        sketch.add(*line)
+    restored = ErrorSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+    for line in lines[3000:]:
+        sketch.add(*line)
+        restored.add(*line)
+    assert restored.summary() == sketch.summary()
+
+
+def test_only_equal_sizes_merge():
+    with pytest.raises(ValueError):
+        ErrorSketch(precision=10).merge(ErrorSketch(precision=12))
@@ -0,0 +1,99 @@
+"""collect_sources against several local console pages, some slow or failing"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from rpki_http import ConditionalFetcher
+from rpki_sources import Source, collect_sources, format_sources, load_sources
+
+
+class ConsoleHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        if server.status != 200:
+            self.send_error(server.status)
+            return
+        if self.headers.get('If-None-Match') == '"unchanged"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = ''.join(f"Sep 27 23:39:{n % 60:02d} rpki-client: rsync://{server.name}/repo/{n}.roa: "
+                       f"certificate has expired\n" for n in range(server.lines)).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', '"unchanged"')
+        self.end_headers()
+        self.wfile.write(body[:len(body) // 2])
+        self.wfile.flush()
+        time.sleep(server.delay)
+        self.wfile.write(body[len(body) // 2:])
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def consoles():
+    servers = {}
+
+    def start(name, lines=100, delay=0.0, status=200):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), ConsoleHandler)
+        server.name, server.lines, server.delay, server.status = name, lines, delay, status
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers[name] = server
+        return f"{name}=http://127.0.0.1:{server.server_address[1]}/"
+
+    yield start
+    for server in servers.values():
+        server.shutdown()
+        server.server_close()
+
+
+def count_errors(source, lines):
+    if source.name == 'broken':
+        raise ValueError('unexpected console format')
+    return sum(1 for line in lines if 'certificate has expired' in line)
+
+
+def test_slow_and_failing_sources_fail_alone(consoles):
+    sources = load_sources([consoles('fast', lines=3000), consoles('other', lines=500),
+                            consoles('slow', delay=3), consoles('down', status=503),
+                            consoles('broken')], timeout=1)
+    start = time.monotonic()
+    results = collect_sources(sources, ConditionalFetcher(), count_errors)
+    elapsed = time.monotonic() - start
+
+    assert [result.source for result in results] == sources
+    fast, other, slow, down, broken = results
+    assert (fast.ok, fast.value, fast.lines) == (True, 3000, 3000)
+    assert (other.ok, other.value, other.lines) == (True, 500, 500)
+    assert 'timed out' in slow.error
+    assert '503' in down.error
+    assert broken.error == 'ValueError: unexpected console format'
+    assert broken.value is None
+    # The slow source's timeout bounds the whole run, not the sum of the sources
+    assert fast.seconds < 1 and elapsed < 2.5
+    assert 'broken: failed: ValueError' in format_sources(results)
+
+
+def test_unchanged_sources(consoles):
+    sources = load_sources([consoles('a'), consoles('b')])
+    fetcher = ConditionalFetcher()
+    assert all(result.ok for result in collect_sources(sources, fetcher, count_errors))
+    results = collect_sources(sources, fetcher, count_errors)
+    assert [(result.not_modified, result.ok, result.value) for result in results] == [(True, False, None)] * 2
+    results = collect_sources(sources, fetcher, count_errors, conditional=False)
+    assert [result.value for result in results] == [100, 100]
+    assert collect_sources([], fetcher, count_errors) == []
+
+
+def test_load_sources():
+    sources = load_sources(['http://a.net/console', 'b=http://b.net/console',
+                            {'url': 'http://c.net/', 'timeout': 5}], timeout=10)
+    assert sources == [Source('a.net', 'http://a.net/console', 10), Source('b', 'http://b.net/console', 10),
+                       Source('c.net', 'http://c.net/', 5)]
+    with pytest.raises(ValueError):
+        load_sources(['http://a.net/x', 'http://a.net/y'])
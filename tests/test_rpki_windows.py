@@ -0,0 +1,125 @@
+"""RollingWindows against counting every line, and SyslogClock year inference"""
+
+import calendar
+import random
+import time
+
+import pytest
+
+from rpki_history import parse_syslog_timestamp
+from rpki_windows import RollingWindows, SyslogClock, format_duration, parse_duration
+
+HOSTS = ('rpki.example.net', 'repo.example.org', 'ca.example.com')
+TYPES = ('cert_expired', 'connection_timeout', 'seqnum_gap')
+
+
+def syslog(epoch):
+    return time.strftime('%b %d %H:%M:%S', time.gmtime(epoch))
+
+
+def random_lines(seed, count, start):
+    """(epoch, host, error_types) lines, mostly in order with some late ones"""
+    rng = random.Random(seed)
+    lines = []
+    now = start
+    for _ in range(count):
+        now += rng.randint(0, 40)
+        epoch = now - rng.randint(0, 5400) if rng.random() < 0.05 else now
+        lines.append((epoch, rng.choice(HOSTS), rng.sample(TYPES, rng.randint(1, 2))))
+    return lines
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_counts_match_brute_force(seed):
+    start = calendar.timegm((2025, 3, 1, 0, 0, 0))
+    bucket_seconds, span = 60, 3600
+    lines = random_lines(seed, 4000, start)
+    windows = RollingWindows(bucket_seconds, span, SyslogClock(reference=start + 86400 * 30))
+
+    head = None
+    dropped = 0
+    for epoch, host, error_types in lines:
+        windows.add(syslog(epoch), host, error_types)
+        bucket = epoch // bucket_seconds
+        if head is None or bucket > head:
+            head = bucket
+        elif bucket <= head - span // bucket_seconds:
+            dropped += 1
+
+    assert windows.head == head
+    assert windows.dropped == dropped
+    for window in (60, 300, 1800, 3600):
+        first = head - window // bucket_seconds + 1
+        expected = {}
+        for epoch, host, error_types in lines:
+            if first <= epoch // bucket_seconds <= head:
+                for error_type in error_types:
+                    expected[host, error_type] = expected.get((host, error_type), 0) + 1
+        assert windows.counts(window) == expected
+        assert windows.count(window, host=HOSTS[0]) == \
+            sum(count for (host, _), count in expected.items() if host == HOSTS[0])
+        assert windows.count(window, error_type=TYPES[1]) == \
+            sum(count for (_, error_type), count in expected.items() if error_type == TYPES[1])
+
+
+def test_idle_keys_are_cleared_and_dropped():
+    start = calendar.timegm((2025, 3, 1, 0, 0, 0))
+    windows = RollingWindows(60, 600, SyslogClock(reference=start + 86400))
+    windows.add(syslog(start), 'a.net', ['cert_expired'], count=5)
+    windows.add(syslog(start + 540), 'b.net', ['cert_expired'])
+    assert windows.count(600) == 6
+    # a.net's only bucket leaves the span; its ring is dropped at the next sweep
+    windows.add(syslog(start + 1500), 'b.net', ['cert_expired'])
+    assert windows.counts(600) == {('b.net', 'cert_expired'): 1}
+    assert ('a.net', 'cert_expired') not in windows.rings
+    # Slots of the same key left over from an earlier span don't count again
+    windows.add(syslog(start + 1500 + 600), 'b.net', ['cert_expired'])
+    assert windows.count(600) == 1
+
+
+def test_round_trip():
+    start = calendar.timegm((2025, 3, 1, 0, 0, 0))
+    windows = RollingWindows(60, 3600, SyslogClock(reference=start + 86400))
+    lines = random_lines(1, 500, start)
+    for epoch, host, error_types in lines[:300]:
+        windows.add(syslog(epoch), host, error_types)
+    restored = RollingWindows.from_dict(windows.to_dict())
+    for epoch, host, error_types in lines[300:]:
+        windows.add(syslog(epoch), host, error_types)
+        restored.add(syslog(epoch), host, error_types)
+    assert restored.counts(3600) == windows.counts(3600)
+    assert restored.snapshot([300, 3600]) == windows.snapshot([300, 3600])
+
+
+def test_clock_infers_the_year():
+    reference = calendar.timegm((2025, 1, 2, 6, 0, 0))
+    clock = SyslogClock(reference)
+    # More than a day ahead of the reference in 2025, so the line is from 2024
+    assert clock.parse('Dec 31 23:59:50') == calendar.timegm((2024, 12, 31, 23, 59, 50))
+    assert clock.parse('Jan 01 00:00:10') == calendar.timegm((2025, 1, 1, 0, 0, 10))
+    # A late December line after the change stays in the old year
+    assert clock.parse('Dec 31 23:59:55') == calendar.timegm((2024, 12, 31, 23, 59, 55))
+    assert clock.parse('Jan  3 00:00:20') == calendar.timegm((2025, 1, 3, 0, 0, 20))
+    assert clock.parse('not a timestamp') is None
+    assert clock.parse(None) is None
+    # The same rule as the history store, line by line
+    for timestamp in ('Dec 31 23:59:50', 'Jan 01 00:00:10', 'Jan 04 06:00:01', 'Jul 01 00:00:00'):
+        assert SyslogClock(reference).parse(timestamp) == clock.parse(timestamp) == \
+            parse_syslog_timestamp(timestamp, reference)
+
+
+def test_windows_must_fit_the_buckets():
+    windows = RollingWindows(60, 3600, SyslogClock(reference=calendar.timegm((2025, 3, 2, 0, 0, 0))))
+    windows.add('Mar 01 12:00:00', 'a.net', ['cert_expired'])
+    with pytest.raises(ValueError):
+        windows.count(90)
+    with pytest.raises(ValueError):
+        windows.count(7200)
+    with pytest.raises(ValueError):
+        RollingWindows(60, 30)
+
+
+def test_durations():
+    assert [parse_duration(value) for value in ('90s', '15m', '1h', '7d', '3600')] == \
+        [90, 900, 3600, 604800, 3600]
+    assert [format_duration(seconds) for seconds in (90, 900, 3600, 604800)] == ['90s', '15m', '1h', '7d']